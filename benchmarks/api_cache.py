@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Measure the API response cache as the number of workers grows.
+
+Each simulated worker has its own in-process cache (a ResponseCache of
+tweet-api/cache.py), as separate uvicorn workers or pods would. Requests
+for --keys distinct responses are spread at random over the workers, and
+every cache miss runs a fake Elasticsearch query of --query-ms. The run is
+repeated for each worker count, with the in-process tier only and with the
+shared tier on a local Redis-protocol fake (FakeRedisServer), so the number
+of Elasticsearch queries of both layouts can be compared.
+
+Reported as JSON (stdout, or --output), per layout and worker count:
+    es_queries      queries sent to Elasticsearch
+    hit_rate        fraction of requests answered without a query
+    latency_ms      p50/p95/p99/max of the requests
+    invalidation_ms time for an invalidation to reach every worker (shared tier)
+
+Usage:
+    python benchmarks/api_cache.py --workers 1,2,4,8 --rate 500 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_SRC = os.path.join(ROOT, 'tweet-api')
+sys.path.insert(0, API_SRC)
+
+from cache import ResponseCache, SharedTier  # noqa: E402
+from end_to_end import percentiles  # noqa: E402
+from fakes import FakeRedisServer  # noqa: E402
+
+
+async def simulate(args, workers, shared_url, run_id):
+    queries = 0
+    payload = {'buckets': [{'key': f"tag{i}", 'doc_count': i} for i in range(args.value_size)]}
+
+    async def query():
+        nonlocal queries
+        queries += 1
+        await asyncio.sleep(args.query_ms / 1000)
+        return payload
+
+    caches = []
+    for _ in range(workers):
+        shared = None
+        if shared_url:
+            shared = SharedTier(shared_url, prefix=f"bench-{run_id}:", timeout=args.redis_timeout)
+        cache = ResponseCache(stale_ttl=args.stale_ttl, shared=shared)
+        cache.start()
+        caches.append(cache)
+
+    rng = random.Random(args.seed)
+    latencies = []
+
+    async def request(cache, key):
+        start = time.perf_counter()
+        await cache.get_or_load(key, query, args.ttl)
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    start = time.perf_counter()
+    for index in range(int(args.rate * args.duration)):
+        delay = start + index / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        key = f"trends:{rng.randrange(args.keys)}"
+        tasks.append(asyncio.ensure_future(request(rng.choice(caches), key)))
+    await asyncio.gather(*tasks)
+
+    result = {
+        'requests': len(tasks),
+        'es_queries': queries,
+        'hit_rate': round(1 - queries / len(tasks), 4) if tasks else 0.0,
+        'latency_ms': percentiles(latencies),
+    }
+
+    if shared_url:
+        # Wait until every worker holds the keys, then time the broadcast
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        await caches[0].invalidate('trends:')
+        while any(len(cache) for cache in caches) and time.perf_counter() - started < 5:
+            await asyncio.sleep(0.001)
+        result['invalidation_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    for cache in caches:
+        await cache.close()
+    return result
+
+
+async def run(args):
+    report = {'settings': vars(args), 'local': {}, 'shared': {}}
+    with FakeRedisServer() as server:
+        for run_id, workers in enumerate(args.workers):
+            report['local'][workers] = await simulate(args, workers, None, run_id)
+            report['shared'][workers] = await simulate(args, workers, server.url, run_id)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=lambda value: [int(n) for n in value.split(',')], default=[1, 2, 4, 8],
+                        help='Comma-separated worker counts')
+    parser.add_argument('--rate', type=float, default=500, help='Requests/sec over all workers')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds of requests per run')
+    parser.add_argument('--keys', type=int, default=20, help='Distinct cached responses')
+    parser.add_argument('--ttl', type=float, default=1, help='Seconds a response stays fresh')
+    parser.add_argument('--stale-ttl', type=float, default=0, help='Seconds an expired response is served stale')
+    parser.add_argument('--query-ms', type=float, default=20, help='Duration of a fake Elasticsearch query')
+    parser.add_argument('--value-size', type=int, default=10, help='Buckets in each cached response')
+    # The fake store shares the interpreter with the simulated workers, so it
+    # answers more slowly than a real one under load
+    parser.add_argument('--redis-timeout', type=float, default=2, help='Seconds before a store request times out')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed of the key and worker draws')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Benchmark the whole pipeline: collector -> Kafka -> processor -> Elasticsearch -> API.
+
+TweetCollector, process_tweets_from_kafka and the FastAPI app run in threads
+of one process against the in-process fakes of fakes.py, so no network or
+service is needed. Tweets are added to the fake JSON Server at --rate for
+--duration seconds; the run then drains until every tweet is queryable
+through the API (or --drain-timeout expires).
+
+Reported as JSON (stdout, or --output):
+    throughput   tweets/sec through each stage
+    latency_ms   p50/p95/p99/max per stage, from the time each tweet entered
+                 the stage: collect (source -> raw-tweets), process
+                 (raw-tweets -> indexed), refresh (indexed -> searchable),
+                 query (searchable -> returned by GET /tweets/{id}) and
+                 end_to_end (source -> returned by the API)
+    api_ms       latency of the API requests made during the run
+    api_cache    response cache counters of the API (hits, coalesced misses, ...)
+    stages       per-stage metrics of the processing pipeline
+
+Every --sample-every'th tweet is followed to the API; the other stages
+measure every tweet.
+
+Usage:
+    python benchmarks/end_to_end.py --rate 500 --duration 30
+    python benchmarks/end_to_end.py --mode stream --output results.json
+"""
+import argparse
+import configparser
+import importlib.util
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLLECTOR_SRC = os.path.join(ROOT, 'tweet-collector', 'src')
+PROCESSOR_SRC = os.path.join(ROOT, 'tweet-processor', 'src')
+API_SRC = os.path.join(ROOT, 'tweet-api')
+for path in (os.path.dirname(os.path.abspath(__file__)), COLLECTOR_SRC, PROCESSOR_SRC, API_SRC):
+    sys.path.insert(0, path)
+
+import elasticsearch  # noqa: E402
+from codec import decode_record  # noqa: E402
+from fakes import AsyncFakeElasticsearch, FakeElasticsearch, FakeJsonServer, FakeKafka  # noqa: E402
+
+logger = logging.getLogger('end_to_end')
+
+RAW_TOPIC = 'raw-tweets'
+INDEX_NAME = 'tweets'
+API_QUERIES = ['/trends', '/regions', '/sentiment', '/dashboard', '/map-data?limit=100']
+PROBE_BATCH = 20
+
+
+def load_module(name, path):
+    """Import a service's main.py under a distinct module name."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentiles(values):
+    """Return count, p50, p95, p99 and max of latencies in seconds, in milliseconds."""
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+
+    def rank(p):
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000, 2)
+
+    return {'count': len(values), 'p50': rank(50), 'p95': rank(95), 'p99': rank(99),
+            'max': round(values[-1] * 1000, 2)}
+
+
+def throughput(times):
+    """Tweets/sec between the first and the last of a stage's timestamps."""
+    if len(times) < 2:
+        return 0.0
+    elapsed = max(times) - min(times)
+    return round((len(times) - 1) / elapsed, 1) if elapsed else 0.0
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def collector_config(args):
+    config = configparser.ConfigParser()
+    config['collector'] = {
+        'batch_size': str(args.page_size),
+        'incremental': 'true',
+        'checkpoint_file': '',
+    }
+    return config
+
+
+def processor_config(args):
+    config = configparser.ConfigParser()
+    config['kafka'] = {
+        'input_topic': RAW_TOPIC,
+        'output_topic': 'processed-tweets',
+        'batch_mode': str(args.mode == 'batch').lower(),
+        'max_poll_records': str(args.max_poll_records),
+        'poll_timeout_ms': '100',
+        'codec': args.codec,
+    }
+    config['elasticsearch'] = {
+        'index': INDEX_NAME,
+        'bulk_size': str(args.bulk_size),
+        'bulk_flush_interval': str(args.bulk_flush_interval),
+    }
+    config['processing'] = {
+        'resumable': 'false',
+        'stage_metrics_interval': '0',
+        'trending_top_k': '0',
+    }
+    config['flink'] = {'parallelism': str(args.parallelism)}
+    return config
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.source = FakeJsonServer()
+        self.kafka = FakeKafka()
+        self.es = FakeElasticsearch(args.refresh_interval)
+        self.stopping = threading.Event()
+        self.feeding_done = threading.Event()
+        self.queryable_at = {}
+        self.api_latencies = {}
+        self.errors = []
+        self._install_fakes()
+
+    def _install_fakes(self):
+        # The services create their clients from these names, so they are
+        # replaced before the clients are created
+        os.environ['KAFKA_CODEC'] = self.args.codec
+        os.environ['ES_INDEX'] = INDEX_NAME
+        es = self.es
+        elasticsearch.Elasticsearch = lambda *args, **kwargs: es
+        elasticsearch.AsyncElasticsearch = lambda *args, **kwargs: AsyncFakeElasticsearch(es)
+
+        import kafka_producer
+        kafka_producer.KafkaProducer = self.kafka.producer
+        from add_tweets import generate_tweet
+        self.generate_tweet = generate_tweet
+
+        self.processor = load_module('tweet_processor_main', os.path.join(PROCESSOR_SRC, 'main.py'))
+        self.processor.KafkaConsumer = self.kafka.consumer
+        self.processor.KafkaProducer = self.kafka.producer
+
+        self.api = load_module('tweet_api_main', os.path.join(API_SRC, 'main.py'))
+
+    def _record_api(self, path, elapsed):
+        self.api_latencies.setdefault(path, []).append(elapsed)
+
+    def _run(self, name, target):
+        def runner():
+            try:
+                target()
+            except Exception as e:
+                logger.exception(f"{name} failed")
+                self.errors.append(f"{name}: {e}")
+                self.stopping.set()
+        thread = threading.Thread(target=runner, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def feed(self):
+        """Add tweets to the source at the target rate."""
+        start = time.perf_counter()
+        count = 0
+        while not self.stopping.is_set():
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.args.duration:
+                break
+            due = int(elapsed * self.args.rate)
+            while count < due:
+                count += 1
+                self.source.add(self.generate_tweet(count))
+            time.sleep(0.001)
+        self.feeding_done.set()
+
+    def collect(self):
+        from collector import TweetCollector
+        collector = TweetCollector(collector_config(self.args), db_url='http://json-server/tweets')
+        collector.session = self.source
+        while not self.stopping.is_set():
+            collector.collect_and_send()
+            time.sleep(self.args.poll_interval)
+
+    def process(self):
+        self.processor.process_tweets_from_kafka(processor_config(self.args))
+
+    def probe(self):
+        """Follow sampled tweets until the API returns them."""
+        from fastapi.testclient import TestClient
+        pending = []
+        next_id = self.args.sample_every
+        with TestClient(self.api.app) as client:
+            while not self.stopping.is_set():
+                while next_id <= len(self.source):
+                    pending.append(next_id)
+                    next_id += self.args.sample_every
+                # Only ids already indexed can be found; the oldest are tried first
+                ready = [tweet_id for tweet_id in pending if (INDEX_NAME, str(tweet_id)) in self.es.indexed_at]
+                for tweet_id in ready[:PROBE_BATCH]:
+                    start = time.perf_counter()
+                    response = client.get(f'/tweets/{tweet_id}')
+                    now = time.perf_counter()
+                    self._record_api('/tweets/{id}', now - start)
+                    if response.status_code == 200:
+                        self.queryable_at[tweet_id] = now
+                        pending.remove(tweet_id)
+                    elif response.status_code != 404:
+                        raise RuntimeError(f"GET /tweets/{tweet_id} returned {response.status_code}")
+                if self.feeding_done.is_set() and not pending and next_id > len(self.source):
+                    return
+                time.sleep(0.005)
+
+    def query(self):
+        """Issue the dashboard's aggregation queries while the pipeline runs."""
+        from fastapi.testclient import TestClient
+        with TestClient(self.api.app) as client:
+            while not self.stopping.is_set():
+                for path in API_QUERIES:
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    self._record_api(path.split('?')[0], time.perf_counter() - start)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"GET {path} returned {response.status_code}")
+                time.sleep(self.args.query_interval)
+
+    def run(self):
+        start = time.perf_counter()
+        threads = {name: self._run(name, target) for name, target in (
+            ('processor', self.process), ('collector', self.collect), ('feeder', self.feed),
+            ('probe', self.probe),
+        )}
+        if self.args.query_interval > 0:
+            threads['query'] = self._run('query', self.query)
+
+        threads['feeder'].join()
+        threads['probe'].join(self.args.drain_timeout)
+        drained = not threads['probe'].is_alive() and not self.errors
+        elapsed = time.perf_counter() - start
+
+        self.stopping.set()
+        self.kafka.close()
+        for name in ('collector', 'processor', 'query'):
+            if name in threads:
+                threads[name].join(5)
+        return self.report(elapsed, drained)
+
+    def report(self, elapsed, drained):
+        added = self.source.added_at
+        raw = {}
+        for record in self.kafka.records(RAW_TOPIC):
+            raw.setdefault(decode_record(record)['id'], record.appended_at)
+        indexed = {int(doc_id): at for (index, doc_id), at in self.es.indexed_at.items() if index == INDEX_NAME}
+        visible = {int(doc_id): at for (index, doc_id), at in self.es.visible_at.items() if index == INDEX_NAME}
+        queried = self.queryable_at
+
+        def deltas(ends, starts):
+            return [at - starts[tweet_id] for tweet_id, at in ends.items() if tweet_id in starts]
+
+        return {
+            'commit': git_commit(),
+            'settings': vars(self.args),
+            'elapsed': round(elapsed, 2),
+            'drained': drained,
+            'errors': self.errors,
+            'tweets': {
+                'added': len(added),
+                'collected': len(raw),
+                'indexed': len(indexed),
+                'searchable': len(visible),
+                'sampled': len(queried),
+            },
+            'throughput': {
+                'source': throughput(list(added.values())),
+                'collect': throughput(list(raw.values())),
+                'process': throughput(list(indexed.values())),
+                'end_to_end': round(len(indexed) / elapsed, 1) if elapsed else 0.0,
+            },
+            'latency_ms': {
+                'collect': percentiles(deltas(raw, added)),
+                'process': percentiles(deltas(indexed, raw)),
+                'refresh': percentiles(deltas(visible, indexed)),
+                'query': percentiles(deltas(queried, visible)),
+                'end_to_end': percentiles(deltas(queried, added)),
+            },
+            'api_ms': {path: percentiles(values) for path, values in sorted(self.api_latencies.items())},
+            'api_cache': self.api.cache.stats(),
+            'stages': self.processor.get_pipeline().stats(),
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rate', type=float, default=200, help='Tweets/sec added to the source')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of feeding')
+    parser.add_argument('--drain-timeout', type=float, default=60,
+                        help='Seconds to wait after feeding for the sampled tweets to be queryable')
+    parser.add_argument('--mode', choices=('batch', 'stream'), default='batch', help='Processor consumption mode')
+    parser.add_argument('--parallelism', type=int, default=1, help='Processor worker processes (batch mode)')
+    parser.add_argument('--codec', default='orjson', help='Kafka codec of the collector and the processor')
+    parser.add_argument('--page-size', type=int, default=100, help='Collector page size')
+    parser.add_argument('--poll-interval', type=float, default=0.1, help='Seconds between collector polls')
+    parser.add_argument('--max-poll-records', type=int, default=500, help='Processor batch size')
+    parser.add_argument('--bulk-size', type=int, default=1000, help='Documents per bulk request')
+    parser.add_argument('--bulk-flush-interval', type=float, default=1.0,
+                        help='Maximum seconds a document waits in the bulk buffer')
+    parser.add_argument('--refresh-interval', type=float, default=1.0, help='Elasticsearch refresh interval')
+    parser.add_argument('--sample-every', type=int, default=10, help='Follow every Nth tweet to the API')
+    parser.add_argument('--query-interval', type=float, default=0.5,
+                        help='Seconds between rounds of aggregation queries, 0 to disable')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--verbose', action='store_true', help='Keep the services INFO logs')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    benchmark = Benchmark(args)
+    if not args.verbose:
+        # The services log every poll and batch; keep only warnings
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+    logger.info(f"Feeding {args.rate} tweets/sec for {args.duration}s ({args.mode} mode)")
+    report = benchmark.run()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(output)
+    return 0 if report['drained'] and not report['errors'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
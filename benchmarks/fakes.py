@@ -0,0 +1,694 @@
+"""
+In-process stand-ins for JSON Server, Kafka, Elasticsearch and Redis.
+
+They implement the subset of each client API used by the collector, the
+processor and the API, so the whole pipeline runs in one process with no
+network. All of them are thread-safe: each service runs in its own thread.
+The Redis stand-in is the exception to "no network": it is a real server
+on a local port, so that the API's redis client is exercised unchanged.
+"""
+import fnmatch
+import json
+import socketserver
+import threading
+import time
+from collections import namedtuple
+
+from elasticsearch import NotFoundError
+from kafka.structs import TopicPartition
+
+FakeRecord = namedtuple('FakeRecord', ['topic', 'partition', 'offset', 'timestamp', 'key', 'value', 'headers',
+                                       'appended_at'])
+RecordMetadata = namedtuple('RecordMetadata', ['topic', 'partition', 'offset', 'timestamp'])
+
+
+class FakeJsonServer:
+    """
+    Tweets collection of JSON Server, used in place of a requests.Session.
+
+    Supports the query parameters used by the collector: `id_gte`, `_sort`
+    on id, `_order` and `_limit`. `added_at` records when each tweet was
+    added, the start of its end-to-end latency.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tweets = []
+        self.added_at = {}
+        self.requests = 0
+
+    def add(self, tweet):
+        with self._lock:
+            self._tweets.append(tweet)
+            self.added_at[tweet['id']] = time.perf_counter()
+
+    def __len__(self):
+        return len(self._tweets)
+
+    def get(self, url, params=None, timeout=None):
+        params = params or {}
+        with self._lock:
+            self.requests += 1
+            tweets = self._tweets
+            if 'id_gte' in params:
+                cursor = int(params['id_gte'])
+                tweets = [tweet for tweet in tweets if tweet['id'] >= cursor]
+            else:
+                tweets = list(tweets)
+        if params.get('_sort') == 'id':
+            tweets.sort(key=lambda tweet: tweet['id'], reverse=params.get('_order') == 'desc')
+        if '_limit' in params:
+            tweets = tweets[:int(params['_limit'])]
+        return FakeResponse(200, tweets)
+
+    def close(self):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class FakeFuture:
+    """Send future of a record that is acknowledged as soon as it is appended."""
+
+    def __init__(self, metadata):
+        self._metadata = metadata
+
+    def succeeded(self):
+        return True
+
+    def failed(self):
+        return False
+
+    def get(self, timeout=None):
+        return self._metadata
+
+    def add_callback(self, callback, *args, **kwargs):
+        callback(*args, self._metadata, **kwargs)
+        return self
+
+    def add_errback(self, errback, *args, **kwargs):
+        return self
+
+
+class FakeKafka:
+    """
+    Broker with one partition per topic.
+
+    `producer` and `consumer` take the arguments of KafkaProducer and
+    KafkaConsumer, so they can replace those classes. Closing the broker
+    ends consumer iteration and interrupts polling consumers the way
+    Ctrl-C would, which stops the processor loops cleanly.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._topics = {}
+        self._committed = {}
+        self.closed = False
+
+    def producer(self, **kwargs):
+        return FakeProducer(self)
+
+    def consumer(self, *topics, group_id=None, **kwargs):
+        return FakeConsumer(self, topics, group_id)
+
+    def append(self, topic, value, key=None, headers=None):
+        with self._condition:
+            records = self._topics.setdefault(topic, [])
+            now = time.time()
+            record = FakeRecord(topic, 0, len(records), int(now * 1000), key, value, list(headers or []),
+                                time.perf_counter())
+            records.append(record)
+            self._condition.notify_all()
+        return RecordMetadata(topic, 0, record.offset, record.timestamp)
+
+    def records(self, topic):
+        with self._condition:
+            return list(self._topics.get(topic, []))
+
+    def fetch(self, topic, offset, max_records, timeout):
+        """Return up to `max_records` records from `offset`, waiting up to `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self.closed:
+                    return None
+                records = self._topics.get(topic, [])
+                if offset < len(records):
+                    return records[offset:offset + max_records]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+
+    def commit(self, group_id, offsets):
+        with self._condition:
+            self._committed.setdefault(group_id, {}).update(offsets)
+
+    def committed(self, group_id, partition):
+        with self._condition:
+            return self._committed.get(group_id, {}).get(partition)
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class FakeProducer:
+    def __init__(self, broker):
+        self._broker = broker
+
+    def send(self, topic, value=None, key=None, headers=None, **kwargs):
+        return FakeFuture(self._broker.append(topic, value, key, headers))
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+    def metrics(self):
+        return {}
+
+
+class FakeConsumer:
+    def __init__(self, broker, topics, group_id=None):
+        self._broker = broker
+        self._group_id = group_id
+        self._positions = {}
+        for topic in topics:
+            partition = TopicPartition(topic, 0)
+            self._positions[partition] = broker.committed(group_id, partition) or 0
+
+    def bootstrap_connected(self):
+        return True
+
+    def poll(self, timeout_ms=0, max_records=500):
+        batch = {}
+        for partition, position in self._positions.items():
+            records = self._broker.fetch(partition.topic, position, max_records, timeout_ms / 1000)
+            if records is None:
+                raise KeyboardInterrupt('fake Kafka broker closed')
+            if records:
+                batch[partition] = records
+                self._positions[partition] = records[-1].offset + 1
+        return batch
+
+    def __iter__(self):
+        while True:
+            try:
+                batch = self.poll(timeout_ms=100)
+            except KeyboardInterrupt:
+                return
+            for records in batch.values():
+                yield from records
+
+    def seek(self, partition, offset):
+        self._positions[partition] = offset
+
+    def commit(self, offsets=None):
+        if offsets is None:
+            offsets = self._positions
+        self._broker.commit(self._group_id, {
+            partition: getattr(offset, 'offset', offset) for partition, offset in offsets.items()
+        })
+
+    def close(self, autocommit=True):
+        pass
+
+
+class AsyncFakeElasticsearch:
+    """AsyncElasticsearch interface over a FakeElasticsearch, for the API."""
+
+    def __init__(self, es):
+        self._es = es
+
+    async def ping(self, **kwargs):
+        return self._es.ping()
+
+    async def get(self, index, id, **kwargs):
+        return self._es.get(index, id, **kwargs)
+
+    async def search(self, index=None, body=None, **kwargs):
+        return self._es.search(index, body, **kwargs)
+
+    async def open_point_in_time(self, index=None, **kwargs):
+        return self._es.open_point_in_time(index, **kwargs)
+
+    async def close_point_in_time(self, body=None, **kwargs):
+        return self._es.close_point_in_time(body, **kwargs)
+
+    async def close(self):
+        pass
+
+    @property
+    def indices(self):
+        return AsyncFakeIndices(self._es.indices)
+
+
+class AsyncFakeIndices:
+    def __init__(self, indices):
+        self._indices = indices
+
+    async def get_mapping(self, index):
+        return self._indices.get_mapping(index)
+
+
+class FakeIndices:
+    def __init__(self, es):
+        self._es = es
+
+    def exists(self, index):
+        return index in self._es._indices
+
+    def create(self, index, body=None):
+        with self._es._lock:
+            self._es._indices.setdefault(index, {})
+            self._es._pending.setdefault(index, {})
+            self._es._mappings[index] = (body or {}).get('mappings', {})
+        return {'acknowledged': True, 'index': index}
+
+    def get_mapping(self, index):
+        if index not in self._es._indices:
+            raise NotFoundError(404, 'index_not_found_exception', {'index': index})
+        return {index: {'mappings': self._es._mappings.get(index, {})}}
+
+    def delete(self, index):
+        with self._es._lock:
+            self._es._indices.pop(index, None)
+            self._es._pending.pop(index, None)
+            self._es._mappings.pop(index, None)
+        return {'acknowledged': True}
+
+    def refresh(self, index=None):
+        self._es.refresh()
+
+
+class FakeElasticsearch:
+    """
+    Elasticsearch with near-real-time visibility.
+
+    Indexed documents become visible to `search` and `get` at the next
+    refresh, every `refresh_interval` seconds, so "queryable" has the same
+    meaning as against a real cluster. Queries support match_all and bool
+    queries of match, term, terms, range and exists clauses; sorting,
+    from/size, search_after, points in time, _source filtering and terms
+    aggregations.
+
+    `indexed_at` records when each document id was indexed and
+    `visible_at` when it became searchable.
+    """
+
+    def __init__(self, refresh_interval=1.0):
+        self.refresh_interval = float(refresh_interval)
+        self._lock = threading.Lock()
+        self._indices = {}
+        self._pending = {}
+        self._mappings = {}
+        self._next_refresh = time.perf_counter() + self.refresh_interval
+        self.indexed_at = {}
+        self.visible_at = {}
+        self.indices = FakeIndices(self)
+        self.searches = 0
+        self._pits = {}
+
+    def ping(self):
+        return True
+
+    def _store(self, index, doc_id, source, now):
+        self._indices.setdefault(index, {})
+        self._pending.setdefault(index, {})[doc_id] = source
+        self.indexed_at.setdefault((index, doc_id), now)
+
+    def bulk(self, body):
+        lines = [line for line in body.splitlines() if line.strip()]
+        now = time.perf_counter()
+        items = []
+        with self._lock:
+            for action_line, source_line in zip(lines[::2], lines[1::2]):
+                metadata = json.loads(action_line)['index']
+                source = json.loads(source_line)
+                doc_id = str(metadata.get('_id') or len(self.indexed_at))
+                self._store(metadata['_index'], doc_id, source, now)
+                items.append({'index': {'_index': metadata['_index'], '_id': doc_id, 'status': 201}})
+        return {'took': 0, 'errors': False, 'items': items}
+
+    def index(self, index, body=None, id=None, document=None, **kwargs):
+        source = json.loads(json.dumps(document if document is not None else body, default=str))
+        with self._lock:
+            doc_id = str(id if id is not None else len(self.indexed_at))
+            self._store(index, doc_id, source, time.perf_counter())
+        return {'_index': index, '_id': doc_id, 'result': 'created'}
+
+    def refresh(self):
+        """Make every indexed document visible."""
+        with self._lock:
+            now = time.perf_counter()
+            for index, pending in self._pending.items():
+                for doc_id in pending:
+                    self.visible_at.setdefault((index, doc_id), now)
+                self._indices[index].update(pending)
+                pending.clear()
+
+    def _refresh_if_due(self):
+        now = time.perf_counter()
+        if now >= self._next_refresh:
+            self.refresh()
+            self._next_refresh = now + self.refresh_interval
+
+    def get(self, index, id, **kwargs):
+        self._refresh_if_due()
+        source = self._indices.get(index, {}).get(str(id))
+        if source is None:
+            raise NotFoundError(404, 'not_found', {'_index': index, '_id': str(id), 'found': False})
+        return {'_index': index, '_id': str(id), 'found': True, '_source': source}
+
+    def open_point_in_time(self, index, keep_alive=None, **kwargs):
+        """Snapshot the searchable documents of an index; searches in it ignore later changes."""
+        self._refresh_if_due()
+        with self._lock:
+            pit_id = f"pit-{len(self._pits) + 1}"
+            self._pits[pit_id] = (index, list(self._indices.get(index, {}).items()))
+        return {'id': pit_id}
+
+    def close_point_in_time(self, body=None, **kwargs):
+        with self._lock:
+            freed = self._pits.pop((body or {}).get('id'), None) is not None
+        return {'succeeded': True, 'num_freed': int(freed)}
+
+    def search(self, index=None, body=None, **kwargs):
+        self._refresh_if_due()
+        body = body or {}
+        with self._lock:
+            self.searches += 1
+            if 'pit' in body:
+                pit = self._pits.get(body['pit']['id'])
+                if pit is None:
+                    raise NotFoundError(404, 'search_context_missing_exception', {'pit_id': body['pit']['id']})
+                index, documents = pit
+            else:
+                documents = list(self._indices.get(index, {}).items())
+
+        query = body.get('query', {'match_all': {}})
+        matches = [(doc_id, source) for doc_id, source in documents if _matches(source, query)]
+        sorts = []
+        for sort in body.get('sort', []):
+            field, order = next(iter(sort.items())) if isinstance(sort, dict) else (sort, 'asc')
+            sorts.append((field, order.get('order', 'asc') if isinstance(order, dict) else order))
+        for field, order in reversed(sorts):
+            matches.sort(key=lambda match: _sort_key(_field(match[1], field)), reverse=order == 'desc')
+        # The total and the aggregations cover every match, wherever the
+        # page starts
+        sources = [source for _, source in matches]
+        if 'search_after' in body:
+            matches = [match for match in matches if _is_after(match[1], sorts, body['search_after'])]
+
+        start = body.get('from', 0)
+        size = body.get('size', 10)
+        hits = [{'_index': index, '_id': doc_id, '_source': _project(source, body.get('_source'))}
+                for doc_id, source in matches[start:start + size]]
+        if sorts:
+            for hit, (_, source) in zip(hits, matches[start:start + size]):
+                hit['sort'] = [_field(source, field) for field, _ in sorts]
+        response = {
+            'took': 0,
+            'hits': {'total': {'value': len(sources), 'relation': 'eq'}, 'hits': hits},
+        }
+        if 'pit' in body:
+            response['pit_id'] = body['pit']['id']
+        if body.get('aggs'):
+            response['aggregations'] = {name: _aggregate(sources, aggregation)
+                                        for name, aggregation in body['aggs'].items()}
+        return response
+
+
+def _field(source, path):
+    value = source
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _values(source, path):
+    value = _field(source, path)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _sort_key(value):
+    # Missing values sort last, as in Elasticsearch
+    return (value is None, value if value is not None else 0)
+
+
+def _is_after(source, sorts, search_after):
+    # Whether a document sorts strictly after the search_after position
+    for (field, order), after in zip(sorts, search_after):
+        value, after = _sort_key(_field(source, field)), _sort_key(after)
+        if value != after:
+            return value < after if order == 'desc' else value > after
+    return False
+
+
+def _matches(source, query):
+    kind, clause = next(iter(query.items()))
+    if kind == 'match_all':
+        return True
+    if kind == 'bool':
+        return (all(_matches(source, sub) for sub in clause.get('must', []) + clause.get('filter', []))
+                and not any(_matches(source, sub) for sub in clause.get('must_not', []))
+                and (not clause.get('should') or any(_matches(source, sub) for sub in clause['should'])))
+    field, value = next(iter(clause.items()))
+    if kind == 'match':
+        value = value.get('query') if isinstance(value, dict) else value
+        words = set(str(value).lower().split())
+        return any(words & set(str(text).lower().split()) for text in _values(source, field))
+    if kind == 'term':
+        value = value.get('value') if isinstance(value, dict) else value
+        return value in _values(source, field)
+    if kind == 'terms':
+        return bool(set(value) & set(_values(source, field)))
+    if kind == 'exists':
+        return _field(source, value) is not None
+    if kind == 'range':
+        values = _values(source, field)
+        bounds = {'gt': lambda v, b: v > b, 'gte': lambda v, b: v >= b,
+                  'lt': lambda v, b: v < b, 'lte': lambda v, b: v <= b}
+        return any(all(bounds[op](v, bound) for op, bound in value.items() if op in bounds) for v in values)
+    raise ValueError(f"Unsupported query clause '{kind}'")
+
+
+def _project(source, includes):
+    if not includes:
+        return source
+    projected = {}
+    for path in includes:
+        value = _field(source, path)
+        if value is None:
+            continue
+        target = projected
+        parts = path.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return projected
+
+
+def _aggregate(sources, aggregation):
+    kind, settings = next((kind, settings) for kind, settings in aggregation.items() if kind != 'aggs')
+    if kind != 'terms':
+        raise ValueError(f"Unsupported aggregation '{kind}'")
+    counts = {}
+    for source in sources:
+        for value in set(_values(source, settings['field'])):
+            counts[value] = counts.get(value, 0) + 1
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    size = settings.get('size', 10)
+    return {
+        'doc_count_error_upper_bound': 0,
+        'sum_other_doc_count': sum(count for _, count in ranked[size:]),
+        'buckets': [{'key': key, 'doc_count': count} for key, count in ranked[:size]],
+    }
+
+
+class FakeRedisServer:
+    """
+    Redis-protocol (RESP2) server on 127.0.0.1, for the API's shared cache.
+
+    Supports the commands the cache uses: PING, GET, SET (PX, EX, NX), DEL,
+    UNLINK, SCAN (MATCH), PUBLISH and SUBSCRIBE, with keys expiring lazily.
+    Each connection is served by its own thread. Use as a context manager,
+    or call `start` and `close`; `url` is the address to connect to.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._subscribers = {}
+        self.commands = 0
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fake._serve(self)
+
+        class Server(socketserver.ThreadingTCPServer):
+            # Workers connect in bursts; the default backlog of 5 resets them
+            request_queue_size = 256
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def keys(self):
+        with self._lock:
+            now = time.monotonic()
+            return [key for key, (_, expires_at) in self._data.items() if expires_at is None or expires_at > now]
+
+    def _serve(self, handler):
+        writer = _RespWriter(handler.wfile)
+        try:
+            while True:
+                command = _read_command(handler.rfile)
+                if command is None:
+                    return
+                self.commands += 1
+                name = command[0].decode().upper()
+                if name == 'SUBSCRIBE':
+                    self._subscribe(writer, command[1:])
+                    continue
+                try:
+                    writer.send(self._execute(name, command[1:]))
+                except ValueError as e:
+                    writer.send(e)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._lock:
+                for writers in self._subscribers.values():
+                    writers.discard(writer)
+
+    def _subscribe(self, writer, channels):
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(writer)
+        for count, channel in enumerate(channels, 1):
+            writer.send([b'subscribe', channel, count])
+
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _execute(self, name, args):
+        with self._lock:
+            if name == 'PING':
+                return _Status('PONG')
+            if name in ('CLIENT', 'SELECT'):
+                return _Status('OK')
+            if name == 'GET':
+                return self._get(args[0])
+            if name == 'SET':
+                key, value, options = args[0], args[1], [arg.decode().upper() for arg in args[2:]]
+                expires_at = None
+                if 'PX' in options:
+                    expires_at = time.monotonic() + int(options[options.index('PX') + 1]) / 1000
+                elif 'EX' in options:
+                    expires_at = time.monotonic() + int(options[options.index('EX') + 1])
+                if 'NX' in options and self._get(key) is not None:
+                    return None
+                self._data[key] = (value, expires_at)
+                return _Status('OK')
+            if name in ('DEL', 'UNLINK'):
+                return sum(1 for key in args if self._get(key) is not None and self._data.pop(key))
+            if name == 'SCAN':
+                options = [arg.decode().upper() for arg in args]
+                pattern = args[options.index('MATCH') + 1].decode() if 'MATCH' in options else '*'
+                keys = [key for key in list(self._data) if self._get(key) is not None
+                        and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b'0', keys]
+            if name == 'PUBLISH':
+                writers = list(self._subscribers.get(args[0], ()))
+                for writer in writers:
+                    writer.send([b'message', args[0], args[1]])
+                return len(writers)
+        raise ValueError(f"ERR unknown command '{name}'")
+
+
+class _Status(str):
+    pass
+
+
+class _RespWriter:
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self._lock = threading.Lock()
+
+    def send(self, value):
+        with self._lock:
+            self._wfile.write(_encode_resp(value))
+            self._wfile.flush()
+
+
+def _encode_resp(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, _Status):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, Exception):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b''.join(_encode_resp(item) for item in value)
+    if isinstance(value, str):
+        value = value.encode()
+    return f"${len(value)}\r\n".encode() + value + b'\r\n'
+
+
+def _read_command(rfile):
+    line = rfile.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        length = int(rfile.readline()[1:])
+        args.append(rfile.read(length + 2)[:-2])
+    return args
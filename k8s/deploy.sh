@@ -24,6 +24,9 @@ kubectl apply -f kafka.yaml
 echo "   - Elasticsearch (data storage)"
 kubectl apply -f elasticsearch.yaml
 
+echo "   - Redis (shared API cache)"
+kubectl apply -f redis.yaml
+
 echo "   - Kibana (data visualization)"
 kubectl apply -f kibana.yaml
 
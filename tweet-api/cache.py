@@ -1,46 +1,650 @@
 """
-Cache implementation for API endpoints to improve performance.
+Response cache for the aggregation endpoints.
+
+Responses are kept in a bounded LRU (by entry count and by encoded bytes)
+with a time-to-live per endpoint. Concurrent misses on the same key share a
+single Elasticsearch query, and an expired entry is still served for
+CACHE_STALE_TTL seconds while one background request refreshes it.
+
+With CACHE_REDIS_URL set, a store speaking the Redis protocol is a second
+tier shared by every worker and pod: a response loaded by one worker is
+served to the others, and invalidations are broadcast to all of them.
 """
-from functools import wraps
+import asyncio
+import inspect
+import json
+import logging
+import struct
 import time
+import zlib
+from collections import OrderedDict
+from functools import wraps
+
+from fastapi.encoders import jsonable_encoder
+
+from config import (
+    ENABLE_CACHE,
+    CACHE_EXPIRY,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_BYTES,
+    CACHE_STALE_TTL,
+    CACHE_REDIS_URL,
+    CACHE_REDIS_PREFIX,
+    CACHE_REDIS_TIMEOUT,
+    CACHE_REDIS_LOCK_WAIT,
+)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
 
-# Simple in-memory cache
-cache = {}
-cache_expiry = {}
 DEFAULT_CACHE_EXPIRY = 300  # 5 minutes
 
-def cached(expiry=None):
-    """Decorator to cache function results."""
+# Shared values: a header (format version, flags, wall-clock time until
+# which the value is fresh) followed by the msgpack or JSON payload,
+# zlib-compressed when that makes it smaller
+VALUE_HEADER = struct.Struct('!BBd')
+VALUE_FORMAT_VERSION = 1
+FLAG_MSGPACK = 0x01
+FLAG_ZLIB = 0x02
+COMPRESS_MIN_BYTES = 1024
+
+LOCK_TIMEOUT = 10  # seconds a worker may hold a key's refresh lock
+LOCK_POLL_INTERVAL = 0.05  # seconds
+RETRY_INTERVAL = 5  # seconds the shared tier is bypassed after an error
+
+
+def encode_value(value, fresh_until):
+    """
+    Serialize a cached value for the shared tier.
+
+    Args:
+        value: JSON-compatible value
+        fresh_until (float): Epoch seconds until which the value is fresh
+
+    Returns:
+        bytes: Encoded value
+    """
+    if MSGPACK_AVAILABLE:
+        payload = msgpack.packb(value, use_bin_type=True)
+        flags = FLAG_MSGPACK
+    else:
+        payload = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        flags = 0
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload)
+        if len(compressed) < len(payload):
+            payload = compressed
+            flags |= FLAG_ZLIB
+    return VALUE_HEADER.pack(VALUE_FORMAT_VERSION, flags, fresh_until) + payload
+
+
+def decode_value(data):
+    """
+    Deserialize a value written by `encode_value`.
+
+    Args:
+        data (bytes): Encoded value
+
+    Returns:
+        tuple: (value, fresh_until)
+
+    Raises:
+        ValueError: If the format is unknown or cannot be decoded here
+    """
+    if len(data) < VALUE_HEADER.size:
+        raise ValueError("Truncated cache value")
+    version, flags, fresh_until = VALUE_HEADER.unpack_from(data)
+    if version != VALUE_FORMAT_VERSION:
+        raise ValueError(f"Unknown cache value format {version}")
+    payload = data[VALUE_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    if flags & FLAG_MSGPACK:
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("Cache value is msgpack-encoded but the msgpack package is not installed")
+        return msgpack.unpackb(payload, raw=False), fresh_until
+    return json.loads(payload), fresh_until
+
+
+class SharedTier:
+    """
+    Second cache tier in a store speaking the Redis protocol.
+
+    Entries expire in the store at the end of their stale period and carry
+    their freshness in the value header. A per-key lock (SET NX) elects the
+    worker that queries Elasticsearch when an entry is missing or stale.
+    Invalidations are published on a channel every worker listens to.
+
+    The tier is an optimization: any store error is logged, counted, and the
+    tier is bypassed for RETRY_INTERVAL seconds, requests falling back to
+    the in-process cache and Elasticsearch.
+    """
+
+    def __init__(self, url, prefix=CACHE_REDIS_PREFIX, timeout=CACHE_REDIS_TIMEOUT,
+                 lock_wait=CACHE_REDIS_LOCK_WAIT):
+        if not REDIS_AVAILABLE:
+            raise ValueError("The shared cache tier requires the redis package")
+        self.url = url
+        self.prefix = prefix
+        self.channel = f"{prefix}invalidate"
+        self.lock_wait = max(0.0, float(lock_wait))
+        self.client = aioredis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        # Subscriptions wait for messages indefinitely, so they get a
+        # client without a read timeout
+        self.subscriber = aioredis.Redis.from_url(url, socket_connect_timeout=timeout)
+        self._bypass_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.lock_waits = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._bypass_until
+
+    def _failed(self, action, error):
+        self.errors += 1
+        if self.available:
+            logger.warning(f"Shared cache {action} failed, bypassing it for {RETRY_INTERVAL}s: {error}")
+        self._bypass_until = time.monotonic() + RETRY_INTERVAL
+
+    async def get(self, key):
+        """
+        Return the shared value of a key.
+
+        Returns:
+            tuple: (value, fresh_until), or None on a miss or an error
+        """
+        if not self.available:
+            return None
+        try:
+            data = await self.client.get(self.prefix + key)
+        except Exception as e:
+            self._failed('read', e)
+            return None
+        if data is None:
+            self.misses += 1
+            return None
+        try:
+            found = decode_value(data)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Ignoring undecodable shared cache value of {key}: {e}")
+            return None
+        self.hits += 1
+        return found
+
+    async def put(self, key, value, ttl, stale_ttl):
+        """Store a value, fresh for `ttl` seconds and kept `stale_ttl` seconds more."""
+        if not self.available:
+            return
+        data = encode_value(value, time.time() + ttl)
+        try:
+            await self.client.set(self.prefix + key, data, px=max(1, int((ttl + stale_ttl) * 1000)))
+        except Exception as e:
+            self._failed('write', e)
+            return
+        self.writes += 1
+        self.bytes_written += len(data)
+
+    async def lock(self, key):
+        """
+        Try to become the worker loading a key.
+
+        Returns:
+            bool: True if the lock was taken, or if the store is unavailable
+            (every worker then loads for itself)
+        """
+        if not self.available:
+            return True
+        try:
+            return bool(await self.client.set(f"{self.prefix}lock:{key}", b'1', nx=True, px=LOCK_TIMEOUT * 1000))
+        except Exception as e:
+            self._failed('lock', e)
+            return True
+
+    async def unlock(self, key):
+        # The lock expires on its own if this fails, or if the load outlived
+        # LOCK_TIMEOUT and another worker took it since
+        if not self.available:
+            return
+        try:
+            await self.client.delete(f"{self.prefix}lock:{key}")
+        except Exception as e:
+            self._failed('unlock', e)
+
+    async def wait(self, key):
+        """
+        Wait up to `lock_wait` seconds for another worker to store a fresh
+        value of a key.
+
+        Returns:
+            tuple: (value, fresh_until), or None if none arrived
+        """
+        self.lock_waits += 1
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline and self.available:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            found = await self.get(key)
+            if found is not None and found[1] > time.time():
+                return found
+        return None
+
+    async def invalidate(self, prefix=''):
+        """
+        Delete the shared entries whose key starts with `prefix`, and tell
+        every worker to drop them from its in-process cache.
+
+        Returns:
+            int: Number of shared entries deleted
+        """
+        pattern = self.prefix + ''.join(f"[{c}]" if c in '*?[]\\' else c for c in prefix) + '*'
+        keys = [key async for key in self.client.scan_iter(match=pattern, count=500)]
+        if keys:
+            await self.client.delete(*keys)
+        await self.client.publish(self.channel, prefix)
+        return len(keys)
+
+    async def listen(self, on_invalidate):
+        """
+        Apply the invalidations published by any worker until cancelled.
+
+        Args:
+            on_invalidate: Function called with the invalidated key prefix
+        """
+        while True:
+            pubsub = self.subscriber.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Invalidations published while unsubscribed were missed
+                on_invalidate('')
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self.invalidations += 1
+                        on_invalidate(message['data'].decode('utf-8'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Shared cache invalidation channel failed, resubscribing in {RETRY_INTERVAL}s: {e}")
+                await asyncio.sleep(RETRY_INTERVAL)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self):
+        await self.client.aclose()
+        await self.subscriber.aclose()
+
+    def stats(self):
+        return {
+            'url': self.url,
+            'available': self.available,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'bytes_written': self.bytes_written,
+            'lock_waits': self.lock_waits,
+            'errors': self.errors,
+            'invalidations': self.invalidations,
+        }
+
+
+class CacheEntry:
+    __slots__ = ('value', 'size', 'expires_at', 'stale_until')
+
+    def __init__(self, value, size, expires_at, stale_until):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of endpoint responses.
+
+    Values are stored JSON-encoded (`jsonable_encoder`), so their size is
+    known and they can be returned to FastAPI as is. The cache is local to
+    the worker process and to its event loop; `shared` is an optional
+    SharedTier consulted on local misses.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=32 * 1024 * 1024, stale_ttl=0, enabled=True, shared=None):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.stale_ttl = max(0.0, float(stale_ttl))
+        self.enabled = enabled
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._listener = None
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.loads = 0
+        self.errors = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversized = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+        return entry
+
+    def put(self, key, value, ttl):
+        """
+        Store an encoded value, evicting the least recently used entries
+        until the cache fits its limits.
+
+        Args:
+            key (str): Cache key
+            value: JSON-compatible value
+            ttl (float): Seconds the value stays fresh
+        """
+        size = len(json.dumps(value, separators=(',', ':')))
+        self._remove(key)
+        if size > self.max_bytes:
+            # Would evict everything else and still not fit
+            self.oversized += 1
+            return
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(value, size, now + ttl, now + ttl + self.stale_ttl)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    async def _call(self, loader):
+        self.loads += 1
+        try:
+            return jsonable_encoder(await loader())
+        except Exception:
+            self.errors += 1
+            raise
+
+    async def _load(self, key, loader, ttl):
+        try:
+            if self.shared is not None:
+                return await self._load_shared(key, loader, ttl)
+            value = await self._call(loader)
+            self.put(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load_shared(self, key, loader, ttl):
+        found = await self.shared.get(key)
+        if found is not None:
+            value, fresh_until = found
+            remaining = fresh_until - time.time()
+            if remaining > 0:
+                self.put(key, value, remaining)
+                return value
+
+        locked = await self.shared.lock(key)
+        if not locked:
+            # Another worker is loading the key: serve its stale value
+            # meanwhile, or wait for the one it is about to store
+            if found is None:
+                found = await self.shared.wait(key)
+            if found is not None:
+                value, fresh_until = found
+                self.put(key, value, fresh_until - time.time())
+                return value
+
+        try:
+            value = await self._call(loader)
+            self.put(key, value, ttl)
+            await self.shared.put(key, value, ttl, self.stale_ttl)
+            return value
+        finally:
+            if locked:
+                await self.shared.unlock(key)
+
+    def _start_load(self, key, loader, ttl):
+        # One load per key at a time: later callers await the same task.
+        # The task is not tied to the request that started it, so a client
+        # disconnecting does not cancel the query for the others
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, ttl))
+            self._inflight[key] = task
+            return task, True
+        return task, False
+
+    async def get_or_load(self, key, loader, ttl):
+        """
+        Return the cached value for a key, loading it on a miss.
+
+        Args:
+            key (str): Cache key
+            loader: Coroutine function computing the value
+            ttl (float): Seconds a loaded value stays fresh
+
+        Returns:
+            JSON-compatible value
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry.stale_until > now:
+                # Serve the stale value and refresh it in the background
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                task, started = self._start_load(key, loader, ttl)
+                if started:
+                    self.refreshes += 1
+                    task.add_done_callback(self._log_refresh_error)
+                return entry.value
+            self._remove(key)
+            self.expirations += 1
+
+        self.misses += 1
+        task, started = self._start_load(key, loader, ttl)
+        if not started:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _log_refresh_error(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background cache refresh failed: {task.exception()}")
+
+    def clean_expired(self):
+        """
+        Remove entries past their stale period.
+
+        Returns:
+            int: Number of entries removed
+        """
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry.stale_until <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        """Remove every entry."""
+        self._entries.clear()
+        self.bytes = 0
+
+    def drop(self, prefix=''):
+        """
+        Remove the entries whose key starts with `prefix`.
+
+        Returns:
+            int: Number of entries removed
+        """
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    async def invalidate(self, prefix=''):
+        """
+        Remove the entries whose key starts with `prefix` from this worker
+        and, through the shared tier, from every other worker.
+
+        Returns:
+            int: Number of local entries removed
+        """
+        removed = self.drop(prefix)
+        if self.shared is not None:
+            try:
+                await self.shared.invalidate(prefix)
+            except Exception as e:
+                self.shared._failed('invalidation', e)
+        return removed
+
+    def start(self):
+        """Start listening for invalidations broadcast by the other workers."""
+        if self.shared is not None and self._listener is None:
+            self._listener = asyncio.ensure_future(self.shared.listen(self.drop))
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.shared is not None:
+            await self.shared.close()
+
+    def stats(self):
+        """
+        Return cache counters.
+
+        Returns:
+            dict: Sizes, hits, misses, coalesced misses and evictions
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'loads': self.loads,
+            'errors': self.errors,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'oversized': self.oversized,
+            'in_flight': len(self._inflight),
+            'hit_rate': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            'shared': self.shared.stats() if self.shared is not None else None,
+        }
+
+
+def create_shared_tier():
+    """Return the shared tier configured by CACHE_REDIS_URL, or None."""
+    if not (ENABLE_CACHE and CACHE_REDIS_URL):
+        return None
+    if not REDIS_AVAILABLE:
+        logger.warning("CACHE_REDIS_URL is set but the redis package is not installed, "
+                       "using the in-process cache only")
+        return None
+    return SharedTier(CACHE_REDIS_URL)
+
+
+cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_STALE_TTL, enabled=ENABLE_CACHE,
+                      shared=create_shared_tier())
+
+
+def canonical_params(func, args, kwargs, case_insensitive=()):
+    """
+    Return the normalized parameters of a call, used as its cache key.
+
+    Defaults are filled in and unset parameters (None or empty strings,
+    which the endpoints ignore) are dropped, so `/trends` and
+    `/trends?limit=10&q=` share a key. Parameters in `case_insensitive`
+    are lowercased, as the endpoints do before querying.
+
+    Args:
+        func: Endpoint function
+        args (tuple): Positional arguments of the call
+        kwargs (dict): Keyword arguments of the call
+        case_insensitive (tuple): Names of parameters compared case-insensitively
+
+    Returns:
+        str: JSON object of the parameters with sorted keys
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    params = {}
+    for name, value in bound.arguments.items():
+        if value is None or value == '':
+            continue
+        if name in case_insensitive and isinstance(value, str):
+            value = value.lower()
+        params[name] = value
+    return json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def cached(expiry=None, case_insensitive=(), name=None):
+    """
+    Decorator caching the response of an async endpoint.
+
+    Args:
+        expiry (float): Seconds a response stays fresh (default: CACHE_EXPIRY)
+        case_insensitive (tuple): Names of parameters compared case-insensitively
+        name (str): Key prefix of the endpoint, used to invalidate it
+            (default: the function name)
+    """
+    ttl = expiry or CACHE_EXPIRY or DEFAULT_CACHE_EXPIRY
+
     def decorator(func):
+        prefix = f"{name or func.__name__}:"
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Create a cache key from function name and arguments
-            key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            
-            # Get current time
-            now = time.time()
-            
-            # If key exists in cache and hasn't expired, return cached value
-            if key in cache and cache_expiry.get(key, 0) > now:
-                return cache[key]
-            
-            # Otherwise, call the function and cache the result
-            result = await func(*args, **kwargs)
-            cache[key] = result
-            cache_expiry[key] = now + (expiry or DEFAULT_CACHE_EXPIRY)
-            return result
+            if not cache.enabled:
+                return await func(*args, **kwargs)
+            key = prefix + canonical_params(func, args, kwargs, case_insensitive)
+            return await cache.get_or_load(key, lambda: func(*args, **kwargs), ttl)
         return wrapper
     return decorator
 
+
 def clear_cache():
     """Clear the entire cache."""
     cache.clear()
-    cache_expiry.clear()
+
 
 def clean_expired():
     """Remove expired cache entries."""
-    now = time.time()
-    expired_keys = [k for k, exp in cache_expiry.items() if exp <= now]
-    for key in expired_keys:
-        cache.pop(key, None)
-        cache_expiry.pop(key, None)
+    return cache.clean_expired()
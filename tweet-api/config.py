@@ -10,6 +10,11 @@ load_dotenv()
 # Elasticsearch configuration
 ES_HOST = os.getenv("ES_HOST", "elasticsearch:9200")
 ES_INDEX = os.getenv("ES_INDEX", "tweets")
+ES_MAX_CONNECTIONS = int(os.getenv("ES_MAX_CONNECTIONS", "25"))  # per node and worker
+ES_TIMEOUT = float(os.getenv("ES_TIMEOUT", "10"))  # seconds
+ES_MAX_RETRIES = int(os.getenv("ES_MAX_RETRIES", "2"))
+ES_MAX_RESULT_WINDOW = int(os.getenv("ES_MAX_RESULT_WINDOW", "10000"))  # index.max_result_window
+ES_PIT_KEEP_ALIVE = os.getenv("ES_PIT_KEEP_ALIVE", "1m")  # point in time kept between two pages
 
 # API configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -20,12 +25,33 @@ API_WORKERS = int(os.getenv("API_WORKERS", "1"))
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
 # Caching settings
-ENABLE_CACHE = os.getenv("ENABLE_CACHE", "False").lower() in ("true", "1", "t")
+ENABLE_CACHE = os.getenv("ENABLE_CACHE", "True").lower() in ("true", "1", "t")
 CACHE_EXPIRY = int(os.getenv("CACHE_EXPIRY", "300"))  # 5 minutes
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # 32 MB
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "60"))  # seconds served stale while refreshing
+CACHE_CLEANUP_INTERVAL = int(os.getenv("CACHE_CLEANUP_INTERVAL", "60"))  # seconds
+
+# Shared second tier in a Redis-protocol store, empty to disable: workers
+# and pods then only have their own in-process cache
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+CACHE_REDIS_PREFIX = os.getenv("CACHE_REDIS_PREFIX", "tweet-api:")
+CACHE_REDIS_TIMEOUT = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.25"))  # seconds
+CACHE_REDIS_LOCK_WAIT = float(os.getenv("CACHE_REDIS_LOCK_WAIT", "1"))  # seconds
+
+# Per-endpoint freshness, in seconds: the frequently polled aggregations
+# follow new tweets closely, the region split changes slowly
+CACHE_TTL_TRENDS = int(os.getenv("CACHE_TTL_TRENDS", "30"))
+CACHE_TTL_REGIONS = int(os.getenv("CACHE_TTL_REGIONS", str(CACHE_EXPIRY)))
+CACHE_TTL_SENTIMENT = int(os.getenv("CACHE_TTL_SENTIMENT", "30"))
+CACHE_TTL_MAP_DATA = int(os.getenv("CACHE_TTL_MAP_DATA", "60"))
+CACHE_TTL_DASHBOARD = int(os.getenv("CACHE_TTL_DASHBOARD", "30"))
 
 # Print configuration when module is loaded (useful for debugging containers)
 if __name__ == "__main__":
-    print(f"Elasticsearch: {ES_HOST} (Index: {ES_INDEX})")
+    print(f"Elasticsearch: {ES_HOST} (Index: {ES_INDEX}, Pool: {ES_MAX_CONNECTIONS}, Timeout: {ES_TIMEOUT}s)")
     print(f"API: {API_HOST}:{API_PORT} (Workers: {API_WORKERS})")
     print(f"CORS: {CORS_ORIGINS}")
-    print(f"Cache: {'Enabled' if ENABLE_CACHE else 'Disabled'} (Expiry: {CACHE_EXPIRY}s)")
+    print(f"Cache: {'Enabled' if ENABLE_CACHE else 'Disabled'} (Expiry: {CACHE_EXPIRY}s, "
+          f"Max: {CACHE_MAX_ENTRIES} entries / {CACHE_MAX_BYTES} bytes, Stale: {CACHE_STALE_TTL}s, "
+          f"Shared: {CACHE_REDIS_URL or 'none'})")
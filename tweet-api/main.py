@@ -2,16 +2,37 @@
 FastAPI server for querying tweets from Elasticsearch.
 """
 import os
+import json
+import base64
+import asyncio
+import hashlib
 import logging
+from contextlib import asynccontextmanager
 from typing import List, Optional, Dict, Any
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from elasticsearch import Elasticsearch, NotFoundError, RequestError
+from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
 from pydantic import BaseModel, Field
 from datetime import datetime
 
 # Import configuration
-from config import ES_HOST, ES_INDEX, CORS_ORIGINS, ENABLE_CACHE, CACHE_EXPIRY
+from config import (
+    ES_HOST,
+    ES_INDEX,
+    ES_MAX_CONNECTIONS,
+    ES_TIMEOUT,
+    ES_MAX_RETRIES,
+    ES_MAX_RESULT_WINDOW,
+    ES_PIT_KEEP_ALIVE,
+    CORS_ORIGINS,
+    CACHE_CLEANUP_INTERVAL,
+    CACHE_TTL_TRENDS,
+    CACHE_TTL_REGIONS,
+    CACHE_TTL_SENTIMENT,
+    CACHE_TTL_MAP_DATA,
+    CACHE_TTL_DASHBOARD,
+)
+from cache import cache, cached
 
 # Configure logging
 logging.basicConfig(
@@ -20,11 +41,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Elasticsearch client shared by all requests of this worker, created at startup
+es: Optional[AsyncElasticsearch] = None
+
+def create_es_client():
+    """
+    Create the async Elasticsearch client.
+    
+    Its connection pool (ES_MAX_CONNECTIONS per node) is shared by every
+    request of the worker, so concurrent requests reuse keep-alive
+    connections without blocking the event loop.
+    """
+    hosts = [host.strip() for host in ES_HOST.split(",") if host.strip()]
+    return AsyncElasticsearch(
+        hosts,
+        maxsize=ES_MAX_CONNECTIONS,
+        timeout=ES_TIMEOUT,
+        max_retries=ES_MAX_RETRIES,
+        retry_on_timeout=True
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the Elasticsearch client when the worker starts and close it on shutdown."""
+    global es
+    logger.info(f"Connecting to Elasticsearch at {ES_HOST} (pool of {ES_MAX_CONNECTIONS} connections)")
+    es = create_es_client()
+    
+    # Check if Elasticsearch is available
+    if not await es.ping():
+        logger.error(f"Cannot connect to Elasticsearch at {ES_HOST}")
+    else:
+        logger.info(f"Connected to Elasticsearch at {ES_HOST}")
+    
+    cleanup = None
+    if cache.enabled:
+        cleanup = asyncio.create_task(clean_cache_periodically())
+        cache.start()
+    try:
+        yield
+    finally:
+        if cleanup:
+            cleanup.cancel()
+        await cache.close()
+        await es.close()
+
+async def clean_cache_periodically():
+    """Drop expired cache entries so that unpopular keys do not hold memory until evicted."""
+    while True:
+        await asyncio.sleep(CACHE_CLEANUP_INTERVAL)
+        removed = cache.clean_expired()
+        if removed:
+            logger.debug(f"Removed {removed} expired cache entries")
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Tweet API",
     description="API for querying processed tweets from Elasticsearch",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -36,16 +111,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Elasticsearch client
-logger.info(f"Connecting to Elasticsearch at {ES_HOST}")
-es = Elasticsearch([ES_HOST])
-
-# Check if Elasticsearch is available
-if not es.ping():
-    logger.error(f"Cannot connect to Elasticsearch at {ES_HOST}")
-else:
-    logger.info(f"Connected to Elasticsearch at {ES_HOST}")
-
 # Pydantic models for requests and responses
 class Location(BaseModel):
     lat: float
@@ -76,6 +141,87 @@ class Tweet(BaseModel):
 class TweetResponse(BaseModel):
     total: int
     tweets: List[Tweet]
+    next_cursor: Optional[str] = None
+
+# Field breaking ties between tweets created at the same time, read from
+# the index mapping on first use (see id_sort_field)
+tweet_id_field: Optional[str] = None
+
+def tweet_sort(id_field: str) -> List[Dict[str, Any]]:
+    """Newest first; the id breaks ties, so that every tweet has a unique position to resume after."""
+    return [{"created_at": {"order": "desc"}}, {id_field: {"order": "desc", "unmapped_type": "keyword"}}]
+
+def resolve_id_sort_field(mappings: Dict[str, Any]) -> str:
+    """
+    Pick the sortable field holding the tweet id from index mappings.
+    
+    The processor maps `id` as a keyword. Indices created before it did
+    mapped `id` dynamically as text, which cannot be sorted on, with an
+    `id.keyword` subfield that can.
+    
+    Raises:
+        ValueError: If an index has no sortable id field
+    """
+    field = "id"
+    for name, mapping in mappings.items():
+        id_mapping = mapping.get("mappings", {}).get("properties", {}).get("id")
+        if id_mapping is None or id_mapping.get("type") != "text":
+            continue
+        if id_mapping.get("fields", {}).get("keyword", {}).get("type") != "keyword":
+            raise ValueError(
+                f"Index {name} maps id as text without a keyword subfield, so /tweets cannot page on it: "
+                f"recreate the index (start the processor once with resumable mode off) or reindex it "
+                f"into an index that maps id as a keyword"
+            )
+        field = "id.keyword"
+    return field
+
+async def id_sort_field() -> str:
+    """Return the id field /tweets sorts on, reading the index mapping once."""
+    global tweet_id_field
+    if tweet_id_field is None:
+        tweet_id_field = resolve_id_sort_field(await es.indices.get_mapping(index=ES_INDEX))
+        if tweet_id_field != "id":
+            logger.warning(f"Index {ES_INDEX} maps id as text, sorting /tweets on {tweet_id_field}")
+    return tweet_id_field
+
+def filters_digest(*filters: Optional[str]) -> str:
+    """Short digest of the /tweets filters, binding a cursor to the search that produced it."""
+    return hashlib.blake2b(json.dumps(filters).encode("utf-8"), digest_size=6).hexdigest()
+
+def encode_cursor(sort_values: List[Any], digest: str, pit_id: Optional[str] = None) -> str:
+    """
+    Build the opaque cursor of the page after a hit.
+    
+    Args:
+        sort_values: Sort values of the last hit of the page (created_at, id)
+        digest: Digest of the filters of the search
+        pit_id: Point in time the search runs in, if any
+    
+    Returns:
+        URL-safe cursor string
+    """
+    position = {"s": sort_values, "f": digest}
+    if pit_id:
+        position["p"] = pit_id
+    data = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor built by `encode_cursor`.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(data)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or not isinstance(position.get("s"), list) or not position["s"]:
+        raise ValueError("Invalid cursor")
+    return position
 
 class TrendingHashtag(BaseModel):
     tag: str
@@ -99,11 +245,75 @@ class SentimentSummary(BaseModel):
     neutral: int
     total_analyzed: int
 
+class DashboardResponse(BaseModel):
+    sentiment: SentimentSummary
+    hashtags: List[TrendingHashtag]
+    regions: List[RegionCount]
+    total_analyzed: int
+
+def build_filters(
+    q: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build the filter clauses shared by the aggregation queries.
+    
+    Args:
+        q: Search term in tweet text
+        sentiment: Sentiment label
+        start: Earliest created_at, inclusive
+        end: Latest created_at, inclusive
+    
+    Returns:
+        List of query clauses, all of which must match
+    """
+    filters = []
+    if q:
+        filters.append({"match": {"text": q}})
+    if sentiment:
+        filters.append({"term": {"sentiment.label": sentiment.lower()}})
+    if start or end:
+        created_at = {}
+        if start:
+            created_at["gte"] = start.isoformat()
+        if end:
+            created_at["lte"] = end.isoformat()
+        filters.append({"range": {"created_at": created_at}})
+    return filters
+
+def summarize_sentiment(buckets: List[Dict[str, Any]], total: int) -> SentimentSummary:
+    """Map the buckets of a terms aggregation on sentiment.label to a summary."""
+    counts = {bucket["key"]: bucket["doc_count"] for bucket in buckets}
+    return SentimentSummary(
+        positive=counts.get("positive", 0),
+        negative=counts.get("negative", 0),
+        neutral=counts.get("neutral", 0),
+        total_analyzed=total
+    )
+
 @app.get("/")
 def read_root():
     """API health check endpoint."""
     return {"status": "ok", "service": "Tweet API"}
 
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Response cache counters of this worker."""
+    return cache.stats()
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(
+    endpoint: Optional[str] = Query(None, description="Endpoint to invalidate (trends, regions, sentiment, dashboard, map-data), all if omitted"),
+):
+    """
+    Drop cached responses from every worker.
+    """
+    prefix = f"{endpoint.strip('/')}:" if endpoint else ""
+    removed = await cache.invalidate(prefix)
+    return {"invalidated": endpoint or "all", "local_entries": removed}
+
 @app.get("/tweets", response_model=TweetResponse)
 async def get_tweets(
     q: Optional[str] = Query(None, description="Search term in tweet text"),
@@ -111,11 +321,35 @@ async def get_tweets(
     sentiment: Optional[str] = Query(None, description="Filter by sentiment (positive, negative, neutral)"),
     region: Optional[str] = Query(None, description="Filter by geographic region"),
     limit: int = Query(10, ge=1, le=100, description="Number of results to return"),
-    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    offset: int = Query(0, ge=0, description="Number of results to skip (first pages only, prefer cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    pit: bool = Query(False, description="Page within a point in time, unaffected by tweets indexed meanwhile"),
 ):
     """
     Get tweets with optional filtering.
+    
+    Each page returns `next_cursor` while more tweets may follow; passing it
+    back with the same filters fetches the next page with `search_after`,
+    which costs the same at any depth. With `pit=true` on the first page,
+    the whole traversal runs in one point in time, carried by the cursor.
     """
+    digest = filters_digest(q, hashtag, sentiment, region)
+    position = None
+    if cursor:
+        if offset:
+            raise HTTPException(status_code=400, detail="offset cannot be combined with cursor")
+        try:
+            position = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if position.get("f") != digest:
+            raise HTTPException(status_code=400, detail="Cursor does not match the filters of this search")
+    elif offset + limit > ES_MAX_RESULT_WINDOW:
+        raise HTTPException(
+            status_code=400,
+            detail=f"offset + limit cannot exceed {ES_MAX_RESULT_WINDOW}, use cursor to page deeper"
+        )
+    
     # Build query
     query = {"bool": {"must": []}}
     
@@ -139,22 +373,41 @@ async def get_tweets(
     if not query["bool"]["must"]:
         query = {"match_all": {}}
     
+    body = {
+        "query": query,
+        "size": limit
+    }
+    if position:
+        body["search_after"] = position["s"]
+    else:
+        body["from"] = offset
+    
+    pit_id = position.get("p") if position else None
     try:
-        # Execute search
-        result = es.search(
-            index=ES_INDEX,
-            body={
-                "query": query,
-                "sort": [{"created_at": {"order": "desc"}}],
-                "from": offset,
-                "size": limit
-            }
-        )
+        body["sort"] = tweet_sort(await id_sort_field())
+        if pit and not position:
+            pit_id = (await es.open_point_in_time(index=ES_INDEX, keep_alive=ES_PIT_KEEP_ALIVE))["id"]
+        
+        # Execute search, in the point in time if there is one (the index
+        # is then implied by the point in time)
+        if pit_id:
+            body["pit"] = {"id": pit_id, "keep_alive": ES_PIT_KEEP_ALIVE}
+            result = await es.search(body=body)
+            pit_id = result.get("pit_id", pit_id)
+        else:
+            result = await es.search(index=ES_INDEX, body=body)
         
         # Process results
         hits = result["hits"]["hits"]
         total = result["hits"]["total"]["value"]
         
+        # A full page may be followed by more tweets
+        next_cursor = None
+        if len(hits) == limit:
+            next_cursor = encode_cursor(hits[-1]["sort"], digest, pit_id)
+        elif pit_id:
+            await close_point_in_time(pit_id)
+        
         # Convert Elasticsearch results to Tweet objects
         tweets = []
         for hit in hits:
@@ -167,22 +420,38 @@ async def get_tweets(
                 # Skip invalid tweets
                 continue
         
-        return TweetResponse(total=total, tweets=tweets)
+        return TweetResponse(total=total, tweets=tweets, next_cursor=next_cursor)
     
+    except NotFoundError as e:
+        if pit_id:
+            raise HTTPException(status_code=410, detail="Cursor expired, restart from the first page")
+        logger.error(f"Elasticsearch index not found: {e}")
+        raise HTTPException(status_code=404, detail=f"Index {ES_INDEX} not found")
     except RequestError as e:
         logger.error(f"Elasticsearch request error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        # Index mapping without a sortable id (see resolve_id_sort_field)
+        logger.error(str(e))
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching tweets: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def close_point_in_time(pit_id: str):
+    """Release a point in time at the end of a traversal; it would otherwise expire after ES_PIT_KEEP_ALIVE."""
+    try:
+        await es.close_point_in_time(body={"id": pit_id})
+    except Exception as e:
+        logger.warning(f"Error closing point in time: {e}")
+
 @app.get("/tweets/{tweet_id}", response_model=Tweet)
 async def get_tweet(tweet_id: str):
     """
     Get a specific tweet by ID.
     """
     try:
-        result = es.get(index=ES_INDEX, id=tweet_id)
+        result = await es.get(index=ES_INDEX, id=tweet_id)
         return Tweet(**result["_source"])
     except NotFoundError:
         raise HTTPException(status_code=404, detail=f"Tweet {tweet_id} not found")
@@ -191,6 +460,7 @@ async def get_tweet(tweet_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/trends", response_model=TrendsResponse)
+@cached(expiry=CACHE_TTL_TRENDS, case_insensitive=("q", "sentiment"), name="trends")
 async def get_trends(
     limit: int = Query(10, ge=1, le=50, description="Number of top hashtags to return"),
     q: Optional[str] = Query(None, description="Filter trends by tweet text"),
@@ -200,23 +470,12 @@ async def get_trends(
     Get trending hashtags based on frequency.
     """
     try:
-        # Build query
-        query = {"bool": {"must": []}}
-        
-        # Add text search if provided
-        if q:
-            query["bool"]["must"].append({"match": {"text": q}})
-        
-        # Add sentiment filter if provided
-        if sentiment:
-            query["bool"]["must"].append({"term": {"sentiment.label": sentiment.lower()}})
-        
-        # If no filters, use match_all query
-        if not query["bool"]["must"]:
-            query = {"match_all": {}}
+        # Build query, with the filters of the dashboard
+        filters = build_filters(q, sentiment)
+        query = {"bool": {"filter": filters}} if filters else {"match_all": {}}
         
         # Execute aggregation
-        result = es.search(
+        result = await es.search(
             index=ES_INDEX,
             body={
                 "query": query,
@@ -248,12 +507,13 @@ async def get_trends(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/regions", response_model=RegionsResponse)
+@cached(expiry=CACHE_TTL_REGIONS, name="regions")
 async def get_regions():
     """
     Get tweet counts by geographic region.
     """
     try:
-        result = es.search(
+        result = await es.search(
             index=ES_INDEX,
             body={
                 "size": 0,
@@ -284,12 +544,13 @@ async def get_regions():
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/sentiment", response_model=SentimentSummary)
+@cached(expiry=CACHE_TTL_SENTIMENT, name="sentiment")
 async def get_sentiment_summary():
     """
     Get sentiment distribution summary.
     """
     try:
-        result = es.search(
+        result = await es.search(
             index=ES_INDEX,
             body={
                 "size": 0,
@@ -308,32 +569,72 @@ async def get_sentiment_summary():
         buckets = result["aggregations"]["sentiment"]["buckets"]
         total = result["hits"]["total"]["value"]
         
-        # Initialize counts
-        positive = 0
-        negative = 0
-        neutral = 0
+        return summarize_sentiment(buckets, total)
+    
+    except Exception as e:
+        logger.error(f"Error fetching sentiment summary: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/dashboard", response_model=DashboardResponse)
+@cached(expiry=CACHE_TTL_DASHBOARD, case_insensitive=("q", "sentiment"), name="dashboard")
+async def get_dashboard(
+    q: Optional[str] = Query(None, description="Filter by tweet text"),
+    sentiment: Optional[str] = Query(None, description="Filter by sentiment"),
+    start: Optional[datetime] = Query(None, description="Earliest tweet creation time (ISO 8601)"),
+    end: Optional[datetime] = Query(None, description="Latest tweet creation time (ISO 8601)"),
+    hashtag_limit: int = Query(10, ge=1, le=50, description="Number of top hashtags to return"),
+    region_limit: int = Query(10, ge=1, le=50, description="Number of regions to return"),
+):
+    """
+    Get the sentiment, hashtag and region breakdowns of the dashboard.
+    
+    The three breakdowns are sibling aggregations of one search, so the
+    filters apply identically to all of them and the index is scanned once.
+    """
+    filters = build_filters(q, sentiment, start, end)
+    query = {"bool": {"filter": filters}} if filters else {"match_all": {}}
+    
+    try:
+        result = await es.search(
+            index=ES_INDEX,
+            body={
+                "query": query,
+                "size": 0,
+                # Exact total, the denominator of the dashboard percentages
+                "track_total_hits": True,
+                "aggs": {
+                    "sentiment": {"terms": {"field": "sentiment.label", "size": 3}},
+                    "hashtags": {"terms": {"field": "hashtags", "size": hashtag_limit}},
+                    "regions": {"terms": {"field": "region", "size": region_limit}}
+                }
+            }
+        )
         
-        # Map bucket key to count
-        for bucket in buckets:
-            if bucket["key"] == "positive":
-                positive = bucket["doc_count"]
-            elif bucket["key"] == "negative":
-                negative = bucket["doc_count"]
-            elif bucket["key"] == "neutral":
-                neutral = bucket["doc_count"]
+        aggregations = result["aggregations"]
+        total = result["hits"]["total"]["value"]
         
-        return SentimentSummary(
-            positive=positive,
-            negative=negative,
-            neutral=neutral,
+        return DashboardResponse(
+            sentiment=summarize_sentiment(aggregations["sentiment"]["buckets"], total),
+            hashtags=[
+                TrendingHashtag(tag=bucket["key"], count=bucket["doc_count"])
+                for bucket in aggregations["hashtags"]["buckets"]
+            ],
+            regions=[
+                RegionCount(region=bucket["key"], count=bucket["doc_count"])
+                for bucket in aggregations["regions"]["buckets"]
+            ],
             total_analyzed=total
         )
     
+    except RequestError as e:
+        logger.error(f"Elasticsearch request error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error fetching sentiment summary: {e}")
+        logger.error(f"Error fetching dashboard: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/map-data")
+@cached(expiry=CACHE_TTL_MAP_DATA, case_insensitive=("sentiment", "hashtag"), name="map-data")
 async def get_map_data(
     sentiment: Optional[str] = Query(None, description="Filter by sentiment"),
     hashtag: Optional[str] = Query(None, description="Filter by hashtag"),
@@ -355,7 +656,7 @@ async def get_map_data(
             query["bool"]["must"].append({"term": {"sentiment.label": sentiment.lower()}})
         
         # Execute search
-        result = es.search(
+        result = await es.search(
             index=ES_INDEX,
             body={
                 "query": query,
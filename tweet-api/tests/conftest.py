@@ -0,0 +1,19 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+
+@pytest.fixture(scope='session')
+def api_main():
+    """The API's main module, loaded under its own name since the other services also have a main.py."""
+    if 'api_main' not in sys.modules:
+        spec = importlib.util.spec_from_file_location('api_main', os.path.join(API_DIR, 'main.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['api_main'] = module
+        spec.loader.exec_module(module)
+    return sys.modules['api_main']
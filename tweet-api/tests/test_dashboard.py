@@ -0,0 +1,104 @@
+import pytest
+from elasticsearch import RequestError
+from fastapi.testclient import TestClient
+
+
+def buckets(*pairs):
+    return {'buckets': [{'key': key, 'doc_count': count} for key, count in pairs]}
+
+
+class FakeElasticsearch:
+    """Answers every search with the same aggregations, recording the requests."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.searches = []
+
+    async def search(self, body, index=None):
+        self.searches.append({'index': index, 'body': body})
+        if self.error is not None:
+            raise self.error
+        return {
+            'hits': {'total': {'value': 120}, 'hits': []},
+            'aggregations': {
+                'sentiment': buckets(('positive', 70), ('neutral', 40), ('negative', 10)),
+                'hashtags': buckets(('ai', 50), ('cloud', 20)),
+                'regions': buckets(('Europe', 80)),
+            },
+        }
+
+
+@pytest.fixture
+def es(api_main, monkeypatch):
+    fake = FakeElasticsearch()
+    monkeypatch.setattr(api_main, 'es', fake)
+    api_main.cache.clear()
+    yield fake
+    api_main.cache.clear()
+
+
+@pytest.fixture
+def client(api_main):
+    # Without a context manager, so that the lifespan does not connect to Elasticsearch
+    return TestClient(api_main.app)
+
+
+def test_dashboard_is_one_search_with_three_aggregations(client, es, api_main):
+    response = client.get('/dashboard', params={'hashtag_limit': 5})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        'sentiment': {'positive': 70, 'negative': 10, 'neutral': 40, 'total_analyzed': 120},
+        'hashtags': [{'tag': 'ai', 'count': 50}, {'tag': 'cloud', 'count': 20}],
+        'regions': [{'region': 'Europe', 'count': 80}],
+        'total_analyzed': 120,
+    }
+    (search,) = es.searches
+    body = search['body']
+    assert search['index'] == api_main.ES_INDEX
+    assert body['size'] == 0 and body['track_total_hits'] is True
+    assert body['query'] == {'match_all': {}}
+    assert set(body['aggs']) == {'sentiment', 'hashtags', 'regions'}
+    assert body['aggs']['hashtags']['terms']['size'] == 5
+    assert body['aggs']['regions']['terms']['size'] == 10
+
+
+def test_filters_apply_to_every_breakdown(client, es):
+    client.get('/dashboard', params={
+        'q': 'kafka', 'sentiment': 'Positive', 'start': '2024-01-01T00:00:00', 'end': '2024-01-02T00:00:00',
+    })
+
+    body = es.searches[0]['body']
+    assert body['query'] == {'bool': {'filter': [
+        {'match': {'text': 'kafka'}},
+        {'term': {'sentiment.label': 'positive'}},
+        {'range': {'created_at': {'gte': '2024-01-01T00:00:00', 'lte': '2024-01-02T00:00:00'}}},
+    ]}}
+    assert all('filter' not in aggregation for aggregation in body['aggs'].values())
+
+
+def test_dashboard_responses_are_cached(client, es, api_main):
+    if not api_main.cache.enabled:
+        pytest.skip('response cache disabled')
+    client.get('/dashboard', params={'sentiment': 'positive'})
+    client.get('/dashboard', params={'sentiment': 'POSITIVE'})
+    assert len(es.searches) == 1
+
+    client.get('/dashboard', params={'sentiment': 'negative'})
+    assert len(es.searches) == 2
+
+
+@pytest.mark.parametrize('error, status', [
+    (RequestError(400, 'search_phase_execution_exception', {}), 400),
+    (ConnectionError('down'), 500),
+])
+def test_search_errors(client, es, error, status):
+    es.error = error
+
+    assert client.get('/dashboard').status_code == status
+
+
+def test_limits_are_validated(client, es):
+    assert client.get('/dashboard', params={'region_limit': 0}).status_code == 422
+    assert client.get('/dashboard', params={'hashtag_limit': 51}).status_code == 422
+    assert es.searches == []
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pytest
+
+from cache import ResponseCache
+
+
+def size_of(value):
+    return len(json.dumps(value, separators=(',', ':')))
+
+
+def counting_loader(value, delay=0.01):
+    calls = []
+
+    async def loader():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+    return loader, calls
+
+
+def test_concurrent_misses_load_once():
+    cache = ResponseCache()
+    loader, calls = counting_loader({'total': 1})
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load('trends', loader, ttl=60) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+
+    assert results == [{'total': 1}] * 10
+    assert len(calls) == 1
+    assert cache.misses == 10
+    assert cache.coalesced == 9
+    assert cache.loads == 1
+
+
+def test_fresh_entries_are_hits():
+    cache = ResponseCache()
+    loader, calls = counting_loader('value', delay=0)
+
+    async def scenario():
+        await cache.get_or_load('key', loader, ttl=60)
+        return await cache.get_or_load('key', loader, ttl=60)
+
+    assert asyncio.run(scenario()) == 'value'
+    assert len(calls) == 1
+    assert cache.hits == 1
+
+
+def test_failed_loads_are_not_cached():
+    cache = ResponseCache()
+
+    async def failing():
+        raise RuntimeError('elasticsearch down')
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load('key', failing, ttl=60) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.errors == 1
+    assert len(cache) == 0
+
+
+def test_stale_value_is_served_while_refreshing():
+    cache = ResponseCache(stale_ttl=60)
+    cache.put('key', 'old', ttl=0)
+    loader, calls = counting_loader('new')
+
+    async def scenario():
+        first = await asyncio.gather(*(cache.get_or_load('key', loader, ttl=60) for _ in range(3)))
+        await asyncio.gather(*cache._inflight.values())
+        return first, await cache.get_or_load('key', loader, ttl=60)
+
+    stale, refreshed = asyncio.run(scenario())
+
+    assert stale == ['old', 'old', 'old']
+    assert refreshed == 'new'
+    assert len(calls) == 1
+    assert cache.stale_hits == 3
+    assert cache.refreshes == 1
+    assert cache.hits == 1
+
+
+def test_expired_values_are_reloaded():
+    cache = ResponseCache(stale_ttl=0)
+    cache.put('key', 'old', ttl=0)
+    loader, calls = counting_loader('new', delay=0)
+
+    assert asyncio.run(cache.get_or_load('key', loader, ttl=60)) == 'new'
+    assert cache.expirations == 1
+    assert cache.stale_hits == 0
+
+
+def test_eviction_is_bounded_by_bytes():
+    value = 'x' * 98
+    cache = ResponseCache(max_entries=100, max_bytes=3 * size_of(value))
+    loader, _ = counting_loader(None, delay=0)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, value, ttl=60)
+
+    # Touch "a" so that "b" is the least recently used
+    asyncio.run(cache.get_or_load('a', loader, ttl=60))
+    cache.put('d', value, ttl=60)
+
+    assert sorted(cache._entries) == ['a', 'c', 'd']
+    assert cache.bytes == 3 * size_of(value)
+    assert cache.evictions == 1
+
+    cache.put('e', 'x' * 298, ttl=60)
+    assert len(cache) == 1
+    assert cache.bytes == size_of('x' * 298)
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = ResponseCache()
+    cache.put('key', 'x' * 10, ttl=60)
+    cache.put('key', 'x' * 20, ttl=60)
+
+    assert len(cache) == 1
+    assert cache.bytes == size_of('x' * 20)
+
+
+def test_oversized_values_are_not_cached():
+    cache = ResponseCache(max_bytes=50)
+    cache.put('small', 'x', ttl=60)
+    cache.put('large', 'x' * 100, ttl=60)
+
+    assert 'large' not in cache._entries
+    assert 'small' in cache._entries
+    assert cache.oversized == 1
+
+
+@pytest.mark.parametrize('max_entries', [1, 2])
+def test_eviction_is_bounded_by_entries(max_entries):
+    cache = ResponseCache(max_entries=max_entries)
+    for key in range(5):
+        cache.put(str(key), key, ttl=60)
+
+    assert len(cache) == max_entries
+    assert cache.evictions == 5 - max_entries
@@ -0,0 +1,210 @@
+import base64
+
+import pytest
+from elasticsearch.exceptions import NotFoundError
+from fastapi.testclient import TestClient
+
+
+def tweet(i):
+    return {
+        'id': f'{i:04d}',
+        'text': f'tweet {i}',
+        'user': {'id': i, 'screen_name': f'user{i}', 'followers_count': 0},
+        'created_at': f'2024-01-01T00:{i // 60:02d}:{i % 60:02d}',
+        'sentiment': {'polarity': 0.0, 'subjectivity': 0.0, 'label': 'neutral'},
+    }
+
+
+KEYWORD_ID = {'type': 'keyword'}
+DYNAMIC_ID = {'type': 'text', 'fields': {'keyword': {'type': 'keyword', 'ignore_above': 256}}}
+
+
+class FakeIndices:
+    def __init__(self, id_mapping):
+        self.id_mapping = id_mapping
+        self.mapping_requests = 0
+
+    async def get_mapping(self, index):
+        self.mapping_requests += 1
+        return {index: {'mappings': {'properties': {'id': self.id_mapping}}}}
+
+
+class FakeElasticsearch:
+    """Sorted search with from/size, search_after and points in time over a list of tweets."""
+
+    def __init__(self, count, id_mapping=KEYWORD_ID):
+        self.docs = sorted((tweet(i) for i in range(count)),
+                           key=lambda doc: (doc['created_at'], doc['id']), reverse=True)
+        self.indices = FakeIndices(id_mapping)
+        self.searches = []
+        self.open_pits = set()
+        self.closed_pits = []
+
+    async def open_point_in_time(self, index, keep_alive):
+        pit_id = f'pit-{len(self.open_pits) + len(self.closed_pits)}'
+        self.open_pits.add(pit_id)
+        return {'id': pit_id}
+
+    async def close_point_in_time(self, body):
+        self.open_pits.discard(body['id'])
+        self.closed_pits.append(body['id'])
+
+    async def search(self, body, index=None):
+        self.searches.append({'index': index, 'body': body})
+        pit_id = body.get('pit', {}).get('id')
+        if pit_id is not None and pit_id not in self.open_pits:
+            raise NotFoundError(404, 'search_context_missing_exception', {})
+        docs = self.docs
+        if 'search_after' in body:
+            after = tuple(body['search_after'])
+            docs = [doc for doc in docs if (doc['created_at'], doc['id']) < after]
+        else:
+            docs = docs[body.get('from', 0):]
+        hits = [{'_source': doc, 'sort': [doc['created_at'], doc['id']]} for doc in docs[:body['size']]]
+        result = {'hits': {'total': {'value': len(self.docs)}, 'hits': hits}}
+        if pit_id is not None:
+            result['pit_id'] = pit_id
+        return result
+
+
+@pytest.fixture
+def es(api_main, monkeypatch):
+    fake = FakeElasticsearch(25)
+    monkeypatch.setattr(api_main, 'es', fake)
+    monkeypatch.setattr(api_main, 'tweet_id_field', None)
+    return fake
+
+
+@pytest.fixture
+def client(api_main):
+    # Without a context manager, so that the lifespan does not connect to Elasticsearch
+    return TestClient(api_main.app)
+
+
+def walk(client, **params):
+    pages = []
+    response = client.get('/tweets', params=params)
+    while True:
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page)
+        if not page['next_cursor']:
+            return pages
+        response = client.get('/tweets', params={**params, 'cursor': page['next_cursor']})
+
+
+def test_cursor_round_trip(api_main):
+    digest = api_main.filters_digest('kafka', None, 'positive', None)
+    cursor = api_main.encode_cursor(['2024-01-01T00:00:00', '0042'], digest, 'pit-1')
+
+    assert '=' not in cursor
+    assert api_main.decode_cursor(cursor) == {'s': ['2024-01-01T00:00:00', '0042'], 'f': digest, 'p': 'pit-1'}
+
+
+def test_filters_digest_depends_on_every_filter(api_main):
+    assert api_main.filters_digest('a', None) == api_main.filters_digest('a', None)
+    assert api_main.filters_digest('a', None) != api_main.filters_digest(None, 'a')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!',
+    base64.urlsafe_b64encode(b'[1, 2]').decode('ascii'),
+    base64.urlsafe_b64encode(b'{"f": "x"}').decode('ascii'),
+])
+def test_decode_cursor_rejects_garbage(api_main, cursor):
+    with pytest.raises(ValueError):
+        api_main.decode_cursor(cursor)
+
+
+def test_cursor_walks_every_tweet_once(client, es):
+    pages = walk(client, limit=10)
+
+    ids = [tweet['id'] for page in pages for tweet in page['tweets']]
+    assert [len(page['tweets']) for page in pages] == [10, 10, 5]
+    assert ids == [doc['id'] for doc in es.docs]
+    assert 'from' in es.searches[0]['body']
+    assert es.searches[1]['body']['search_after'] == [es.docs[9]['created_at'], es.docs[9]['id']]
+
+
+def test_point_in_time_is_carried_by_the_cursor_and_closed(client, es):
+    pages = walk(client, limit=10, pit=True)
+
+    assert sum(len(page['tweets']) for page in pages) == 25
+    assert all(search['body']['pit']['id'] == 'pit-0' for search in es.searches)
+    assert all(search['index'] is None for search in es.searches)
+    assert es.closed_pits == ['pit-0']
+
+
+def test_bad_cursor_is_rejected(client, es):
+    response = client.get('/tweets', params={'cursor': 'not a cursor!'})
+
+    assert response.status_code == 400
+    assert es.searches == []
+
+
+def test_cursor_of_other_filters_is_rejected(client, es):
+    cursor = client.get('/tweets', params={'limit': 10, 'hashtag': 'kafka'}).json()['next_cursor']
+
+    response = client.get('/tweets', params={'limit': 10, 'hashtag': 'flink', 'cursor': cursor})
+
+    assert response.status_code == 400
+    assert len(es.searches) == 1
+
+
+def test_offset_cannot_be_combined_with_cursor(client, es):
+    cursor = client.get('/tweets', params={'limit': 10}).json()['next_cursor']
+
+    response = client.get('/tweets', params={'limit': 10, 'offset': 10, 'cursor': cursor})
+
+    assert response.status_code == 400
+
+
+def test_offset_beyond_the_result_window_is_rejected(api_main, client, es):
+    response = client.get('/tweets', params={'limit': 10, 'offset': api_main.ES_MAX_RESULT_WINDOW - 5})
+
+    assert response.status_code == 400
+    assert es.searches == []
+
+
+def test_expired_point_in_time_is_gone(client, es):
+    cursor = client.get('/tweets', params={'limit': 10, 'pit': True}).json()['next_cursor']
+    es.open_pits.clear()
+
+    response = client.get('/tweets', params={'limit': 10, 'cursor': cursor})
+
+    assert response.status_code == 410
+
+
+def test_missing_index_without_point_in_time_is_not_found(client, es):
+    async def search(body, index=None):
+        raise NotFoundError(404, 'index_not_found_exception', {})
+    es.search = search
+
+    assert client.get('/tweets').status_code == 404
+
+
+def test_sorts_on_the_id_keyword(client, es):
+    client.get('/tweets')
+    client.get('/tweets')
+
+    assert es.searches[0]['body']['sort'][1] == {'id': {'order': 'desc', 'unmapped_type': 'keyword'}}
+    assert es.indices.mapping_requests == 1
+
+
+def test_sorts_on_the_keyword_subfield_of_a_dynamic_id(client, es):
+    es.indices.id_mapping = DYNAMIC_ID
+
+    pages = walk(client, limit=10)
+
+    assert sum(len(page['tweets']) for page in pages) == 25
+    assert all('id.keyword' in search['body']['sort'][1] for search in es.searches)
+
+
+def test_text_id_without_keyword_asks_for_a_reindex(client, es):
+    es.indices.id_mapping = {'type': 'text'}
+
+    response = client.get('/tweets')
+
+    assert response.status_code == 500
+    assert 'reindex' in response.json()['detail']
+    assert es.searches == []
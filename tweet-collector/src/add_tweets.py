@@ -54,40 +54,49 @@ NEUTRAL_PHRASES = [
     "Updates on"
 ]
 
-def generate_tweet(tweet_id):
-    """Generate a random tweet with specified ID and varied sentiment."""
-    lat, lon = random.choice(LOCATIONS)
-    lat += random.uniform(-0.1, 0.1)  # Add some randomness
-    lon += random.uniform(-0.1, 0.1)
+def generate_tweet(tweet_id, hashtags=None, location=None, extra_words=None, rng=None):
+    """
+    Generate a random tweet with specified ID and varied sentiment.
     
-    tweet_hashtags = random.sample(HASHTAGS, random.randint(1, 3))
+    Hashtags and location are drawn uniformly unless given; `extra_words`
+    are appended to the text (the load generator uses them to vary its length).
+    Every draw comes from `rng` (a random.Random), or the `random` module.
+    """
+    rng = rng or random
+    lat, lon = location or rng.choice(LOCATIONS)
+    lat += rng.uniform(-0.1, 0.1)  # Add some randomness
+    lon += rng.uniform(-0.1, 0.1)
+    
+    tweet_hashtags = list(hashtags) if hashtags else rng.sample(HASHTAGS, rng.randint(1, 3))
     
     # Choose sentiment randomly with equal probability
-    sentiment_type = random.choice(["positive", "negative", "neutral"])
+    sentiment_type = rng.choice(["positive", "negative", "neutral"])
     
     if sentiment_type == "positive":
-        phrase = random.choice(POSITIVE_PHRASES)
+        phrase = rng.choice(POSITIVE_PHRASES)
     elif sentiment_type == "negative":
-        phrase = random.choice(NEGATIVE_PHRASES)
+        phrase = rng.choice(NEGATIVE_PHRASES)
     else:
-        phrase = random.choice(NEUTRAL_PHRASES)
+        phrase = rng.choice(NEUTRAL_PHRASES)
     
     # Create tweet text with the chosen sentiment phrase
     text = f"{phrase} #{' #'.join(tweet_hashtags)} - what do you think?"
+    if extra_words:
+        text = f"{text} {' '.join(extra_words)}"
     
     return {
         "id": tweet_id,
         "text": text,
         "user": {
-            "id": random.randint(1000, 9999),
-            "screen_name": f"user_{random.randint(1000, 9999)}",
-            "followers_count": random.randint(1, 10000)
+            "id": rng.randint(1000, 9999),
+            "screen_name": f"user_{rng.randint(1000, 9999)}",
+            "followers_count": rng.randint(1, 10000)
         },
         "created_at": datetime.now().isoformat(),
         "location": {"lat": lat, "lon": lon},
         "hashtags": tweet_hashtags,
-        "retweet_count": random.randint(0, 100),
-        "favorite_count": random.randint(0, 200)
+        "retweet_count": rng.randint(0, 100),
+        "favorite_count": rng.randint(0, 200)
     }
 
 def add_tweets(url=None, num_tweets=5):
@@ -0,0 +1,288 @@
+"""
+Asynchronous collector polling several tweet sources concurrently.
+
+Each source is polled by its own task over one pooled aiohttp session, with
+a poll interval that adapts to the source: it shrinks while new tweets
+arrive and backs off while the source is idle or failing. Per-source state
+(cursor, sent ids, checkpoint) is kept by a TweetCollector, and all sources
+share one Kafka producer.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+
+import aiohttp
+
+from collector import TweetCollector, DEFAULT_REQUEST_TIMEOUT
+from kafka_producer import TweetKafkaProducer
+from checkpoint import DEFAULT_CHECKPOINT_FILE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE_NAME = 'default'
+DEFAULT_MIN_POLLING_INTERVAL = 1  # seconds
+DEFAULT_MAX_POLLING_INTERVAL = 60  # seconds
+DEFAULT_POLLING_BACKOFF = 2.0
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_STATS_INTERVAL = 60  # seconds
+POLLING_JITTER = 0.1
+
+
+class AdaptiveInterval:
+    """
+    Poll interval of one source, between `min_interval` and `max_interval`.
+
+    A poll that finds new tweets divides the interval by `backoff`; an idle
+    or failed poll multiplies it by `backoff`. Delays are jittered so that
+    sources started together do not poll in lockstep.
+    """
+
+    def __init__(self, min_interval=DEFAULT_MIN_POLLING_INTERVAL, max_interval=DEFAULT_MAX_POLLING_INTERVAL,
+                 backoff=DEFAULT_POLLING_BACKOFF):
+        self.min_interval = max(0.01, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.backoff = max(1.0, float(backoff))
+        self.interval = self.min_interval
+
+    def record(self, new_count, error=False):
+        """
+        Adapt the interval to the outcome of a poll.
+
+        Args:
+            new_count (int): Tweets sent by the poll
+            error (bool): True if the poll failed
+
+        Returns:
+            float: The new interval in seconds
+        """
+        if error or not new_count:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        else:
+            self.interval = max(self.min_interval, self.interval / self.backoff)
+        return self.interval
+
+    def delay(self):
+        """Return the jittered delay before the next poll."""
+        return self.interval * random.uniform(1 - POLLING_JITTER, 1 + POLLING_JITTER)
+
+
+class SourcePoller:
+    """Polling task state of one source."""
+
+    def __init__(self, name, collector, interval):
+        self.name = name
+        self.collector = collector
+        self.interval = interval
+        self.polls = 0
+        self.errors = 0
+        self.sent = 0
+        self.paused = 0
+        self.last_poll_seconds = 0.0
+
+    def stats(self):
+        return {
+            'url': self.collector.db_url,
+            'polls': self.polls,
+            'errors': self.errors,
+            'sent': self.sent,
+            'paused': self.paused,
+            'last_id': self.collector.last_id,
+            'interval': round(self.interval.interval, 3),
+            'last_poll_ms': round(self.last_poll_seconds * 1000, 1),
+        }
+
+
+class AsyncTweetCollector:
+    def __init__(self, config=None, producer=None):
+        if config and 'collector' in config:
+            section = config['collector']
+            self.min_interval = section.getfloat('min_polling_interval', DEFAULT_MIN_POLLING_INTERVAL)
+            self.max_interval = section.getfloat('max_polling_interval', DEFAULT_MAX_POLLING_INTERVAL)
+            self.backoff = section.getfloat('polling_backoff', DEFAULT_POLLING_BACKOFF)
+            self.request_timeout = section.getfloat('request_timeout', DEFAULT_REQUEST_TIMEOUT)
+            self.max_connections = section.getint('max_connections', DEFAULT_MAX_CONNECTIONS)
+            self.stats_interval = section.getfloat('stats_interval', DEFAULT_STATS_INTERVAL)
+            checkpoint_file = section.get('checkpoint_file', DEFAULT_CHECKPOINT_FILE)
+        else:
+            self.min_interval = float(os.environ.get('MIN_POLLING_INTERVAL', DEFAULT_MIN_POLLING_INTERVAL))
+            self.max_interval = float(os.environ.get('MAX_POLLING_INTERVAL', DEFAULT_MAX_POLLING_INTERVAL))
+            self.backoff = float(os.environ.get('POLLING_BACKOFF', DEFAULT_POLLING_BACKOFF))
+            self.request_timeout = float(os.environ.get('REQUEST_TIMEOUT', DEFAULT_REQUEST_TIMEOUT))
+            self.max_connections = int(os.environ.get('MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS))
+            self.stats_interval = float(os.environ.get('STATS_INTERVAL', DEFAULT_STATS_INTERVAL))
+            checkpoint_file = os.environ.get('CHECKPOINT_FILE', DEFAULT_CHECKPOINT_FILE)
+
+        sources = load_sources(config)
+        self.producer = producer or TweetKafkaProducer()
+        self.pollers = []
+        for name, url in sources:
+            # A single source keeps the configured checkpoint file, so switching
+            # between the sync and async collectors resumes where it stopped
+            if checkpoint_file and len(sources) > 1:
+                root, ext = os.path.splitext(checkpoint_file)
+                source_checkpoint = f"{root}-{name}{ext}"
+            else:
+                source_checkpoint = checkpoint_file
+            collector = TweetCollector(config, db_url=url, producer=self.producer,
+                                       checkpoint_file=source_checkpoint)
+            interval = AdaptiveInterval(self.min_interval, self.max_interval, self.backoff)
+            self.pollers.append(SourcePoller(name, collector, interval))
+        self.session = None
+
+    def _create_session(self):
+        # One pooled session for every source: connections are reused across
+        # polls, and each request is bounded by the timeout
+        connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def _fetch(self, poller, params=None):
+        # Raises on errors, so that a failed poll backs off
+        async with self.session.get(poller.collector.db_url, params=params) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            return await response.json(content_type=None)
+
+    async def _send(self, poller, tweets):
+        # Filter and send one page; sending blocks on the Kafka flush, so it
+        # runs in a thread while the other sources keep polling
+        collector = poller.collector
+        ids = []
+        skipped = []
+        rejected = []
+        new_tweets = list(collector.new_tweets(tweets, ids, skipped))
+        delivered = await asyncio.to_thread(collector.producer.send_batch, new_tweets, rejected) if new_tweets else []
+        # The checkpoint is saved once per poll, see poll()
+        new_count = collector.record_delivery(ids, delivered, skipped, rejected, save=False)
+        return new_count, new_count + len(rejected) >= len(ids)
+
+    async def poll(self, poller):
+        """
+        Poll a source once and send its new tweets, page by page.
+
+        The checkpoint is saved once at the end of the poll, even if it
+        fails, in a thread: serializing the Bloom filters and the fsync
+        would otherwise stall the other sources.
+
+        Returns:
+            int: Number of tweets sent
+        """
+        collector = poller.collector
+        try:
+            return await self._poll_pages(poller)
+        finally:
+            if collector.unsaved_changes:
+                await asyncio.to_thread(collector.save_checkpoint)
+
+    async def _poll_pages(self, poller):
+        collector = poller.collector
+        if not collector.incremental:
+            tweets = await self._fetch(poller)
+            new_count, _ = await self._send(poller, tweets)
+            return new_count
+
+        cursor = collector.start_cursor()
+        new_count = 0
+        while True:
+            if self.producer.is_full():
+                # Backpressure: the rest is fetched once Kafka catches up
+                return new_count
+            page = await self._fetch(poller, collector.page_params(cursor))
+            if not page:
+                return new_count
+            sent, complete = await self._send(poller, page)
+            new_count += sent
+            if not complete:
+                # last_id stops before the failed tweet: later pages would
+                # only be fetched again on the next poll
+                raise RuntimeError(f"{new_count} tweets sent before a Kafka delivery failure")
+            cursor = collector.next_cursor(cursor, page)
+            if cursor is None:
+                return new_count
+
+    async def _run_source(self, poller):
+        while True:
+            if self.producer.is_full():
+                # Pause polls while the in-flight window is full; the
+                # interval backs off as for an idle source
+                poller.paused += 1
+                poller.interval.record(0)
+                logger.warning(f"Source {poller.name}: Kafka in-flight window full, pausing polls")
+                await asyncio.sleep(poller.interval.delay())
+                continue
+            start = time.perf_counter()
+            try:
+                new_count = await self.poll(poller)
+                poller.sent += new_count
+                poller.interval.record(new_count)
+                if new_count:
+                    logger.info(f"Source {poller.name}: sent {new_count} new tweets")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                poller.errors += 1
+                poller.interval.record(0, error=True)
+                logger.error(f"Source {poller.name}: poll failed: {e}")
+            poller.polls += 1
+            poller.last_poll_seconds = time.perf_counter() - start
+            await asyncio.sleep(poller.interval.delay())
+
+    async def _log_stats(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            logger.info(f"Collector stats: {self.stats()}")
+
+    def stats(self):
+        return {
+            'sources': {poller.name: poller.stats() for poller in self.pollers},
+            'producer': self.producer.stats(),
+        }
+
+    async def run_async(self):
+        logger.info(
+            f"Starting async tweet collector with {len(self.pollers)} sources "
+            f"(interval {self.min_interval}-{self.max_interval}s, timeout {self.request_timeout}s, "
+            f"{self.max_connections} connections)"
+        )
+        self.session = self._create_session()
+        tasks = [asyncio.create_task(self._run_source(poller), name=f"source-{poller.name}")
+                 for poller in self.pollers]
+        if self.stats_interval > 0:
+            tasks.append(asyncio.create_task(self._log_stats()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.session.close()
+
+    def run(self):
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("Stopping tweet collector...")
+
+
+def load_sources(config=None):
+    """
+    Return the (name, url) pairs of the sources to poll.
+
+    Sources come from the [sources] section of config.ini (name = url), or
+    from DB_URLS, a comma-separated list of urls or name=url pairs. Without
+    either, the single source is DB_URL.
+    """
+    if config and config.has_section('sources'):
+        # Skip the [DEFAULT] values configparser copies into every section
+        sources = [(name, url) for name, url in config.items('sources') if name not in config.defaults()]
+        if sources:
+            return sources
+
+    sources = []
+    for index, entry in enumerate(filter(None, (e.strip() for e in os.environ.get('DB_URLS', '').split(',')))):
+        name, separator, url = entry.partition('=')
+        if not separator:
+            name, url = f"source{index + 1}", entry
+        sources.append((name.strip(), url.strip()))
+    return sources or [(DEFAULT_SOURCE_NAME, os.environ.get('DB_URL', 'http://json-server/tweets'))]
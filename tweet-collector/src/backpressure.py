@@ -0,0 +1,133 @@
+"""
+Flow control for the collector's Kafka sends: a bounded window of
+unacknowledged messages and a token-bucket rate limiter.
+"""
+import threading
+import time
+
+DEFAULT_MAX_IN_FLIGHT = 10000
+DEFAULT_MAX_IN_FLIGHT_BYTES = 16 * 1024 * 1024  # 16 MB
+DEFAULT_SEND_RATE = 0  # tweets/sec, 0 for unlimited
+DEFAULT_BLOCK_TIMEOUT = 5.0  # seconds
+
+
+class InFlightWindow:
+    """
+    Messages sent to Kafka and not acknowledged yet, bounded by count and
+    by bytes.
+
+    `acquire` reserves room for a message before it is sent and blocks
+    while the window is full; the producer callbacks `release` it once the
+    broker acknowledges or rejects the message. When the broker slows down
+    the window fills, sends block, and the collector stops fetching, so
+    memory stays bounded however large the backlog is.
+    """
+
+    def __init__(self, max_count=DEFAULT_MAX_IN_FLIGHT, max_bytes=DEFAULT_MAX_IN_FLIGHT_BYTES):
+        self.max_count = max(1, int(max_count))
+        self.max_bytes = max(1, int(max_bytes))
+        self.count = 0
+        self.bytes = 0
+        self.blocked_count = 0
+        self._condition = threading.Condition()
+
+    def _has_room(self, size):
+        # A message larger than the byte limit is let through when the window
+        # is empty, otherwise it could never be sent
+        if self.count >= self.max_count:
+            return False
+        return self.count == 0 or self.bytes + size <= self.max_bytes
+
+    @property
+    def full(self):
+        return self.count >= self.max_count or self.bytes >= self.max_bytes
+
+    def acquire(self, size, timeout=None):
+        """
+        Reserve room for a message of `size` bytes.
+
+        Args:
+            size (int): Encoded size of the message
+            timeout (float): Seconds to wait for room, None to wait forever
+
+        Returns:
+            bool: True if the room was reserved, False on timeout
+        """
+        with self._condition:
+            if not self._has_room(size):
+                self.blocked_count += 1
+                if not self._condition.wait_for(lambda: self._has_room(size), timeout):
+                    return False
+            self.count += 1
+            self.bytes += size
+            return True
+
+    def release(self, size):
+        with self._condition:
+            self.count -= 1
+            self.bytes -= size
+            self._condition.notify_all()
+
+    def wait_for_room(self, timeout=None):
+        """Wait until the window is no longer full; returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self.full, timeout)
+
+    def stats(self):
+        return {
+            'in_flight': self.count,
+            'in_flight_bytes': self.bytes,
+            'max_in_flight': self.max_count,
+            'max_in_flight_bytes': self.max_bytes,
+            'blocked': self.blocked_count,
+        }
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` tokens per second, at most `burst`
+    saved up. A rate of 0 disables limiting.
+
+    After a broker incident the backlog is released at `rate` instead of
+    all at once.
+    """
+
+    def __init__(self, rate=DEFAULT_SEND_RATE, burst=None):
+        self.rate = max(0.0, float(rate))
+        self.burst = max(1.0, float(burst if burst else self.rate or 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Take `tokens`, sleeping until they are available.
+
+        Returns:
+            bool: True if the tokens were taken, False if they would not be
+            available within `timeout` seconds
+        """
+        if not self.rate:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+    def stats(self):
+        return {
+            'send_rate': self.rate,
+            'send_burst': self.burst,
+            'rate_limited_seconds': round(self.waited_seconds, 3),
+        }
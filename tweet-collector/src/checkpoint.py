@@ -0,0 +1,166 @@
+"""
+Durable collector checkpoint and bounded deduplication of sent tweet ids.
+"""
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Relative checkpoint paths are resolved against the collector directory
+COLLECTOR_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CHECKPOINT_FILE = os.path.join(COLLECTOR_ROOT, 'data', 'checkpoint.json')
+DEFAULT_RECENT_IDS = 10000
+DEFAULT_BLOOM_CAPACITY = 100000
+DEFAULT_BLOOM_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of integer ids."""
+
+    def __init__(self, capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_BLOOM_ERROR_RATE, bits=None, count=0):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = float(error_rate)
+        size = int(math.ceil(-self.capacity * math.log(self.error_rate) / (math.log(2) ** 2)))
+        self.size = max(8, size)
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, item):
+        # Double hashing: position i is h1 + i * h2
+        digest = hashlib.blake2b(str(item).encode('ascii'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def to_dict(self):
+        return {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'count': self.count,
+            'bits': base64.b64encode(bytes(self.bits)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['capacity'], state['error_rate'],
+                   bytearray(base64.b64decode(state['bits'])), state['count'])
+
+
+class SeenIds:
+    """
+    Bounded set of the ids already sent.
+
+    The most recent ids are kept exactly; older ids are remembered by two
+    generations of Bloom filters, the older generation being dropped when
+    the current one is full. Memory is bounded, and an id is reported as
+    seen by mistake with probability about `error_rate`, so a late tweet is
+    accepted unless it was sent before or collides in the filter. Ids that
+    must never be dropped by such a collision are checked with `is_recent`,
+    which only looks at the exact recent ids.
+    """
+
+    def __init__(self, recent_size=DEFAULT_RECENT_IDS, bloom_capacity=DEFAULT_BLOOM_CAPACITY,
+                 error_rate=DEFAULT_BLOOM_ERROR_RATE):
+        self.recent_size = max(1, int(recent_size))
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self._recent = deque()
+        self._recent_set = set()
+        self._current = BloomFilter(bloom_capacity, error_rate)
+        self._previous = None
+
+    def __contains__(self, tweet_id):
+        return (tweet_id in self._recent_set or tweet_id in self._current
+                or (self._previous is not None and tweet_id in self._previous))
+
+    def is_recent(self, tweet_id):
+        return tweet_id in self._recent_set
+
+    def add(self, tweet_id):
+        if tweet_id in self._recent_set:
+            return
+        self._recent.append(tweet_id)
+        self._recent_set.add(tweet_id)
+        if len(self._recent) > self.recent_size:
+            self._recent_set.discard(self._recent.popleft())
+
+        if self._current.full:
+            self._previous = self._current
+            self._current = BloomFilter(self.bloom_capacity, self.error_rate)
+        self._current.add(tweet_id)
+
+    def to_dict(self):
+        return {
+            'recent': list(self._recent),
+            'current': self._current.to_dict(),
+            'previous': self._previous.to_dict() if self._previous is not None else None,
+        }
+
+    def load(self, state):
+        recent = state.get('recent') or []
+        self._recent = deque(recent[-self.recent_size:])
+        self._recent_set = set(self._recent)
+        if state.get('current'):
+            self._current = BloomFilter.from_dict(state['current'])
+        if state.get('previous'):
+            self._previous = BloomFilter.from_dict(state['previous'])
+
+
+class CheckpointStore:
+    """
+    Collector state in a local JSON file.
+
+    The file is replaced atomically (write to a temporary file in the same
+    directory, fsync, rename), so a crash leaves either the old or the new
+    checkpoint, never a partial one.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_FILE):
+        self.path = os.path.join(COLLECTOR_ROOT, path)
+
+    def load(self):
+        """Return the saved state, or None if there is no usable checkpoint."""
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read checkpoint {self.path}: {e}")
+            return None
+
+    def save(self, state):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(prefix='.checkpoint-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,209 @@
+"""
+Wire codecs for Kafka message values.
+
+The codec of a message is named in its `codec` header, so producers using
+different codecs can share a topic; messages without the header are JSON.
+
+This module is shared by the collector and the processor: keep
+tweet-collector/src/codec.py and tweet-processor/src/codec.py identical.
+"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Try to import the optional codec libraries
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+CODEC_HEADER = 'codec'
+DEFAULT_CODEC = 'json'
+
+COMPRESSION_TYPES = ('gzip', 'snappy', 'lz4', 'zstd')
+
+
+class Codec:
+    """
+    Interface for message codecs.
+
+    Subclasses implement `encode`, which serializes a message to bytes, and
+    `decode`, which parses bytes produced by the codec.
+    """
+    name = None
+
+    def __init__(self):
+        self.headers = [(CODEC_HEADER, self.name.encode('ascii'))]
+
+    def encode(self, message):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """JSON with the standard library."""
+    name = 'json'
+
+    def encode(self, message):
+        return json.dumps(message, default=str).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    JSON with orjson. The bytes are plain JSON, so either JSON codec
+    decodes the other's messages.
+    """
+    name = 'orjson'
+
+    def encode(self, message):
+        return orjson.dumps(message, default=str)
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """Compact binary encoding with MessagePack."""
+    name = 'msgpack'
+
+    def encode(self, message):
+        return msgpack.packb(message, use_bin_type=True, default=str)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+_AVAILABLE = {
+    JsonCodec.name: True,
+    OrjsonCodec.name: ORJSON_AVAILABLE,
+    MsgpackCodec.name: MSGPACK_AVAILABLE,
+}
+
+_codecs = {}
+
+
+def get_codec(name=None):
+    """
+    Return the codec registered under a name.
+
+    orjson falls back to the standard library when it is not installed,
+    since its messages are plain JSON; msgpack messages cannot be handled
+    without the msgpack package.
+
+    Args:
+        name (str): One of CODECS, or None/empty for JSON
+
+    Returns:
+        Codec: Shared codec instance
+    """
+    name = (name or DEFAULT_CODEC).lower()
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}', expected one of {sorted(CODECS)}")
+    if not _AVAILABLE[name]:
+        if name == MsgpackCodec.name:
+            raise ValueError("Codec 'msgpack' requires the msgpack package")
+        logger.warning(f"Library for codec '{name}' not available, using {DEFAULT_CODEC}")
+        name = DEFAULT_CODEC
+    if name not in _codecs:
+        _codecs[name] = CODECS[name]()
+    return _codecs[name]
+
+
+def decode_message(data, headers=None):
+    """
+    Decode a message value with the codec named in its headers.
+
+    Args:
+        data (bytes): Message value
+        headers (list): Kafka (key, value) header pairs
+
+    Returns:
+        Decoded message, or None for an empty value
+    """
+    if data is None:
+        return None
+    name = None
+    for key, value in headers or ():
+        if key == CODEC_HEADER:
+            name = value.decode('ascii')
+            break
+    if name is None or name == JsonCodec.name:
+        # Plain JSON, e.g. from producers that predate the codec header
+        name = OrjsonCodec.name if ORJSON_AVAILABLE else JsonCodec.name
+    return get_codec(name).decode(data)
+
+
+def decode_record(record):
+    """Decode the value of a consumed Kafka record."""
+    return decode_message(record.value, record.headers)
+
+
+class EncodingProducer:
+    """
+    Wrapper of a KafkaProducer that encodes values with a codec and tags
+    each message with the codec header. Other attributes (flush, close,
+    metrics, ...) are those of the wrapped producer.
+    """
+
+    def __init__(self, producer, codec):
+        self._producer = producer
+        self.codec = codec
+
+    def send(self, topic, value=None, **kwargs):
+        return self.send_encoded(topic, self.codec.encode(value) if value is not None else None, **kwargs)
+
+    def send_encoded(self, topic, data, **kwargs):
+        """Send a value already encoded with the codec, e.g. to know its size first."""
+        kwargs.setdefault('headers', self.codec.headers)
+        return self._producer.send(topic, value=data, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._producer, name)
+
+
+def resolve_compression_type(name):
+    """
+    Validate a producer compression type against the installed libraries.
+
+    Args:
+        name (str): gzip, snappy, lz4, zstd, or none/empty
+
+    Returns:
+        str: The compression type, or None for no compression
+    """
+    if not name or name.lower() == 'none':
+        return None
+    name = name.lower()
+    if name not in COMPRESSION_TYPES:
+        raise ValueError(f"Unknown compression type '{name}', expected one of {list(COMPRESSION_TYPES)}")
+
+    from kafka import codec as kafka_codec
+    available = {
+        'gzip': kafka_codec.has_gzip,
+        'snappy': kafka_codec.has_snappy,
+        'lz4': kafka_codec.has_lz4,
+        'zstd': kafka_codec.has_zstd,
+    }[name]()
+    if not available:
+        logger.warning(f"Library for {name} compression not available, sending uncompressed messages")
+        return None
+    return name
@@ -4,19 +4,85 @@ import os
 import time
 import requests
 from kafka_producer import TweetKafkaProducer
+from checkpoint import (
+    CheckpointStore,
+    SeenIds,
+    DEFAULT_CHECKPOINT_FILE,
+    DEFAULT_RECENT_IDS,
+    DEFAULT_BLOOM_CAPACITY,
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_LATE_ARRIVAL_WINDOW = 100
+DEFAULT_REQUEST_TIMEOUT = 10  # seconds
+
 class TweetCollector:
-    def __init__(self):
-        self.db_url = os.environ.get('DB_URL', 'http://json-server/tweets')
-        self.producer = TweetKafkaProducer()
+    # `db_url`, `producer` and `checkpoint_file` override the configuration,
+    # so several collectors (one per source) can share a Kafka producer
+    def __init__(self, config=None, db_url=None, producer=None, checkpoint_file=None):
+        self.db_url = db_url or os.environ.get('DB_URL', 'http://json-server/tweets')
+        if config and 'collector' in config:
+            self.page_size = config['collector'].getint('batch_size', DEFAULT_PAGE_SIZE)
+            self.incremental = config['collector'].getboolean('incremental', True)
+            default_checkpoint = config['collector'].get('checkpoint_file', DEFAULT_CHECKPOINT_FILE)
+            self.late_window = config['collector'].getint('late_arrival_window', DEFAULT_LATE_ARRIVAL_WINDOW)
+            recent_ids = config['collector'].getint('dedupe_recent_ids', DEFAULT_RECENT_IDS)
+            bloom_capacity = config['collector'].getint('dedupe_bloom_capacity', DEFAULT_BLOOM_CAPACITY)
+            self.request_timeout = config['collector'].getfloat('request_timeout', DEFAULT_REQUEST_TIMEOUT)
+        else:
+            self.page_size = int(os.environ.get('BATCH_SIZE', DEFAULT_PAGE_SIZE))
+            self.incremental = os.environ.get('INCREMENTAL_FETCH', 'true').lower() == 'true'
+            default_checkpoint = os.environ.get('CHECKPOINT_FILE', DEFAULT_CHECKPOINT_FILE)
+            self.late_window = int(os.environ.get('LATE_ARRIVAL_WINDOW', DEFAULT_LATE_ARRIVAL_WINDOW))
+            recent_ids = int(os.environ.get('DEDUPE_RECENT_IDS', DEFAULT_RECENT_IDS))
+            bloom_capacity = int(os.environ.get('DEDUPE_BLOOM_CAPACITY', DEFAULT_BLOOM_CAPACITY))
+            self.request_timeout = float(os.environ.get('REQUEST_TIMEOUT', DEFAULT_REQUEST_TIMEOUT))
+        if checkpoint_file is None:
+            checkpoint_file = default_checkpoint
+        self.page_size = max(1, self.page_size)
+        self.late_window = max(0, self.late_window)
+        self.session = requests.Session()
+        self.producer = producer or TweetKafkaProducer()
         self.last_id = 0
+        self.paused_polls = 0
+        self.rejected_count = 0
+        self.seen_ids = SeenIds(recent_ids, bloom_capacity)
+        self.checkpoint = CheckpointStore(checkpoint_file) if checkpoint_file else None
+        self.unsaved_changes = False
+        self._restore()
+    
+    def _restore(self):
+        state = self.checkpoint.load() if self.checkpoint else None
+        if not state:
+            return
+        self.last_id = int(state.get('last_id', 0))
+        self.seen_ids.load(state.get('seen_ids') or {})
+        logger.info(f"Resuming after id {self.last_id} from checkpoint {self.checkpoint.path}")
+    
+    def _save(self):
+        if self.checkpoint is None:
+            return
+        try:
+            self.checkpoint.save({'last_id': self.last_id, 'seen_ids': self.seen_ids.to_dict()})
+            self.unsaved_changes = False
+        except Exception as e:
+            logger.error(f"Could not save checkpoint {self.checkpoint.path}: {e}")
         
     def get_tweets(self):
+        # In incremental mode only tweets after the cursor are requested, one
+        # page at a time, so a poll costs O(new tweets) and a large backlog
+        # never has to be held in memory at once. The cursor starts
+        # `late_window` ids back, to pick up tweets that arrived late.
+        if self.incremental:
+            return self._iter_pages(self.start_cursor())
+        return iter(self._fetch_all())
+    
+    def _fetch_all(self):
         try:
             logger.info(f"Fetching tweets from {self.db_url}")
-            response = requests.get(self.db_url)
+            response = self.session.get(self.db_url, timeout=self.request_timeout)
             if response.status_code == 200:
                 tweets = response.json()
                 logger.info(f"Successfully fetched {len(tweets)} tweets")
@@ -27,23 +93,146 @@ class TweetCollector:
         except Exception as e:
             logger.error(f"Error fetching tweets: {e}")
             return []
+    
+    def start_cursor(self):
+        # First id requested by an incremental poll
+        return max(0, self.last_id - self.late_window) + 1
+    
+    def page_params(self, cursor):
+        # json-server filters and sorts on the numeric id: `id_gte` is the
+        # cursor, `_sort`/`_order` keep pages in id order, `_limit` is the page size
+        return {'id_gte': cursor, '_sort': 'id', '_order': 'asc', '_limit': self.page_size}
+    
+    def _fetch_page(self, cursor):
+        try:
+            response = self.session.get(self.db_url, params=self.page_params(cursor), timeout=self.request_timeout)
+            if response.status_code != 200:
+                logger.error(f"Failed to fetch tweets from id {cursor}: {response.status_code}")
+                return None
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching tweets from id {cursor}: {e}")
+            return None
+    
+    def _iter_pages(self, cursor):
+        start = cursor
+        fetched = 0
+        while True:
+            page = self._fetch_page(cursor)
+            if not page:
+                break
             
-    def collect_and_send(self):
-        tweets = self.get_tweets()
-        new_count = 0
-        
+            yield from page
+            fetched += len(page)
+            
+            next_cursor = self.next_cursor(cursor, page)
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+        logger.info(f"Fetched {fetched} tweets from id {start}")
+            
+    def next_cursor(self, cursor, page):
+        # Cursor of the page after `page`, or None if it was the last one: a
+        # short page is the last one, and a page without usable ids would
+        # loop forever
+        next_cursor = cursor
+        for tweet in page:
+            try:
+                next_cursor = max(next_cursor, int(tweet['id']) + 1)
+            except (ValueError, KeyError, TypeError):
+                pass
+        if len(page) < self.page_size or next_cursor == cursor:
+            return None
+        return next_cursor
+            
+    def new_tweets(self, tweets, ids, skipped):
+        # Yield the tweets not sent yet, recording their ids in order, and
+        # the ids of those already sent in `skipped`. Late tweets below
+        # last_id are accepted unless already sent. Tweets after last_id are
+        # checked against the exact recent ids only: a Bloom filter false
+        # positive would skip them and move last_id past them for good.
         for tweet in tweets:
             try:
                 tweet_id = int(tweet['id'])
-                if tweet_id > self.last_id:
-                    if self.producer.send_tweet(tweet):
-                        self.last_id = tweet_id
-                        new_count += 1
-            except (ValueError, KeyError) as e:
+            except (ValueError, KeyError, TypeError) as e:
                 logger.warning(f"Invalid tweet format: {e}")
-                
+                continue
+            if tweet_id > self.last_id:
+                seen = self.seen_ids.is_recent(tweet_id)
+            else:
+                seen = tweet_id in self.seen_ids
+            if not seen:
+                ids.append(tweet_id)
+                yield tweet
+            else:
+                skipped.append(tweet_id)
+            
+    def has_capacity(self):
+        # Backpressure: while the producer's in-flight window stays full the
+        # poll is skipped, so nothing more is fetched until Kafka catches up
+        if self.producer.wait_for_capacity():
+            return True
+        self.paused_polls += 1
+        logger.warning(f"Kafka in-flight window full, pausing polls: {self.stats()}")
+        return False
+    
+    def stats(self):
+        stats = {'last_id': self.last_id, 'paused_polls': self.paused_polls, 'rejected': self.rejected_count}
+        stats.update(self.producer.stats())
+        return stats
+    
+    def collect_and_send(self):
+        if not self.has_capacity():
+            return 0
+        ids = []
+        skipped = []
+        rejected = []
+        delivered = self.producer.send_batch(self.new_tweets(self.get_tweets(), ids, skipped), rejected)
+        new_count = self.record_delivery(ids, delivered, skipped, rejected)
         logger.info(f"Collected and sent {new_count} new tweets")
         return new_count
+    
+    def save_checkpoint(self):
+        # Save the checkpoint if deliveries were recorded since the last save
+        if self.unsaved_changes:
+            self._save()
+    
+    def record_delivery(self, ids, delivered, skipped, rejected=(), save=True):
+        # Mark the delivered ids as sent, advance last_id and save the
+        # checkpoint, unless `save` is False and the caller saves it later
+        # with save_checkpoint; returns the number of tweets delivered.
+        # `rejected` tweets can never be sent (see send_batch): they are
+        # logged and skipped, so that they do not hold the cursor back.
+        new_count = sum(delivered)
+        rejected = {int(tweet_id) for tweet_id in rejected}
+        for tweet_id, ok in zip(ids, delivered):
+            if ok:
+                self.seen_ids.add(tweet_id)
+            elif tweet_id in rejected:
+                logger.error(f"Skipping tweet ID {tweet_id}, which cannot be sent to Kafka")
+                self.seen_ids.add(tweet_id)
+                self.rejected_count += 1
+        delivered = [ok or tweet_id in rejected for tweet_id, ok in zip(ids, delivered)]
+        
+        # Advance only over the acknowledged prefix (tweets sent earlier
+        # count as acknowledged), so that a tweet whose delivery failed is
+        # fetched and sent again on the next poll
+        previous_last_id = self.last_id
+        outcomes = sorted(list(zip(ids, delivered)) + [(tweet_id, True) for tweet_id in skipped])
+        for tweet_id, ok in outcomes:
+            if tweet_id <= self.last_id:
+                continue
+            if not ok:
+                break
+            self.last_id = tweet_id
+        
+        if new_count or self.last_id != previous_last_id:
+            self.unsaved_changes = True
+            if save:
+                self._save()
+        if sum(delivered) < len(ids):
+            logger.warning(f"{len(ids) - sum(delivered)} of {len(ids)} tweets not acknowledged, resuming after id {self.last_id}")
+        return new_count
         
     def run(self, polling_interval=30):
         logger.info("Starting tweet collector...")
@@ -1,37 +1,190 @@
-import json
 import logging
 import os
+import threading
 from kafka import KafkaProducer
+from codec import EncodingProducer, get_codec, resolve_compression_type
+from backpressure import (
+    InFlightWindow,
+    TokenBucket,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_MAX_IN_FLIGHT_BYTES,
+    DEFAULT_SEND_RATE,
+    DEFAULT_BLOCK_TIMEOUT,
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_LINGER_MS = 20
+DEFAULT_BATCH_BYTES = 64 * 1024
+DEFAULT_FLUSH_TIMEOUT = 30  # seconds
+
 class TweetKafkaProducer:
     def __init__(self):
         self.bootstrap_servers = os.environ.get('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092')
         self.topic = 'raw-tweets'
+        self.codec = get_codec(os.environ.get('KAFKA_CODEC'))
+        self.compression_type = resolve_compression_type(os.environ.get('KAFKA_COMPRESSION_TYPE'))
+        self.linger_ms = int(os.environ.get('KAFKA_LINGER_MS', DEFAULT_LINGER_MS))
+        self.batch_bytes = int(os.environ.get('KAFKA_BATCH_BYTES', DEFAULT_BATCH_BYTES))
+        self.flush_timeout = float(os.environ.get('KAFKA_FLUSH_TIMEOUT', DEFAULT_FLUSH_TIMEOUT))
+        # Backpressure: sends wait up to block_timeout for room in the
+        # in-flight window and for rate-limiter tokens
+        self.block_timeout = float(os.environ.get('KAFKA_BLOCK_TIMEOUT', DEFAULT_BLOCK_TIMEOUT))
+        self.window = InFlightWindow(
+            int(os.environ.get('KAFKA_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)),
+            int(os.environ.get('KAFKA_MAX_IN_FLIGHT_BYTES', DEFAULT_MAX_IN_FLIGHT_BYTES))
+        )
+        self.rate_limiter = TokenBucket(
+            float(os.environ.get('KAFKA_SEND_RATE', DEFAULT_SEND_RATE)),
+            float(os.environ.get('KAFKA_SEND_BURST', 0)) or None
+        )
+        # The counters are updated from every thread sending a batch and
+        # from the producer's callbacks, so they are guarded like the window
+        self.sent_count = 0
+        self.failed_count = 0
+        self._counts_lock = threading.Lock()
         self._producer = None
         self._connect()
         
     def _connect(self):
         try:
-            logger.info(f"Connecting to Kafka at {self.bootstrap_servers}")
-            self._producer = KafkaProducer(
+            logger.info(
+                f"Connecting to Kafka at {self.bootstrap_servers} "
+                f"(codec {self.codec.name}, compression {self.compression_type or 'none'}, "
+                f"linger {self.linger_ms}ms, batch {self.batch_bytes} bytes, "
+                f"in-flight limits {self.window.max_count} tweets/{self.window.max_bytes} bytes, "
+                f"send rate {self.rate_limiter.rate or 'unlimited'})"
+            )
+            # Broker version is detected: codec headers need Kafka 0.11+, zstd 2.1+.
+            # max_block_ms bounds how long a send blocks while the broker is
+            # unreachable, so an outage fails fast instead of stalling each send.
+            producer = KafkaProducer(
                 bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
-                api_version=(0, 10)
+                compression_type=self.compression_type,
+                linger_ms=self.linger_ms,
+                batch_size=self.batch_bytes,
+                max_block_ms=int(self.block_timeout * 1000)
             )
+            self._producer = EncodingProducer(producer, self.codec)
             logger.info("Successfully connected to Kafka")
         except Exception as e:
             logger.error(f"Failed to connect to Kafka: {e}")
             raise
-            
-    def send_tweet(self, tweet):
+    
+    def _on_send_error(self, tweet_id, error):
+        logger.error(f"Failed to deliver tweet ID {tweet_id} to Kafka topic {self.topic}: {error}")
+    
+    def _on_release(self, size, *args):
+        self.window.release(size)
+    
+    def _send(self, tweet, timeout, rejected=None):
+        # Send one tweet once the rate limiter and the in-flight window let
+        # it through. Returns its future, None if sending failed, or False
+        # if there was no room within `timeout` seconds. The id of a tweet
+        # that can never be sent (not encodable, or a non-retriable Kafka
+        # error) is appended to `rejected`.
+        tweet_id = tweet.get('id')
         try:
-            logger.info(f"Sending tweet ID {tweet['id']} to Kafka topic {self.topic}")
-            self._producer.send(self.topic, tweet)
-            self._producer.flush()
-            logger.info(f"Tweet ID {tweet['id']} sent successfully")
-            return True
+            data = self.codec.encode(tweet)
         except Exception as e:
-            logger.error(f"Error sending tweet to Kafka: {e}")
+            logger.error(f"Error encoding tweet ID {tweet_id}: {e}")
+            if rejected is not None:
+                rejected.append(tweet_id)
+            return None
+        size = len(data)
+        if not self.rate_limiter.acquire(timeout=timeout) or not self.window.acquire(size, timeout=timeout):
             return False
+        try:
+            future = self._producer.send_encoded(self.topic, data)
+        except Exception as e:
+            self.window.release(size)
+            logger.error(f"Error sending tweet ID {tweet_id} to Kafka: {e}")
+            if rejected is not None and not getattr(e, 'retriable', True):
+                rejected.append(tweet_id)
+            return None
+        # The window is released when the broker answers either way
+        future.add_callback(self._on_release, size)
+        future.add_errback(self._on_release, size)
+        future.add_errback(lambda error, tweet_id=tweet_id: self._on_send_error(tweet_id, error))
+        return future
+    
+    def is_full(self):
+        return self.window.full
+    
+    def wait_for_capacity(self, timeout=None):
+        # Wait until the in-flight window has room; False on timeout
+        return self.window.wait_for_room(self.block_timeout if timeout is None else timeout)
+    
+    def _count(self, sent, failed):
+        with self._counts_lock:
+            self.sent_count += sent
+            self.failed_count += failed
+    
+    def stats(self):
+        with self._counts_lock:
+            stats = {'sent': self.sent_count, 'failed': self.failed_count}
+        stats.update(self.window.stats())
+        stats.update(self.rate_limiter.stats())
+        return stats
+    
+    def send_batch(self, tweets, rejected=None):
+        # Enqueue every tweet without waiting, so the producer batches them
+        # (linger_ms/batch_size), then wait once for all acknowledgements.
+        # Returns one delivered flag per tweet taken from `tweets`, in input
+        # order. When the in-flight window stays full for block_timeout, no
+        # more tweets are taken, so a lazy source stops being fetched.
+        # The ids of undelivered tweets that retrying cannot fix are
+        # appended to `rejected`.
+        futures = []
+        taken = []
+        for tweet in tweets:
+            future = self._send(tweet, self.block_timeout, rejected)
+            if future is False:
+                logger.warning(
+                    f"Kafka backpressure: no room to send tweet ID {tweet.get('id')} within "
+                    f"{self.block_timeout}s ({self.window.stats()}), stopping after {len(futures)} tweets"
+                )
+                futures.append(None)
+                break
+            futures.append(future)
+            taken.append(tweet)
+        
+        if not futures:
+            return []
+        try:
+            self._producer.flush(timeout=self.flush_timeout)
+        except Exception as e:
+            logger.error(f"Error flushing Kafka producer: {e}")
+        
+        delivered = [future is not None and future.succeeded() for future in futures]
+        if rejected is not None:
+            for tweet, future in zip(taken, futures):
+                if future is not None and future.failed() and not getattr(future.exception, 'retriable', True):
+                    rejected.append(tweet.get('id'))
+        sent = sum(delivered)
+        self._count(sent, len(delivered) - sent)
+        logger.debug(f"Delivered {sent}/{len(delivered)} tweets to Kafka topic {self.topic}")
+        return delivered
+            
+    def _on_send_success(self, metadata):
+        self._count(1, 0)
+    
+    def _on_send_failure(self, error):
+        self._count(0, 1)
+    
+    def send_nowait(self, tweet):
+        # Enqueue a tweet without waiting for its acknowledgement; the
+        # counters are updated from the producer's callbacks. Blocks while
+        # the in-flight window is full, which is how a slow broker pushes back.
+        future = self._send(tweet, None)
+        if not future:
+            raise RuntimeError(f"Could not send tweet ID {tweet.get('id')}")
+        future.add_callback(self._on_send_success)
+        future.add_errback(self._on_send_failure)
+        return future
+    
+    def flush(self, timeout=None):
+        self._producer.flush(timeout=timeout if timeout is not None else self.flush_timeout)
+    
+    def send_tweet(self, tweet):
+        return self.send_batch([tweet])[0]
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Produce synthetic tweets straight to Kafka at a target rate.
+
+Tweets come from `generate_tweet` and are sent to the raw-tweets topic with
+the collector's producer settings (KAFKA_BOOTSTRAP_SERVERS, KAFKA_CODEC,
+KAFKA_COMPRESSION_TYPE, ...), bypassing JSON Server, to find the rate at
+which the processor saturates. The rate follows a profile:
+
+    constant  --rate tweets/sec for the whole run
+    ramp      from --rate up to --max-rate over --ramp-seconds, then steady
+    burst     --rate, with --burst-rate for --burst-seconds every --burst-every seconds
+
+The achieved send and acknowledgement rates are logged every second and
+reported as JSON at the end.
+
+Usage:
+    python src/load_generator.py --rate 500 --duration 60
+    python src/load_generator.py --profile ramp --rate 100 --max-rate 5000 --ramp-seconds 120
+"""
+import argparse
+import bisect
+import itertools
+import json
+import logging
+import random
+import sys
+import time
+from collections import deque
+
+from add_tweets import generate_tweet, HASHTAGS, LOCATIONS
+from kafka_producer import TweetKafkaProducer
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ('constant', 'ramp', 'burst')
+TICK = 0.005  # seconds between pacing checks
+DUPLICATE_POOL_SIZE = 1000
+
+# Filler vocabulary for longer tweets
+FILLER_WORDS = [
+    "really", "today", "team", "project", "release", "update", "performance",
+    "latency", "pipeline", "stream", "cluster", "deploy", "feature", "issue",
+    "users", "community", "results", "benchmark", "tooling", "workflow",
+]
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights of a Zipf distribution over `count` ranks (skew 0 is uniform)."""
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+class TweetFactory:
+    """
+    Tweets with configurable distributions.
+
+    Hashtags and locations are drawn by rank from Zipf distributions (the
+    first items of HASHTAGS and LOCATIONS are the most frequent), the
+    number of extra words follows a normal distribution, and a fraction of
+    the tweets are exact duplicates of recent ones, ids included.
+    """
+
+    def __init__(self, start_id, hashtag_skew=1.0, hashtags_per_tweet=(1, 3), location_skew=0.0,
+                 extra_words=0.0, duplicate_ratio=0.0, seed=None):
+        self.next_id = start_id
+        self.random = random.Random(seed)
+        self.hashtag_weights = zipf_weights(len(HASHTAGS), hashtag_skew)
+        self.location_weights = zipf_weights(len(LOCATIONS), location_skew)
+        self.hashtags_per_tweet = hashtags_per_tweet
+        self.extra_words = max(0.0, extra_words)
+        self.duplicate_ratio = min(1.0, max(0.0, duplicate_ratio))
+        self._recent = deque(maxlen=DUPLICATE_POOL_SIZE)
+        self.generated = 0
+        self.duplicates = 0
+
+    def _hashtags(self):
+        count = self.random.randint(*self.hashtags_per_tweet)
+        chosen = self.random.choices(HASHTAGS, cum_weights=self.hashtag_weights, k=count)
+        # A hashtag drawn twice counts once, as in a real tweet
+        return list(dict.fromkeys(chosen))
+
+    def _extra_words(self):
+        if not self.extra_words:
+            return None
+        count = max(0, round(self.random.gauss(self.extra_words, self.extra_words / 3)))
+        return self.random.choices(FILLER_WORDS, k=count)
+
+    def next(self):
+        if self._recent and self.random.random() < self.duplicate_ratio:
+            self.duplicates += 1
+            return self.random.choice(self._recent)
+
+        location = LOCATIONS[bisect.bisect_left(self.location_weights,
+                                                self.random.random() * self.location_weights[-1])]
+        tweet = generate_tweet(self.next_id, hashtags=self._hashtags(), location=location,
+                               extra_words=self._extra_words(), rng=self.random)
+        self.next_id += 1
+        self.generated += 1
+        self._recent.append(tweet)
+        return tweet
+
+
+def target_rate(args, elapsed):
+    """Return the target rate in tweets/sec at `elapsed` seconds into the run."""
+    if args.profile == 'ramp':
+        progress = min(1.0, elapsed / args.ramp_seconds) if args.ramp_seconds > 0 else 1.0
+        return args.rate + (args.max_rate - args.rate) * progress
+    if args.profile == 'burst' and elapsed % args.burst_every < args.burst_seconds:
+        return args.burst_rate
+    return args.rate
+
+
+def rate(count, elapsed):
+    return round(count / elapsed, 1) if elapsed else 0.0
+
+
+def run(args, producer, factory):
+    """
+    Send tweets at the profile's rate for the duration of the run.
+
+    The number of tweets due is the integral of the target rate, so a
+    tick that falls behind (a slow send, a full producer buffer) is caught
+    up on the next ticks rather than lost.
+
+    Returns:
+        dict: Report of the run
+    """
+    start = time.perf_counter()
+    last_tick = start
+    last_report = start
+    due = 0.0
+    sent = 0
+    errors = 0
+    report_sent = 0
+    report_acked = producer.sent_count
+    peak_rate = 0.0
+    seconds = []
+
+    while True:
+        now = time.perf_counter()
+        elapsed = now - start
+        if elapsed >= args.duration:
+            break
+        due += target_rate(args, elapsed) * (now - last_tick)
+        last_tick = now
+
+        while sent + errors < int(due):
+            try:
+                producer.send_nowait(factory.next())
+                sent += 1
+            except Exception as e:
+                errors += 1
+                logger.error(f"Error sending tweet: {e}")
+
+        if now - last_report >= 1.0:
+            window = now - last_report
+            send_rate = rate(sent - report_sent, window)
+            ack_rate = rate(producer.sent_count - report_acked, window)
+            peak_rate = max(peak_rate, ack_rate)
+            seconds.append({'t': round(elapsed, 1), 'target': round(target_rate(args, elapsed), 1),
+                            'sent': send_rate, 'acked': ack_rate})
+            logger.info(f"target {target_rate(args, elapsed):.0f}/s, sent {send_rate}/s, acked {ack_rate}/s, "
+                        f"failed {producer.failed_count}")
+            last_report = now
+            report_sent = sent
+            report_acked = producer.sent_count
+
+        time.sleep(TICK)
+
+    send_elapsed = time.perf_counter() - start
+    try:
+        producer.flush()
+    except Exception as e:
+        logger.error(f"Error flushing Kafka producer: {e}")
+    total_elapsed = time.perf_counter() - start
+
+    return {
+        'profile': args.profile,
+        'duration': round(send_elapsed, 2),
+        'target_tweets': int(due),
+        'sent': sent,
+        'send_errors': errors,
+        'acked': producer.sent_count,
+        'failed': producer.failed_count,
+        'duplicates': factory.duplicates,
+        'target_rate': rate(due, send_elapsed),
+        'send_rate': rate(sent, send_elapsed),
+        'ack_rate': rate(producer.sent_count, total_elapsed),
+        'peak_ack_rate': peak_rate,
+        'per_second': seconds,
+    }
+
+
+def parse_range(value):
+    low, _, high = value.partition('-')
+    low = int(low)
+    high = int(high) if high else low
+    if not 1 <= low <= high:
+        raise argparse.ArgumentTypeError(f"invalid range '{value}', expected MIN-MAX with 1 <= MIN <= MAX")
+    return low, high
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rate', type=float, default=100, help='Base rate in tweets/sec')
+    parser.add_argument('--duration', type=float, default=60, help='Run time in seconds')
+    parser.add_argument('--profile', choices=PROFILES, default='constant', help='Rate profile')
+    parser.add_argument('--max-rate', type=float, default=1000, help='Final rate of the ramp profile')
+    parser.add_argument('--ramp-seconds', type=float, default=60, help='Duration of the ramp')
+    parser.add_argument('--burst-rate', type=float, default=1000, help='Rate during bursts')
+    parser.add_argument('--burst-every', type=float, default=30, help='Seconds between burst starts')
+    parser.add_argument('--burst-seconds', type=float, default=5, help='Duration of each burst')
+    parser.add_argument('--hashtag-skew', type=float, default=1.0,
+                        help='Zipf exponent of hashtag popularity, 0 for uniform')
+    parser.add_argument('--hashtags-per-tweet', type=parse_range, default=(1, 3), help='MIN-MAX hashtags per tweet')
+    parser.add_argument('--location-skew', type=float, default=0.0,
+                        help='Zipf exponent of location popularity, 0 for uniform')
+    parser.add_argument('--extra-words', type=float, default=0.0, help='Mean number of filler words added to the text')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0,
+                        help='Fraction of tweets re-sent as exact duplicates of recent ones')
+    parser.add_argument('--start-id', type=int, default=None,
+                        help='First tweet id (default: current time in milliseconds, to avoid collisions)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed of the hashtag, location, length and duplicate draws')
+    args = parser.parse_args(argv)
+    if args.burst_every <= 0:
+        parser.error('--burst-every must be positive')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start_id = args.start_id if args.start_id is not None else int(time.time() * 1000)
+    factory = TweetFactory(start_id, args.hashtag_skew, args.hashtags_per_tweet, args.location_skew,
+                           args.extra_words, args.duplicate_ratio, args.seed)
+    producer = TweetKafkaProducer()
+    logger.info(f"Producing to {producer.topic} with the {args.profile} profile for {args.duration}s, "
+                f"starting at id {start_id}")
+
+    try:
+        report = run(args, producer, factory)
+    except KeyboardInterrupt:
+        logger.info("Stopping load generator...")
+        return 1
+    report['start_id'] = start_id
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,41 @@
+import configparser
 import logging
+import os
 from collector import TweetCollector
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def load_config():
+    """Load configuration from config.ini, or return None to use the environment."""
+    config = configparser.ConfigParser()
+    config_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.ini')
+    
+    if os.path.exists(config_file):
+        config.read(config_file)
+        logger.info(f"Loaded configuration from {config_file}")
+        return config
+    logger.warning(f"Config file {config_file} not found, using environment variables")
+    return None
+
+def collector_mode(config):
+    """Return the collector mode: sync (one source) or async (concurrent sources)."""
+    if config and 'collector' in config:
+        return config['collector'].get('mode', 'sync').lower()
+    return os.environ.get('COLLECTOR_MODE', 'sync').lower()
+
+def polling_interval(config):
+    """Return the seconds between two polls of the sync collector."""
+    if config and 'collector' in config:
+        return config['collector'].getfloat('polling_interval', 30)
+    return float(os.environ.get('POLLING_INTERVAL', '30'))
+
 if __name__ == "__main__":
-    collector = TweetCollector()
-    collector.run()
+    config = load_config()
+    if collector_mode(config) == 'async':
+        from async_collector import AsyncTweetCollector
+        collector = AsyncTweetCollector(config)
+        collector.run()
+    else:
+        collector = TweetCollector(config)
+        collector.run(polling_interval(config))
@@ -0,0 +1,153 @@
+import asyncio
+import configparser
+
+import pytest
+
+from async_collector import AdaptiveInterval, AsyncTweetCollector, load_sources
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def json(self, content_type=None):
+        return self.body
+
+
+class FakeSession:
+    """json-server serving tweets with ids 1..count, filtered like the real one."""
+
+    def __init__(self, count, status=200):
+        self.tweets = [{'id': str(i), 'text': f'tweet {i}'} for i in range(1, count + 1)]
+        self.status = status
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+        if not params:
+            return FakeResponse(self.status, self.tweets)
+        page = [tweet for tweet in self.tweets if int(tweet['id']) >= params['id_gte']]
+        return FakeResponse(self.status, page[:params['_limit']])
+
+
+class FakeProducer:
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.sent = []
+
+    def send_batch(self, tweets, rejected=None):
+        delivered = []
+        for tweet in tweets:
+            ok = int(tweet['id']) not in self.fail_ids
+            if ok:
+                self.sent.append(int(tweet['id']))
+            delivered.append(ok)
+        return delivered
+
+    def is_full(self):
+        return False
+
+    def stats(self):
+        return {'sent': len(self.sent)}
+
+
+@pytest.fixture
+def environment(monkeypatch, tmp_path):
+    for name in ('DB_URL', 'DB_URLS', 'INCREMENTAL_FETCH'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('BATCH_SIZE', '100')
+    monkeypatch.setenv('CHECKPOINT_FILE', str(tmp_path / 'checkpoint.json'))
+    return tmp_path
+
+
+def test_interval_shrinks_with_new_tweets_and_backs_off_when_idle():
+    interval = AdaptiveInterval(min_interval=1, max_interval=8, backoff=2)
+
+    assert [interval.record(0) for _ in range(4)] == [2, 4, 8, 8]
+    assert interval.record(0, error=True) == 8
+    assert [interval.record(5) for _ in range(4)] == [4, 2, 1, 1]
+    assert 0.9 <= interval.delay() <= 1.1
+
+
+def test_sources_from_the_config_file():
+    config = configparser.ConfigParser()
+    config.read_string("[DEFAULT]\nunused = 1\n[sources]\nfeed1 = http://a/tweets\nfeed2 = http://b/tweets\n")
+
+    assert load_sources(config) == [('feed1', 'http://a/tweets'), ('feed2', 'http://b/tweets')]
+
+
+def test_sources_from_the_environment(environment, monkeypatch):
+    assert load_sources() == [('default', 'http://json-server/tweets')]
+
+    monkeypatch.setenv('DB_URLS', 'http://a/tweets, news=http://b/tweets,')
+    assert load_sources() == [('source1', 'http://a/tweets'), ('news', 'http://b/tweets')]
+
+
+def test_each_source_has_its_own_checkpoint(environment, monkeypatch):
+    single = AsyncTweetCollector(producer=FakeProducer())
+    monkeypatch.setenv('DB_URLS', 'a=http://a/tweets,b=http://b/tweets')
+    several = AsyncTweetCollector(producer=FakeProducer())
+
+    assert single.pollers[0].collector.checkpoint.path == str(environment / 'checkpoint.json')
+    assert [poller.collector.checkpoint.path for poller in several.pollers] == [
+        str(environment / 'checkpoint-a.json'), str(environment / 'checkpoint-b.json')
+    ]
+    assert len({id(poller.collector.producer) for poller in several.pollers}) == 1
+
+
+def test_poll_sends_new_tweets_page_by_page_and_saves_the_checkpoint(environment):
+    producer = FakeProducer()
+    collector = AsyncTweetCollector(producer=producer)
+    collector.session = FakeSession(250)
+    poller = collector.pollers[0]
+
+    assert asyncio.run(collector.poll(poller)) == 250
+    assert producer.sent == list(range(1, 251))
+    assert [params['id_gte'] for _, params in collector.session.requests] == [1, 101, 201]
+    assert poller.collector.checkpoint.load()['last_id'] == 250
+
+    # The next poll re-reads the late-arrival window without sending it again
+    collector.session.tweets.append({'id': '251', 'text': 'tweet 251'})
+    assert asyncio.run(collector.poll(poller)) == 1
+    assert AsyncTweetCollector(producer=FakeProducer()).pollers[0].collector.last_id == 251
+
+
+def test_a_delivery_failure_stops_the_poll_before_the_failed_tweet(environment):
+    producer = FakeProducer(fail_ids={150})
+    collector = AsyncTweetCollector(producer=producer)
+    collector.session = FakeSession(250)
+    poller = collector.pollers[0]
+
+    with pytest.raises(RuntimeError, match='Kafka delivery failure'):
+        asyncio.run(collector.poll(poller))
+    assert poller.collector.last_id == 149
+    assert poller.collector.checkpoint.load()['last_id'] == 149
+
+    # The failed tweet and the pages after it are sent by the next poll
+    producer.fail_ids.clear()
+    assert asyncio.run(collector.poll(poller)) == 51
+    assert sorted(producer.sent) == list(range(1, 251))
+
+
+def test_a_failed_fetch_backs_the_source_off(environment):
+    collector = AsyncTweetCollector(producer=FakeProducer())
+    collector.session = FakeSession(10, status=500)
+    poller = collector.pollers[0]
+
+    async def poll_once():
+        task = asyncio.create_task(collector._run_source(poller))
+        while not poller.polls:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(poll_once())
+
+    assert poller.errors == 1
+    assert poller.interval.interval == 2 * collector.min_interval
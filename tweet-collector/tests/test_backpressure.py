@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+from kafka.errors import MessageSizeTooLargeError, NotLeaderForPartitionError
+from kafka.future import Future
+
+import kafka_producer
+from async_collector import AsyncTweetCollector
+from backpressure import InFlightWindow, TokenBucket
+
+
+class FakeKafkaProducer:
+    """KafkaProducer acknowledging every message on flush."""
+
+    def __init__(self, **config):
+        self.config = config
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def send(self, topic, value=None, headers=None):
+        future = Future()
+        with self.lock:
+            self.pending.append(future)
+        return future
+
+    def flush(self, timeout=None):
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for future in pending:
+            future.success(None)
+
+
+@pytest.fixture
+def producer(monkeypatch):
+    monkeypatch.setattr(kafka_producer, 'KafkaProducer', FakeKafkaProducer)
+    monkeypatch.setenv('KAFKA_BLOCK_TIMEOUT', '0.05')
+    return kafka_producer.TweetKafkaProducer()
+
+
+def test_window_is_bounded_by_count_and_bytes():
+    window = InFlightWindow(max_count=2, max_bytes=100)
+
+    assert window.acquire(60)
+    assert not window.acquire(60, timeout=0)
+    assert window.acquire(40)
+    assert window.full
+    assert not window.acquire(1, timeout=0)
+    window.release(60)
+    assert window.acquire(10, timeout=0)
+    assert window.stats()['blocked'] == 2
+
+
+def test_window_lets_an_oversized_message_through_when_empty():
+    window = InFlightWindow(max_count=10, max_bytes=100)
+
+    assert window.acquire(500, timeout=0)
+    assert not window.acquire(1, timeout=0)
+
+
+def test_release_wakes_blocked_senders():
+    window = InFlightWindow(max_count=1)
+    window.acquire(1)
+    threading.Timer(0.05, window.release, args=(1,)).start()
+
+    assert window.acquire(1, timeout=5)
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=100, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        assert bucket.acquire()
+
+    # The burst is free, the next 10 tokens take 0.1s
+    assert time.monotonic() - start >= 0.09
+    assert not TokenBucket(rate=1, burst=1).acquire(2, timeout=0.1)
+
+
+def test_token_bucket_without_rate_never_waits():
+    bucket = TokenBucket(rate=0)
+
+    assert all(bucket.acquire(timeout=0) for _ in range(1000))
+    assert bucket.stats()['rate_limited_seconds'] == 0
+
+
+def test_send_batch_stops_taking_tweets_when_the_window_stays_full(producer):
+    producer.window = InFlightWindow(max_count=3)
+    tweets = iter({'id': i} for i in range(10))
+
+    delivered = producer.send_batch(tweets)
+
+    assert delivered == [True, True, True, False]
+    assert next(tweets) == {'id': 4}
+    assert producer.stats()['in_flight'] == 0
+
+
+def test_send_batch_rejects_tweets_kafka_will_never_accept(producer, monkeypatch):
+    def send(topic, value=None, headers=None):
+        if b'huge' in value:
+            raise MessageSizeTooLargeError()
+        raise NotLeaderForPartitionError()
+
+    rejected = []
+    monkeypatch.setattr(producer._producer._producer, 'send', send)
+
+    assert producer.send_batch([{'id': 1}, {'id': 2, 'text': 'huge'}], rejected) == [False, False]
+    assert rejected == [2]
+    assert producer.stats()['failed'] == 2
+    assert producer.stats()['in_flight'] == 0
+
+
+def test_counters_are_exact_with_concurrent_batches(producer):
+    # Switch threads as often as possible to expose unguarded updates
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [
+            threading.Thread(target=producer.send_batch, args=([{'id': i} for i in range(200)],))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert producer.stats()['sent'] == 1600
+    assert producer.stats()['failed'] == 0
+    assert producer.stats()['in_flight'] == 0
+
+
+def test_async_sources_pause_while_the_window_is_full(producer, monkeypatch):
+    monkeypatch.setenv('CHECKPOINT_FILE', '')
+    monkeypatch.setenv('MIN_POLLING_INTERVAL', '0.01')
+    producer.window = InFlightWindow(max_count=1)
+    producer.window.acquire(1)
+    collector = AsyncTweetCollector(producer=producer)
+    poller = collector.pollers[0]
+
+    async def run_until_paused():
+        # No session: a poll would fail instead of pausing
+        task = asyncio.create_task(collector._run_source(poller))
+        while poller.paused < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run_until_paused())
+
+    assert (poller.polls, poller.errors) == (0, 0)
+    assert poller.interval.interval > collector.min_interval
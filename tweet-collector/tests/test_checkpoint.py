@@ -0,0 +1,103 @@
+import json
+import os
+
+from checkpoint import BloomFilter, CheckpointStore, SeenIds
+
+
+def test_bloom_filter_round_trip():
+    bloom = BloomFilter(capacity=100, error_rate=0.01)
+    for i in range(50):
+        bloom.add(f'tweet-{i}')
+
+    restored = BloomFilter.from_dict(json.loads(json.dumps(bloom.to_dict())))
+
+    assert all(f'tweet-{i}' in restored for i in range(50))
+    assert restored.count == 50
+    assert not restored.full
+
+
+def test_seen_ids_round_trip():
+    seen = SeenIds(recent_size=5, bloom_capacity=100)
+    for i in range(20):
+        seen.add(f'tweet-{i}')
+
+    restored = SeenIds(recent_size=5, bloom_capacity=100)
+    restored.load(json.loads(json.dumps(seen.to_dict())))
+
+    assert restored.to_dict() == seen.to_dict()
+    assert all(f'tweet-{i}' in restored for i in range(20))
+    assert 'tweet-20' not in restored
+
+
+def test_seen_ids_keeps_the_most_recent_ids_exactly():
+    seen = SeenIds(recent_size=3, bloom_capacity=100)
+    for i in range(10):
+        seen.add(i)
+
+    assert seen.to_dict()['recent'] == [7, 8, 9]
+
+
+def test_bloom_generations_roll_over():
+    seen = SeenIds(recent_size=1, bloom_capacity=10, error_rate=0.001)
+    for i in range(10):
+        seen.add(f'tweet-{i}')
+    assert seen.to_dict()['previous'] is None
+
+    # The full generation is kept as the previous one...
+    for i in range(10, 20):
+        seen.add(f'tweet-{i}')
+    assert seen.to_dict()['previous']['count'] == 10
+    assert all(f'tweet-{i}' in seen for i in range(20))
+
+    # ...and forgotten at the next rollover
+    seen.add('tweet-20')
+    assert seen.to_dict()['current']['count'] == 1
+    assert all(f'tweet-{i}' in seen for i in range(10, 21))
+    assert not any(f'tweet-{i}' in seen for i in range(10))
+
+
+def test_checkpoint_store_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'data' / 'checkpoint.json'))
+    state = {'seen': SeenIds(recent_size=5, bloom_capacity=100).to_dict(), 'cursor': 42}
+
+    store.save(state)
+
+    assert CheckpointStore(store.path).load() == state
+    assert os.listdir(tmp_path / 'data') == ['checkpoint.json']
+
+
+def test_checkpoint_store_overwrites_the_previous_state(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoint.json'))
+    store.save({'cursor': 1})
+    store.save({'cursor': 2})
+
+    assert store.load() == {'cursor': 2}
+
+
+def test_checkpoint_store_without_a_usable_file(tmp_path):
+    assert CheckpointStore(str(tmp_path / 'missing.json')).load() is None
+
+    corrupt = tmp_path / 'checkpoint.json'
+    corrupt.write_text('{"seen": ')
+    assert CheckpointStore(str(corrupt)).load() is None
+
+
+def test_new_ids_are_never_skipped_after_a_large_history():
+    from collector import TweetCollector
+
+    collector = TweetCollector(producer=object(), checkpoint_file='')
+    ids = list(range(1, 150001))
+    collector.record_delivery(ids, [True] * len(ids), [])
+    assert collector.last_id == 150000
+
+    fresh = [{'id': tweet_id} for tweet_id in range(150001, 250001)]
+    accepted = []
+    skipped = []
+    assert len(list(collector.new_tweets(fresh, accepted, skipped))) == len(fresh)
+    assert skipped == []
+
+    # Late ids at or below last_id are still checked against the Bloom filters
+    late = [{'id': tweet_id} for tweet_id in range(1, 1001)]
+    skipped = []
+    assert list(collector.new_tweets(late, [], skipped)) == []
+    assert len(skipped) == 1000
@@ -32,6 +32,18 @@ def map_view():
     """Render the map page."""
     return render_template('map.html')
 
+@app.route('/api/dashboard')
+def get_dashboard():
+    """Fetch the sentiment, hashtag and region breakdowns in one API request."""
+    try:
+        # Forward the filters (q, sentiment, start, end)
+        params = {k: v for k, v in request.args.items()}
+        response = requests.get(f"{API_URL}/dashboard", params=params)
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        app.logger.error(f"Error fetching dashboard: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/trends')
 def get_trends():
     """Fetch trending hashtags from the API."""
@@ -69,7 +81,8 @@ def get_tweets():
         # Forward query parameters
         params = {k: v for k, v in request.args.items()}
         response = requests.get(f"{API_URL}/tweets", params=params)
-        return jsonify(response.json())
+        # Keep the status: the page restarts on 410 (expired cursor)
+        return jsonify(response.json()), response.status_code
     except Exception as e:
         app.logger.error(f"Error fetching tweets: {e}")
         return jsonify({"error": str(e)}), 500
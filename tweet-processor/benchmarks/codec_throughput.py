@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Measure the Kafka wire codecs on the mock corpus.
+
+Reports encode and decode throughput (tweets/sec) of each available codec,
+and bytes per tweet before and after batch compression.
+
+Usage:
+    python benchmarks/codec_throughput.py [--corpus PATH] [--repeat N]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from codec import CODECS, get_codec  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', 'tweet-collector', 'mock_data', 'db.json'
+)
+
+
+def load_tweets(path):
+    """Load tweets from a json-server database file."""
+    with open(path) as f:
+        data = json.load(f)
+    return data.get('tweets', [])
+
+
+def compressors():
+    """Return the available batch compressors by Kafka compression type."""
+    available = {'gzip': gzip.compress}
+    try:
+        import lz4.frame
+        available['lz4'] = lz4.frame.compress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        available['zstd'] = zstandard.ZstdCompressor().compress
+    except ImportError:
+        pass
+    return available
+
+
+def rate(count, elapsed):
+    return round(count / elapsed, 1) if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='json-server db.json file')
+    parser.add_argument('--repeat', type=int, default=2000, help='Passes over the corpus for timing')
+    args = parser.parse_args()
+
+    tweets = load_tweets(args.corpus)
+    if not tweets:
+        print(f"No tweets found in {args.corpus}")
+        return 1
+
+    report = {'corpus': os.path.abspath(args.corpus), 'tweets': len(tweets), 'repeat': args.repeat}
+    count = len(tweets) * args.repeat
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except ValueError as e:
+            report[name] = {'note': str(e)}
+            continue
+        if codec.name != name:
+            report[name] = {'note': f"library not installed, falls back to {codec.name}"}
+            continue
+
+        encoded = [codec.encode(tweet) for tweet in tweets]
+        if [codec.decode(data) for data in encoded] != tweets:
+            report[name] = {'note': 'round trip does not preserve the tweets'}
+            continue
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for tweet in tweets:
+                codec.encode(tweet)
+        encode_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for data in encoded:
+                codec.decode(data)
+        decode_elapsed = time.perf_counter() - start
+
+        # Kafka compresses whole record batches, so compress the corpus as one batch
+        batch = b''.join(encoded)
+        report[name] = {
+            'encode_tweets_per_sec': rate(count, encode_elapsed),
+            'decode_tweets_per_sec': rate(count, decode_elapsed),
+            'bytes_per_tweet': round(len(batch) / len(tweets), 1),
+        }
+        for compression, compress in compressors().items():
+            report[name][f'{compression}_bytes_per_tweet'] = round(len(compress(batch)) / len(tweets), 1)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
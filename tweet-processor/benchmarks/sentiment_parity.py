@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare the lexicon sentiment engine against TextBlob on the mock corpus.
+
+Reports throughput (tweets/sec) of each backend and the label agreement of
+the lexicon engine with TextBlob.
+
+Usage:
+    python benchmarks/sentiment_parity.py [--corpus PATH] [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from processors.sentiment_processor import (  # noqa: E402
+    SENTIMENT_BACKENDS,
+    TEXTBLOB_AVAILABLE,
+)
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', 'tweet-collector', 'mock_data', 'db.json'
+)
+
+
+def load_texts(path):
+    """Load tweet texts from a json-server database file."""
+    with open(path) as f:
+        data = json.load(f)
+    return [tweet['text'] for tweet in data.get('tweets', []) if tweet.get('text')]
+
+
+def run_backend(backend, texts, repeat):
+    """Score the corpus `repeat` times; return (results of one pass, tweets/sec)."""
+    results = backend.score_batch(texts)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        backend.score_batch(texts)
+    elapsed = time.perf_counter() - start
+    return results, (len(texts) * repeat) / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='json-server db.json file')
+    parser.add_argument('--repeat', type=int, default=200, help='Passes over the corpus for timing')
+    args = parser.parse_args()
+
+    texts = load_texts(args.corpus)
+    if not texts:
+        print(f"No tweets found in {args.corpus}")
+        return 1
+
+    names = ['lexicon', 'keyword'] + (['textblob'] if TEXTBLOB_AVAILABLE else [])
+    report = {'corpus': os.path.abspath(args.corpus), 'tweets': len(texts), 'repeat': args.repeat}
+    labels = {}
+    for name in names:
+        results, rate = run_backend(SENTIMENT_BACKENDS[name](), texts, args.repeat)
+        labels[name] = [result['label'] for result in results]
+        report[name] = {'tweets_per_sec': round(rate, 1)}
+
+    if TEXTBLOB_AVAILABLE:
+        for name in ('lexicon', 'keyword'):
+            agree = sum(1 for a, b in zip(labels[name], labels['textblob']) if a == b)
+            report[name]['label_agreement_with_textblob'] = round(agree / len(texts), 3)
+        report['lexicon']['speedup_vs_textblob'] = round(
+            report['lexicon']['tweets_per_sec'] / report['textblob']['tweets_per_sec'], 1
+        )
+    else:
+        report['note'] = 'TextBlob not installed; parity not measured'
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Build the offline gazetteer used by processors/geocoder.py.
+
+Reads GeoNames city and country data, either the official dumps
+(cities15000.txt and countryInfo.txt from https://download.geonames.org/export/dump/)
+or the JSON files shipped with the geonamescache package, and writes a
+compact gzipped TSV.
+
+Usage:
+    python scripts/build_gazetteer.py CITIES COUNTRIES [--output PATH]
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+
+DEFAULT_OUTPUT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'src', 'processors', 'data', 'gazetteer.tsv.gz'
+)
+
+# Alternate names kept per place: Latin script only, to bound the file size.
+# Short ones are mostly airport codes that collide with ordinary words.
+ALTERNATE_NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z .'\-]{3,39}$")
+
+
+def read_cities(path):
+    """Yield (name, lat, lon, country, population, alternate_names)."""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            for city in json.load(f).values():
+                yield (city['name'], city['latitude'], city['longitude'], city['countrycode'],
+                       city['population'], city.get('alternatenames') or [])
+        return
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            yield (fields[1], float(fields[4]), float(fields[5]), fields[8],
+                   int(fields[14] or 0), fields[3].split(',') if fields[3] else [])
+
+
+def read_countries(path):
+    """Yield (iso, name, capital)."""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            for country in json.load(f).values():
+                yield country['iso'], country['name'], country.get('capital') or ''
+        return
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t')
+            yield fields[0], fields[4], fields[5]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('cities', help='cities15000.txt or geonamescache cities15000.json')
+    parser.add_argument('countries', help='countryInfo.txt or geonamescache countries.json')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    cities = sorted(read_cities(args.cities), key=lambda city: -city[4])
+    largest_by_name = {}
+    for name, lat, lon, country, population, _ in cities:
+        largest_by_name.setdefault((country, name.lower()), (lat, lon))
+
+    with gzip.open(args.output, 'wt', encoding='utf-8', compresslevel=9) as out:
+        out.write("# Data from GeoNames (https://www.geonames.org/), licensed CC BY 4.0\n")
+        out.write("# kind\tname\tlat\tlon\tcountry\tpopulation\talternate names\n")
+
+        countries = 0
+        for iso, name, capital in read_countries(args.countries):
+            coordinates = largest_by_name.get((iso, capital.lower()))
+            if coordinates is None:
+                continue
+            out.write(f"country\t{name}\t{coordinates[0]:.4f}\t{coordinates[1]:.4f}\t{iso}\t0\t\n")
+            countries += 1
+
+        for name, lat, lon, country, population, alternate_names in cities:
+            seen = {name.lower()}
+            alternates = []
+            for alternate in alternate_names:
+                if ALTERNATE_NAME_PATTERN.match(alternate) and alternate.lower() not in seen:
+                    seen.add(alternate.lower())
+                    alternates.append(alternate)
+            out.write(f"city\t{name}\t{lat:.4f}\t{lon:.4f}\t{country}\t{population}\t{'|'.join(alternates)}\n")
+
+    print(f"Wrote {countries} countries and {len(cities)} cities to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Buffered bulk indexing of processed tweets into Elasticsearch.
+"""
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BULK_SIZE = 1000
+DEFAULT_BULK_MAX_BYTES = 5 * 1024 * 1024  # 5 MB
+DEFAULT_BULK_FLUSH_INTERVAL = 5.0  # seconds
+
+
+def is_retriable_status(status):
+    """
+    Return True if a failed write with this HTTP status may succeed when retried.
+
+    Rejections for load (429) and server errors (5xx) are transient; other
+    4xx errors, e.g. a mapper_parsing_exception, fail the same way every time.
+    Unknown statuses, as for connection errors and timeouts, are retriable.
+    """
+    if not isinstance(status, int):
+        return True
+    return status == 429 or status >= 500
+
+
+class BulkIndexer:
+    """
+    Buffer documents and send them to Elasticsearch with the `_bulk` API.
+
+    Documents with an `id` are indexed with that value as `_id`, so a
+    replayed tweet overwrites its previous version instead of duplicating it.
+
+    The buffer is flushed when it holds `bulk_size` documents, when the
+    serialized payload reaches `max_bytes`, or when the oldest buffered
+    document has waited longer than `flush_interval` seconds.
+
+    Documents can also be added to another index, e.g. the trending
+    hashtags snapshots, and ride along in the same bulk requests. Their
+    failures are logged and counted but never returned, since they are not
+    tied to consumed offsets.
+
+    Only retriable failures (see is_retriable_status) are returned to the
+    caller. Documents rejected for good are logged, counted in
+    `rejected_count` and handed to `dead_letter(document, error)` if given,
+    so that a single malformed tweet cannot block its partition.
+    """
+
+    def __init__(self, es_client, index_name, bulk_size=DEFAULT_BULK_SIZE,
+                 max_bytes=DEFAULT_BULK_MAX_BYTES, flush_interval=DEFAULT_BULK_FLUSH_INTERVAL,
+                 dead_letter=None):
+        self.es_client = es_client
+        self.index_name = index_name
+        self.bulk_size = max(1, int(bulk_size))
+        self.max_bytes = max(1, int(max_bytes))
+        self.flush_interval = float(flush_interval)
+        self.dead_letter = dead_letter
+
+        self._lines = []
+        self._docs = []
+        self._auxiliary = []
+        self._bytes = 0
+        self._first_added_at = None
+
+        self.indexed_count = 0
+        self.failed_count = 0
+        self.rejected_count = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, document, index=None, doc_id=None):
+        """
+        Add a document to the buffer, flushing first if it would overflow.
+
+        Args:
+            document (dict): Processed tweet to index
+            index (str): Index of an auxiliary document, instead of `index_name`
+            doc_id (str): `_id` of the document, instead of its `id` field
+
+        Returns:
+            list: Documents that failed to index with a retriable error if a
+            flush happened, else []
+        """
+        metadata = {"_index": index or self.index_name}
+        if doc_id is None:
+            doc_id = document.get('id')
+        if doc_id is not None:
+            metadata["_id"] = str(doc_id)
+        action = json.dumps({"index": metadata})
+        source = json.dumps(document, default=str)
+        size = len(action) + len(source) + 2
+
+        failed = []
+        if self._docs and self._bytes + size > self.max_bytes:
+            failed = self.flush()
+
+        self._lines.append(action)
+        self._lines.append(source)
+        self._docs.append(document)
+        self._auxiliary.append(index is not None and index != self.index_name)
+        self._bytes += size
+        if self._first_added_at is None:
+            self._first_added_at = time.monotonic()
+
+        if len(self._docs) >= self.bulk_size or self._bytes >= self.max_bytes:
+            failed.extend(self.flush())
+        return failed
+
+    def is_due(self):
+        """Return True if the oldest buffered document exceeded the flush interval."""
+        if self._first_added_at is None:
+            return False
+        return time.monotonic() - self._first_added_at >= self.flush_interval
+
+    def flush_if_due(self):
+        """Flush the buffer if the max-latency timer has expired."""
+        if self.is_due():
+            return self.flush()
+        return []
+
+    def flush(self):
+        """
+        Send all buffered documents in a single bulk request.
+
+        Returns:
+            list: Documents that failed to index with a retriable error
+            (request error or per-item error)
+        """
+        if not self._docs:
+            return []
+
+        docs = self._docs
+        auxiliary = self._auxiliary
+        body = "\n".join(self._lines) + "\n"
+        self._reset()
+
+        try:
+            response = self.es_client.bulk(body=body)
+        except Exception as e:
+            status = getattr(e, 'status_code', None)
+            logger.error(f"Bulk request of {len(docs)} documents failed with status {status}: {e}")
+            items = [{'index': {'status': status, 'error': str(e)}}] * len(docs)
+        else:
+            if not response.get('errors'):
+                self.indexed_count += len(docs)
+                logger.info(f"Bulk indexed {len(docs)} documents")
+                return []
+            items = response.get('items', [])
+
+        failed = []
+        rejected = 0
+        lost = 0
+        for doc, aux, item in zip(docs, auxiliary, items):
+            result = item.get('index', {})
+            status = result.get('status', 500)
+            if isinstance(status, int) and status < 300:
+                continue
+            if aux:
+                logger.error(f"Error indexing document in {result.get('_index', 'auxiliary index')}: {result.get('error')}")
+                lost += 1
+            elif is_retriable_status(status):
+                logger.error(
+                    f"Error indexing tweet {doc.get('id', 'unknown')}: "
+                    f"{result.get('error')}"
+                )
+                failed.append(doc)
+            else:
+                self._reject(doc, result.get('error'))
+                rejected += 1
+
+        self.failed_count += len(failed) + lost
+        indexed = len(docs) - len(failed) - rejected - lost
+        self.indexed_count += indexed
+        logger.info(
+            f"Bulk indexed {indexed} documents "
+            f"({len(failed) + lost} failed, {rejected} rejected)"
+        )
+        return failed
+
+    def _reject(self, doc, error):
+        """Log, count and dead-letter a document that cannot be indexed."""
+        logger.error(f"Rejected tweet {doc.get('id', 'unknown')}, not retrying: {error}")
+        self.rejected_count += 1
+        if self.dead_letter is not None:
+            try:
+                self.dead_letter(doc, error)
+            except Exception as e:
+                logger.error(f"Could not dead-letter tweet {doc.get('id', 'unknown')}: {e}")
+
+    def _reset(self):
+        self._lines = []
+        self._docs = []
+        self._auxiliary = []
+        self._bytes = 0
+        self._first_added_at = None
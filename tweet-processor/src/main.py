@@ -1,12 +1,36 @@
 import json
 import logging
 import os
+import re
+import signal
 import sys
 import time
 import configparser
 from datetime import datetime
 from kafka import KafkaConsumer, KafkaProducer
+from kafka.structs import OffsetAndMetadata
 from elasticsearch import Elasticsearch
+from worker_pool import create_process_pool, map_in_pool
+from codec import EncodingProducer, decode_record, get_codec, resolve_compression_type
+from trending import (
+    TrendingHashtags,
+    DEFAULT_WINDOW_SIZE,
+    DEFAULT_SLIDE_INTERVAL,
+    DEFAULT_MIN_HASHTAG_COUNT,
+    DEFAULT_TOP_K,
+)
+from pipeline import (
+    configure_pipeline,
+    get_pipeline,
+    register_stage,
+    DEFAULT_METRICS_INTERVAL,
+)
+from bulk_indexer import (
+    BulkIndexer,
+    DEFAULT_BULK_SIZE,
+    DEFAULT_BULK_MAX_BYTES,
+    DEFAULT_BULK_FLUSH_INTERVAL,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -18,8 +42,27 @@ logger = logging.getLogger(__name__)
 # Try to import processors
 try:
     from processors.hashtag_processor import process_hashtags
-    from processors.location_processor import normalize_locations
-    from processors.sentiment_processor import analyze_sentiment
+    from processors.location_processor import normalize_locations, normalize_locations_batch
+    from processors.sentiment_processor import (
+        analyze_sentiment,
+        analyze_sentiment_batch,
+        set_sentiment_backend,
+        set_sentiment_cache,
+    )
+    from processors.sentiment_cache import (
+        SentimentCache,
+        DEFAULT_CACHE_SIZE,
+        DEFAULT_CACHE_TTL,
+    )
+    from processors.text_analysis import analyze_text, annotate_language
+    from processors.region_classifier import RegionClassifier, set_region_classifier
+    from processors.geocoder import (
+        Gazetteer,
+        get_geocoder,
+        set_geocoder,
+        DEFAULT_GAZETTEER_FILE,
+        DEFAULT_GEOCODER_CACHE_SIZE,
+    )
     PROCESSORS_AVAILABLE = True
     logger.info("Using advanced processors")
 except ImportError as e:
@@ -27,12 +70,25 @@ except ImportError as e:
     PROCESSORS_AVAILABLE = False
 
 # Simplified processors if imports fail
+SIMPLE_HASHTAG_PATTERN = re.compile(r'#(\w+)')
+SIMPLE_WORD_PATTERN = re.compile(r'[a-z]+')
+
+# Enhanced positive word list
+SIMPLE_POSITIVE_WORDS = frozenset([
+    'good', 'great', 'nice', 'happy', 'love', 'excited', 'amazing',
+    'impressive', 'excellent', 'enjoying', 'fantastic', 'brilliant'
+])
+
+# Enhanced negative word list
+SIMPLE_NEGATIVE_WORDS = frozenset([
+    'bad', 'awful', 'hate', 'sad', 'terrible', 'disappointed',
+    'frustrated', 'issues', 'problems', 'avoid', 'failed', 'struggling'
+])
+
 def simple_process_hashtags(tweet):
     if 'text' in tweet and 'hashtags' not in tweet:
         # Extract hashtags using simple regex
-        import re
-        hashtag_pattern = r'#(\w+)'
-        hashtags = re.findall(hashtag_pattern, tweet.get('text', ''))
+        hashtags = SIMPLE_HASHTAG_PATTERN.findall(tweet.get('text', ''))
         tweet['hashtags'] = [tag.lower() for tag in hashtags]
     return tweet
 
@@ -73,23 +129,11 @@ def simple_normalize_locations(tweet):
 
 def simple_analyze_sentiment(tweet):
     if 'sentiment' not in tweet and 'text' in tweet:
-        # Enhanced basic sentiment using keywords
-        text = tweet.get('text', '').lower()
-        
-        # Enhanced positive word list
-        positive_words = [
-            'good', 'great', 'nice', 'happy', 'love', 'excited', 'amazing',
-            'impressive', 'excellent', 'enjoying', 'fantastic', 'brilliant'
-        ]
-        
-        # Enhanced negative word list
-        negative_words = [
-            'bad', 'awful', 'hate', 'sad', 'terrible', 'disappointed',
-            'frustrated', 'issues', 'problems', 'avoid', 'failed', 'struggling'
-        ]
+        # Enhanced basic sentiment using keywords, tokenizing the text once
+        words = set(SIMPLE_WORD_PATTERN.findall(tweet.get('text', '').lower()))
         
-        pos_count = sum(1 for word in positive_words if word in text)
-        neg_count = sum(1 for word in negative_words if word in text)
+        pos_count = len(words & SIMPLE_POSITIVE_WORDS)
+        neg_count = len(words & SIMPLE_NEGATIVE_WORDS)
         
         # Logic for determining sentiment
         if pos_count > neg_count:
@@ -102,6 +146,42 @@ def simple_analyze_sentiment(tweet):
         tweet['sentiment'] = {'label': sentiment}
     return tweet
 
+# Processing stages, see pipeline.py
+if PROCESSORS_AVAILABLE:
+    @register_stage('text')
+    def text_stage(tweet, context):
+        # Tokenize once and share the tokens between stages
+        context['analysis'] = analyze_text(tweet.get('text', ''))
+        return tweet
+    
+    @register_stage('hashtags')
+    def hashtags_stage(tweet, context):
+        return process_hashtags(tweet, context.get('analysis'))
+    
+    def location_batch_stage(tweets, contexts):
+        # Classify the coordinates of the whole batch in one NumPy call
+        return normalize_locations_batch(tweets)
+    
+    @register_stage('location', batch=location_batch_stage)
+    def location_stage(tweet, context):
+        return normalize_locations(tweet)
+    
+    def sentiment_batch_stage(tweets, contexts):
+        # Score the texts of the whole batch with one backend call
+        return analyze_sentiment_batch(tweets, [context.get('analysis') for context in contexts])
+    
+    @register_stage('sentiment', batch=sentiment_batch_stage)
+    def sentiment_stage(tweet, context):
+        return analyze_sentiment(tweet, context.get('analysis'))
+    
+    @register_stage('language')
+    def language_stage(tweet, context):
+        return annotate_language(tweet, context.get('analysis'))
+else:
+    register_stage('hashtags', lambda tweet, context: simple_process_hashtags(tweet))
+    register_stage('location', lambda tweet, context: simple_normalize_locations(tweet))
+    register_stage('sentiment', lambda tweet, context: simple_analyze_sentiment(tweet))
+
 def process_tweet(tweet):
     """Process a single tweet."""
     try:
@@ -111,15 +191,8 @@ def process_tweet(tweet):
         else:
             processed = tweet.copy()
         
-        # Apply processors
-        if PROCESSORS_AVAILABLE:
-            processed = process_hashtags(processed)
-            processed = normalize_locations(processed)
-            processed = analyze_sentiment(processed)
-        else:
-            processed = simple_process_hashtags(processed)
-            processed = simple_normalize_locations(processed)
-            processed = simple_analyze_sentiment(processed)
+        # Apply the configured stages
+        processed = get_pipeline().run(processed)
         
         # Add processing metadata
         processed['processed'] = True
@@ -132,6 +205,35 @@ def process_tweet(tweet):
             return json.loads(tweet)
         return tweet
 
+def process_tweets(tweets):
+    """
+    Process a micro-batch of tweets.
+    
+    Stages that support it (see pipeline.register_stage) process the whole
+    batch in one call; the others are applied tweet by tweet.
+    """
+    processed = [json.loads(tweet) if isinstance(tweet, str) else tweet.copy() for tweet in tweets]
+    
+    # Apply the configured stages
+    processed = get_pipeline().run_batch(processed)
+    
+    # Add processing metadata
+    processed_at = datetime.now().isoformat()
+    for tweet in processed:
+        tweet['processed'] = True
+        tweet['processed_at'] = processed_at
+    return processed
+
+def process_tweet_chunk(tweets):
+    """
+    Process a chunk of tweets in a pool worker.
+    
+    Returns the processed tweets and the stage metrics collected while
+    processing them, which the parent merges into its own pipeline.
+    """
+    processed = process_tweets(tweets)
+    return processed, get_pipeline().drain_metrics()
+
 def load_config():
     """Load configuration from config.ini."""
     config = configparser.ConfigParser()
@@ -163,7 +265,13 @@ def create_elasticsearch_client(config):
     
     return Elasticsearch(hosts)
 
-def create_kafka_consumer(config):
+def is_resumable(config):
+    """Return True if the processor should resume from committed offsets and keep the index."""
+    if config and 'processing' in config:
+        return config['processing'].getboolean('resumable', False)
+    return os.environ.get('RESUMABLE_MODE', 'false').lower() == 'true'
+
+def create_kafka_consumer(config, enable_auto_commit=True, resumable=False):
     """Create and return a Kafka consumer."""
     import time
     
@@ -171,45 +279,95 @@ def create_kafka_consumer(config):
     if config and 'kafka' in config:
         bootstrap_servers = config['kafka'].get('bootstrap_servers', 'kafka:9092')
         topic = config['kafka'].get('input_topic', 'raw-tweets')
-        # Use a unique group ID each time to force reading from the beginning
-        unique_suffix = str(int(time.time()))
-        group_id = f"tweet-processor-{unique_suffix}"
+        configured_group_id = config['kafka'].get('group_id', 'tweet-processor')
     else:
         bootstrap_servers = os.environ.get('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092')
         topic = os.environ.get('KAFKA_INPUT_TOPIC', 'raw-tweets')
+        configured_group_id = os.environ.get('KAFKA_GROUP_ID', 'tweet-processor')
+    
+    if resumable:
+        # Stable group ID so committed offsets survive restarts
+        group_id = configured_group_id
+    else:
+        # Use a unique group ID each time to force reading from the beginning
         unique_suffix = str(int(time.time()))
-        group_id = f"tweet-processor-{unique_suffix}"
+        group_id = f"{configured_group_id}-{unique_suffix}"
     
     logger.info(f"Creating Kafka consumer for {topic} at {bootstrap_servers} with group {group_id}")
     
-    # Create consumer with explicit settings to force reading from beginning
+    # Without committed offsets, start from the beginning of the topic
     return KafkaConsumer(
         topic,
         bootstrap_servers=bootstrap_servers,
-        auto_offset_reset='earliest',  # Always start from the beginning
-        enable_auto_commit=True,
-        group_id=group_id,  # Use unique group ID
-        value_deserializer=lambda x: json.loads(x.decode('utf-8')) if x else None
+        auto_offset_reset='earliest',
+        enable_auto_commit=enable_auto_commit,
+        group_id=group_id
     )
 
+def decode_records(records):
+    """
+    Decode the values of consumed records with the codec named in their headers.
+    
+    Records that cannot be decoded are logged and skipped, since redelivering
+    them would fail the same way.
+    """
+    tweets = []
+    for record in records:
+        try:
+            tweet = decode_record(record)
+        except Exception as e:
+            logger.error(f"Could not decode record at {record.topic}[{record.partition}]@{record.offset}: {e}")
+            continue
+        if tweet is not None:
+            tweets.append(tweet)
+    return tweets
+
 def create_kafka_producer(config):
-    """Create and return a Kafka producer."""
+    """
+    Create and return a Kafka producer.
+    
+    Values are encoded with the configured codec (`[kafka] codec`), named in
+    the header of each message, and compressed with `[kafka] compression_type`.
+    """
     # Use environment variables or config file
     if config and 'kafka' in config:
         bootstrap_servers = config['kafka'].get('bootstrap_servers', 'kafka:9092')
+        codec_name = config['kafka'].get('codec') or None
+        compression_type = config['kafka'].get('compression_type') or None
     else:
         bootstrap_servers = os.environ.get('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092')
+        codec_name = os.environ.get('KAFKA_CODEC') or None
+        compression_type = os.environ.get('KAFKA_COMPRESSION_TYPE') or None
     
-    logger.info(f"Creating Kafka producer at {bootstrap_servers}")
+    try:
+        codec = get_codec(codec_name)
+    except ValueError as e:
+        logger.error(f"{e}. Using JSON codec.")
+        codec = get_codec(None)
+    try:
+        compression_type = resolve_compression_type(compression_type)
+    except ValueError as e:
+        logger.error(f"{e}. Sending uncompressed messages.")
+        compression_type = None
+    
+    logger.info(
+        f"Creating Kafka producer at {bootstrap_servers} "
+        f"(codec {codec.name}, compression {compression_type or 'none'})"
+    )
     
     # Create producer
-    return KafkaProducer(
+    producer = KafkaProducer(
         bootstrap_servers=bootstrap_servers,
-        value_serializer=lambda x: json.dumps(x).encode('utf-8') if x else None
+        compression_type=compression_type
     )
+    return EncodingProducer(producer, codec)
 
-def ensure_elasticsearch_index(es_client, config):
-    """Ensure the Elasticsearch index exists with proper mappings."""
+def ensure_elasticsearch_index(es_client, config, recreate=True):
+    """
+    Ensure the Elasticsearch index exists with proper mappings.
+    
+    With recreate=False an existing index is kept as is.
+    """
     # Get index name from config or environment
     if config and 'elasticsearch' in config:
         index_name = config['elasticsearch'].get('index', 'tweets')
@@ -220,6 +378,10 @@ def ensure_elasticsearch_index(es_client, config):
     
     # Delete existing index to ensure clean mapping
     if es_client.indices.exists(index=index_name):
+        if not recreate:
+            logger.info(f"Keeping existing index {index_name}")
+            warn_if_outdated_mapping(es_client, index_name)
+            return index_name
         logger.info(f"Deleting existing index {index_name}")
         try:
             es_client.indices.delete(index=index_name)
@@ -232,6 +394,9 @@ def ensure_elasticsearch_index(es_client, config):
     mapping = {
         "mappings": {
             "properties": {
+                # Keyword, so that tweets can be sorted by id (the API's
+                # pagination tiebreaker)
+                "id": {"type": "keyword"},
                 "geo": {"type": "geo_point"},
                 "created_at": {"type": "date"},
                 "processed_at": {"type": "date"},
@@ -243,7 +408,9 @@ def ensure_elasticsearch_index(es_client, config):
                     }
                 },
                 "hashtags": {"type": "keyword"},
-                "region": {"type": "keyword"}
+                "region": {"type": "keyword"},
+                "country": {"type": "keyword"},
+                "location_name": {"type": "keyword"}
             }
         }
     }
@@ -257,63 +424,556 @@ def ensure_elasticsearch_index(es_client, config):
     
     return index_name
 
+def warn_if_outdated_mapping(es_client, index_name):
+    """
+    Warn if a kept index has no sortable id field.
+    
+    The API sorts and pages tweets on `id`, or on its `id.keyword` subfield
+    in indices where `id` was mapped dynamically as text. An index mapping
+    `id` as text without that subfield cannot be paged: the mapping of an
+    existing field cannot be changed in place, so the index has to be
+    recreated or reindexed.
+    """
+    try:
+        mappings = es_client.indices.get_mapping(index=index_name)
+    except Exception as e:
+        logger.warning(f"Could not check the mapping of index {index_name}: {e}")
+        return
+    for name, mapping in mappings.items():
+        id_mapping = mapping.get('mappings', {}).get('properties', {}).get('id', {})
+        if id_mapping.get('type') != 'text':
+            continue
+        if id_mapping.get('fields', {}).get('keyword', {}).get('type') != 'keyword':
+            logger.warning(
+                f"Index {name} maps id as text without a keyword subfield: /tweets pagination will fail. "
+                f"Start once with resumable = false to recreate it, or reindex it into a new index"
+            )
+
+def create_bulk_indexer(es_client, index_name, config, producer=None):
+    """
+    Create a bulk indexer configured from config.ini or the environment.
+    
+    Tweets Elasticsearch rejects for good are published to `[kafka]
+    dead_letter_topic` with `producer`, if both are set, else only logged.
+    """
+    if config and 'kafka' in config:
+        dead_letter_topic = config['kafka'].get('dead_letter_topic') or None
+    else:
+        dead_letter_topic = os.environ.get('KAFKA_DEAD_LETTER_TOPIC') or None
+    if config and 'elasticsearch' in config:
+        bulk_size = config['elasticsearch'].getint('bulk_size', DEFAULT_BULK_SIZE)
+        max_bytes = config['elasticsearch'].getint('bulk_max_bytes', DEFAULT_BULK_MAX_BYTES)
+        flush_interval = config['elasticsearch'].getfloat('bulk_flush_interval', DEFAULT_BULK_FLUSH_INTERVAL)
+    else:
+        bulk_size = int(os.environ.get('ES_BULK_SIZE', DEFAULT_BULK_SIZE))
+        max_bytes = int(os.environ.get('ES_BULK_MAX_BYTES', DEFAULT_BULK_MAX_BYTES))
+        flush_interval = float(os.environ.get('ES_BULK_FLUSH_INTERVAL', DEFAULT_BULK_FLUSH_INTERVAL))
+    
+    logger.info(f"Bulk indexing with size={bulk_size}, max_bytes={max_bytes}, flush_interval={flush_interval}s")
+    
+    dead_letter = None
+    if dead_letter_topic and producer is not None:
+        logger.info(f"Publishing tweets rejected by Elasticsearch to {dead_letter_topic}")
+        
+        def dead_letter(tweet, error):
+            producer.send(dead_letter_topic, {'tweet': tweet, 'error': error})
+    
+    return BulkIndexer(
+        es_client,
+        index_name,
+        bulk_size=bulk_size,
+        max_bytes=max_bytes,
+        flush_interval=flush_interval,
+        dead_letter=dead_letter
+    )
+
+def create_trending_hashtags(config, producer, indexer):
+    """
+    Create the sliding-window trending hashtags from the `[processing]`
+    window settings, or return None if `trending_top_k` is 0.
+    
+    Snapshots are indexed through the tweets' bulk `indexer`.
+    """
+    if config and 'processing' in config:
+        window_size = config['processing'].getint('window_size', DEFAULT_WINDOW_SIZE)
+        slide_interval = config['processing'].getint('slide_interval', DEFAULT_SLIDE_INTERVAL)
+        min_count = config['processing'].getint('min_hashtag_count', DEFAULT_MIN_HASHTAG_COUNT)
+        top_k = config['processing'].getint('trending_top_k', DEFAULT_TOP_K)
+    else:
+        window_size = int(os.environ.get('TRENDING_WINDOW_SIZE', DEFAULT_WINDOW_SIZE))
+        slide_interval = int(os.environ.get('TRENDING_SLIDE_INTERVAL', DEFAULT_SLIDE_INTERVAL))
+        min_count = int(os.environ.get('TRENDING_MIN_COUNT', DEFAULT_MIN_HASHTAG_COUNT))
+        top_k = int(os.environ.get('TRENDING_TOP_K', DEFAULT_TOP_K))
+    if config and 'kafka' in config:
+        topic = config['kafka'].get('trending_topic', 'trending-hashtags')
+    else:
+        topic = os.environ.get('KAFKA_TRENDING_TOPIC', 'trending-hashtags')
+    if config and 'elasticsearch' in config:
+        index_name = config['elasticsearch'].get('trending_index', 'trending-hashtags')
+    else:
+        index_name = os.environ.get('ES_TRENDING_INDEX', 'trending-hashtags')
+    
+    if top_k <= 0:
+        return None
+    
+    logger.info(
+        f"Trending top {top_k} hashtags over {window_size}s sliding every {slide_interval}s "
+        f"(min count {min_count}) to {topic} and {index_name}"
+    )
+    return TrendingHashtags(
+        producer, topic, indexer, index_name,
+        window_size=window_size,
+        slide_interval=slide_interval,
+        min_count=min_count,
+        top_k=top_k
+    )
+
+def get_sentiment_backend_name(config):
+    """Return the configured sentiment backend name, or None for the default."""
+    if config and 'processing' in config:
+        return config['processing'].get('sentiment_backend') or None
+    return os.environ.get('SENTIMENT_BACKEND') or None
+
+def configure_sentiment_backend(config):
+    """Select the sentiment backend used by process_tweet in this process."""
+    name = get_sentiment_backend_name(config)
+    if PROCESSORS_AVAILABLE:
+        try:
+            set_sentiment_backend(name)
+        except ValueError as e:
+            logger.error(f"{e}. Using default sentiment backend.")
+            name = None
+            set_sentiment_backend(None)
+    return name
+
+def configure_sentiment_cache(config):
+    """
+    Create the sentiment cache used by process_tweet in this process.
+    
+    Pool workers each get a copy of it. Returns the cache, or None if disabled.
+    """
+    if not PROCESSORS_AVAILABLE:
+        return None
+    
+    if config and 'processing' in config:
+        size = config['processing'].getint('sentiment_cache_size', DEFAULT_CACHE_SIZE)
+        ttl = config['processing'].getfloat('sentiment_cache_ttl', DEFAULT_CACHE_TTL)
+    else:
+        size = int(os.environ.get('SENTIMENT_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+        ttl = float(os.environ.get('SENTIMENT_CACHE_TTL', DEFAULT_CACHE_TTL))
+    
+    if size <= 0:
+        set_sentiment_cache(None)
+        return None
+    
+    logger.info(f"Sentiment cache with {size} entries, ttl={ttl}s")
+    cache = SentimentCache(size, ttl)
+    set_sentiment_cache(cache)
+    return cache
+
+def configure_region_classifier(config):
+    """
+    Load custom region/country boundaries if configured.
+    
+    Returns the boundaries file, or None when the bundled regions are used.
+    """
+    if config and 'processing' in config:
+        path = config['processing'].get('region_boundaries') or None
+    else:
+        path = os.environ.get('REGION_BOUNDARIES_FILE') or None
+    
+    if path and PROCESSORS_AVAILABLE:
+        set_region_classifier(RegionClassifier.from_geojson(path))
+    return path
+
+def configure_geocoder(config):
+    """
+    Load a custom gazetteer or cache size for user location geocoding if configured.
+    
+    Returns (gazetteer file, cache size), or None when the defaults are used.
+    """
+    if config and 'processing' in config:
+        path = config['processing'].get('gazetteer') or None
+        cache_size = config['processing'].get('geocoder_cache_size') or None
+    else:
+        path = os.environ.get('GAZETTEER_FILE') or None
+        cache_size = os.environ.get('GEOCODER_CACHE_SIZE') or None
+    
+    if not (path or cache_size) or not PROCESSORS_AVAILABLE:
+        return None
+    settings = (path or DEFAULT_GAZETTEER_FILE, int(cache_size or DEFAULT_GEOCODER_CACHE_SIZE))
+    set_geocoder(Gazetteer.from_file(*settings))
+    return settings
+
+def configure_processing_pipeline(config):
+    """
+    Build the pipeline of processing stages from `[processing] stages`.
+    
+    Returns (stage names, metrics interval), to configure pool workers alike.
+    """
+    if config and 'processing' in config:
+        names = config['processing'].get('stages', '')
+        interval = config['processing'].getfloat('stage_metrics_interval', DEFAULT_METRICS_INTERVAL)
+    else:
+        names = os.environ.get('PROCESSING_STAGES', '')
+        interval = float(os.environ.get('STAGE_METRICS_INTERVAL', DEFAULT_METRICS_INTERVAL))
+    
+    names = [name.strip() for name in names.split(',') if name.strip()] or None
+    pipeline = configure_pipeline(names, interval)
+    return pipeline.names, interval
+
+def get_output_topic(config):
+    """Return the Kafka topic processed tweets are published to."""
+    if config and 'kafka' in config:
+        return config['kafka'].get('output_topic', 'processed-tweets')
+    return os.environ.get('KAFKA_OUTPUT_TOPIC', 'processed-tweets')
+
+def get_batch_settings(config):
+    """Return (batch_mode, max_poll_records, poll_timeout_ms) from config.ini or the environment."""
+    if config and 'kafka' in config:
+        batch_mode = config['kafka'].getboolean('batch_mode', False)
+        max_records = config['kafka'].getint('max_poll_records', 500)
+        timeout_ms = config['kafka'].getint('poll_timeout_ms', 1000)
+    else:
+        batch_mode = os.environ.get('KAFKA_BATCH_MODE', 'false').lower() == 'true'
+        max_records = int(os.environ.get('KAFKA_MAX_POLL_RECORDS', '500'))
+        timeout_ms = int(os.environ.get('KAFKA_POLL_TIMEOUT_MS', '1000'))
+    return batch_mode, max_records, timeout_ms
+
+def get_parallelism(config):
+    """Return the number of worker processes used to process batches."""
+    if config and 'flink' in config:
+        return config['flink'].getint('parallelism', 1)
+    return int(os.environ.get('PROCESSING_PARALLELISM', '1'))
+
+def process_batch(records, producer, indexer, output_topic, pool=None, parallelism=1, trending=None):
+    """
+    Process a batch of Kafka records and write them to Kafka and Elasticsearch.
+    
+    When a process pool is given, tweets are processed on its workers; the
+    output keeps the input order, and therefore the per-partition order.
+    Hashtags are counted in `trending` once the batch is acknowledged, so
+    redelivered batches are not counted twice.
+    
+    Returns True only if every tweet was acknowledged by both the output topic
+    and Elasticsearch. Tweets Elasticsearch rejects for good (non-retriable
+    4xx item errors) are dead-lettered by the indexer and count as handled.
+    """
+    raw_tweets = decode_records(records)
+    pipeline = get_pipeline()
+    if pool is not None:
+        # Chunks rather than single tweets, so that each result also carries
+        # the stage metrics of the worker
+        size = max(1, len(raw_tweets) // (parallelism * 4))
+        chunks = [raw_tweets[start:start + size] for start in range(0, len(raw_tweets), size)]
+        processed_tweets = []
+        for processed, metrics in map_in_pool(pool, process_tweet_chunk, chunks, parallelism):
+            processed_tweets.extend(processed)
+            pipeline.merge_metrics(metrics)
+    else:
+        processed_tweets = process_tweets(raw_tweets)
+    pipeline.log_stats_if_due()
+    
+    # Send to output Kafka topic
+    futures = [producer.send(output_topic, tweet) for tweet in processed_tweets]
+    
+    # Index in Elasticsearch
+    failed = []
+    for tweet in processed_tweets:
+        failed.extend(indexer.add(tweet))
+    failed.extend(indexer.flush())
+    
+    # Wait for Kafka acknowledgements
+    producer.flush()
+    send_errors = sum(1 for future in futures if future.failed())
+    
+    if failed or send_errors:
+        logger.error(
+            f"Batch of {len(processed_tweets)} tweets not acknowledged: "
+            f"{len(failed)} indexing failures, {send_errors} Kafka send failures"
+        )
+        return False
+    
+    if trending is not None:
+        trending.add_batch(processed_tweets)
+    return True
+
+def process_and_commit(consumer, batch, producer, indexer, output_topic, pool=None, parallelism=1,
+                       trending=None):
+    """
+    Process a polled batch and commit its offsets once it has been acknowledged.
+    
+    If the batch is not fully acknowledged because of retriable failures, or
+    processing it raises, the consumer is rewound so that the whole batch is
+    redelivered (at-least-once); the exception is then re-raised.
+    
+    Returns the number of records committed.
+    """
+    records = [record for partition_records in batch.values() for record in partition_records]
+    try:
+        acknowledged = process_batch(records, producer, indexer, output_topic, pool, parallelism, trending)
+    except Exception:
+        rewind(consumer, batch)
+        raise
+    if acknowledged:
+        consumer.commit({
+            partition: OffsetAndMetadata(partition_records[-1].offset + 1, None)
+            for partition, partition_records in batch.items()
+        })
+        return len(records)
+    
+    rewind(consumer, batch)
+    return 0
+
+def rewind(consumer, batch):
+    """Seek every partition of a polled batch back to its first record."""
+    for partition, partition_records in batch.items():
+        consumer.seek(partition, partition_records[0].offset)
+
+def consume_in_batches(consumer, producer, indexer, output_topic, max_records, timeout_ms,
+                       pool=None, parallelism=1, trending=None):
+    """
+    Consume Kafka in micro-batches, committing offsets only after each batch
+    has been acknowledged by Elasticsearch and the output topic.
+    """
+    processed_count = 0
+    while True:
+        if trending is not None:
+            trending.slide_if_due()
+        
+        batch = consumer.poll(timeout_ms=timeout_ms, max_records=max_records)
+        if not batch:
+            continue
+        
+        committed = process_and_commit(
+            consumer, batch, producer, indexer, output_topic, pool, parallelism, trending
+        )
+        if committed:
+            processed_count += committed
+            logger.info(f"Processed {processed_count} tweets")
+        else:
+            time.sleep(1)
+
 def process_tweets_from_kafka(config):
     """Process tweets from Kafka and store in Elasticsearch."""
+    sentiment_backend = configure_sentiment_backend(config)
+    sentiment_cache = configure_sentiment_cache(config)
+    region_boundaries = configure_region_classifier(config)
+    geocoder_settings = configure_geocoder(config)
+    pipeline_settings = configure_processing_pipeline(config)
+    
     # Create Elasticsearch client
     es_client = create_elasticsearch_client(config)
     
     # Create Kafka consumer and producer
-    consumer = create_kafka_consumer(config)
+    batch_mode, max_records, timeout_ms = get_batch_settings(config)
+    resumable = is_resumable(config)
+    consumer = create_kafka_consumer(config, enable_auto_commit=not batch_mode, resumable=resumable)
     producer = create_kafka_producer(config)
     
     # Ensure index exists
-    index_name = ensure_elasticsearch_index(es_client, config)
+    index_name = ensure_elasticsearch_index(es_client, config, recreate=not resumable)
+    indexer = create_bulk_indexer(es_client, index_name, config, producer)
+    trending = create_trending_hashtags(config, producer, indexer)
     
     # Get output topic
-    if config and 'kafka' in config:
-        output_topic = config['kafka'].get('output_topic', 'processed-tweets')
-    else:
-        output_topic = os.environ.get('KAFKA_OUTPUT_TOPIC', 'processed-tweets')
+    output_topic = get_output_topic(config)
     
     # Process messages
     logger.info(f"Starting to process messages from Kafka")
     processed_count = 0
     
+    pool = None
+    
     # Check if the consumer is connected
     if not consumer.bootstrap_connected():
         logger.error("Failed to connect to Kafka. Check your configuration.")
         return False
     
     try:
-        for message in consumer:
-            if message is None or message.value is None:
-                continue
-            
-            # Process tweet
-            raw_tweet = message.value
-            processed_tweet = process_tweet(raw_tweet)
-            
-            # Send to output Kafka topic
-            producer.send(output_topic, processed_tweet)
-            
-            # Index in Elasticsearch
-            try:
-                es_client.index(index=index_name, body=processed_tweet)
-            except Exception as e:
-                logger.error(f"Error indexing tweet in Elasticsearch: {e}")
-            
-            processed_count += 1
-            if processed_count % 10 == 0:
-                logger.info(f"Processed {processed_count} tweets")
-            
+        if batch_mode:
+            logger.info(f"Consuming in batches of up to {max_records} records")
+            parallelism = get_parallelism(config)
+            pool = create_process_pool(
+                parallelism, sentiment_backend, sentiment_cache, region_boundaries, geocoder_settings,
+                pipeline_settings
+            )
+            consume_in_batches(
+                consumer, producer, indexer, output_topic, max_records, timeout_ms,
+                pool=pool, parallelism=parallelism, trending=trending
+            )
+        else:
+            for message in consumer:
+                if message is None or message.value is None:
+                    continue
+                
+                # Decode and process tweet
+                decoded = decode_records([message])
+                if not decoded:
+                    continue
+                processed_tweet = process_tweet(decoded[0])
+                
+                # Send to output Kafka topic
+                producer.send(output_topic, processed_tweet)
+                
+                # Buffer for bulk indexing in Elasticsearch
+                indexer.add(processed_tweet)
+                indexer.flush_if_due()
+                get_pipeline().log_stats_if_due()
+                if trending is not None:
+                    trending.add(processed_tweet)
+                    trending.slide_if_due()
+                
+                processed_count += 1
+                if processed_count % 10 == 0:
+                    logger.info(f"Processed {processed_count} tweets")
+                
     except KeyboardInterrupt:
         logger.info("Interrupted, stopping...")
     except Exception as e:
         logger.error(f"Error processing tweets from Kafka: {e}")
         return False
+    finally:
+        # Index whatever is still buffered
+        indexer.flush()
+        if pool is not None:
+            pool.shutdown()
     
     return True
 
+class TweetProcessorWorker:
+    """
+    Long-lived processor used in continuous mode.
+    
+    Clients, connection pools and the process pool are created once and kept
+    for the lifetime of the worker. Every `maintenance_interval` seconds the
+    registered maintenance tasks (metrics, ...) are run. Tweets need no
+    periodic flush: each batch is flushed before its offsets are committed.
+    SIGTERM and SIGINT stop the worker after the in-flight batch has been
+    acknowledged and committed.
+    """
+    
+    def __init__(self, config, maintenance_interval=60):
+        self.config = config
+        self.maintenance_interval = maintenance_interval
+        sentiment_backend = configure_sentiment_backend(config)
+        self.sentiment_cache = configure_sentiment_cache(config)
+        region_boundaries = configure_region_classifier(config)
+        geocoder_settings = configure_geocoder(config)
+        pipeline_settings = configure_processing_pipeline(config)
+        _, self.max_records, self.timeout_ms = get_batch_settings(config)
+        resumable = is_resumable(config)
+        
+        self.es_client = create_elasticsearch_client(config)
+        self.consumer = create_kafka_consumer(config, enable_auto_commit=False, resumable=resumable)
+        self.producer = create_kafka_producer(config)
+        self.output_topic = get_output_topic(config)
+        index_name = ensure_elasticsearch_index(self.es_client, config, recreate=not resumable)
+        self.indexer = create_bulk_indexer(self.es_client, index_name, config, self.producer)
+        self.trending = create_trending_hashtags(config, self.producer, self.indexer)
+        self.parallelism = get_parallelism(config)
+        self.pool = create_process_pool(
+            self.parallelism, sentiment_backend, self.sentiment_cache, region_boundaries,
+            geocoder_settings, pipeline_settings
+        )
+        
+        self.processed_count = 0
+        self.maintenance_tasks = [self.log_metrics]
+        self._last_maintenance = time.monotonic()
+        self._stopping = False
+    
+    def add_maintenance_task(self, task):
+        """Register a callable run every maintenance interval."""
+        self.maintenance_tasks.append(task)
+    
+    def stop(self, signum=None, frame=None):
+        """Request a graceful stop after the current batch."""
+        logger.info(f"Received signal {signum}, draining in-flight batch before stopping")
+        self._stopping = True
+    
+    def stage_stats(self):
+        """Return the call count, errors and latencies of each processing stage."""
+        return get_pipeline().stats()
+    
+    def log_metrics(self):
+        """Log processing counters."""
+        logger.info(
+            f"Processed {self.processed_count} tweets "
+            f"(indexed {self.indexer.indexed_count}, failed {self.indexer.failed_count}, "
+            f"rejected {self.indexer.rejected_count})"
+        )
+        if self.trending is not None:
+            logger.info(f"Trending hashtags: {self.trending.last_top}")
+        # With a pool, the caches in use are the workers' copies
+        if PROCESSORS_AVAILABLE and self.pool is None:
+            if self.sentiment_cache is not None:
+                logger.info(f"Sentiment cache: {self.sentiment_cache.stats()}")
+            logger.info(f"Geocoder: {get_geocoder().stats()}")
+    
+    def run_maintenance(self):
+        """Run every maintenance task, isolating failures."""
+        for task in self.maintenance_tasks:
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Maintenance task {getattr(task, '__name__', task)} failed: {e}")
+        self._last_maintenance = time.monotonic()
+    
+    def process_next_batch(self):
+        """Poll, process and commit one batch. Returns the number of records committed."""
+        batch = self.consumer.poll(timeout_ms=self.timeout_ms, max_records=self.max_records)
+        if not batch:
+            return 0
+        
+        committed = process_and_commit(
+            self.consumer, batch, self.producer, self.indexer, self.output_topic,
+            self.pool, self.parallelism, self.trending
+        )
+        if committed:
+            self.processed_count += committed
+        else:
+            time.sleep(1)
+        return committed
+    
+    def run(self):
+        """Process batches until stopped by a signal."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        
+        logger.info(f"Worker started, maintenance every {self.maintenance_interval}s")
+        try:
+            while not self._stopping:
+                try:
+                    self.process_next_batch()
+                except Exception as e:
+                    logger.error(f"Error processing batch: {e}")
+                    time.sleep(1)
+                
+                if self.trending is not None:
+                    self.trending.slide_if_due()
+                
+                if time.monotonic() - self._last_maintenance >= self.maintenance_interval:
+                    self.run_maintenance()
+        finally:
+            self.close()
+    
+    def close(self):
+        """Flush pending writes and release clients."""
+        logger.info("Stopping worker")
+        self.indexer.flush()
+        self.run_maintenance()
+        try:
+            self.producer.flush()
+            self.producer.close()
+        except Exception as e:
+            logger.warning(f"Error closing Kafka producer: {e}")
+        try:
+            self.consumer.close(autocommit=False)
+        except Exception as e:
+            logger.warning(f"Error closing Kafka consumer: {e}")
+        if self.pool is not None:
+            self.pool.shutdown()
+
 def main():
     """Main function to process tweets."""
     logger.info("Starting tweet processor")
@@ -329,14 +989,9 @@ def main():
         interval = int(os.environ.get('PROCESSING_INTERVAL', '60'))
     
     if continuous_mode:
-        logger.info(f"Running in continuous mode with {interval}s interval")
-        while True:
-            success = process_tweets_from_kafka(config)
-            if not success:
-                logger.warning("Failed to process tweets")
-            
-            logger.info(f"Waiting {interval} seconds before next processing cycle...")
-            time.sleep(interval)
+        logger.info(f"Running in continuous mode with {interval}s maintenance interval")
+        worker = TweetProcessorWorker(config, maintenance_interval=interval)
+        worker.run()
     else:
         process_tweets_from_kafka(config)
 
@@ -0,0 +1,260 @@
+"""
+Registered processing stages applied to each tweet, with per-stage timing.
+"""
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGES = ('text', 'hashtags', 'location', 'sentiment', 'language')
+DEFAULT_METRICS_INTERVAL = 60.0  # seconds
+
+# Latency samples kept per stage for the percentiles
+LATENCY_SAMPLES = 2048
+
+STAGES = {}
+
+# Stages that can also process a whole batch in one call
+BATCH_STAGES = {}
+
+
+def register_stage(name, func=None, batch=None):
+    """
+    Register a processing stage under a name.
+
+    A stage is called as `func(tweet, context)` and returns the tweet.
+    `context` is a dict shared by the stages of one tweet, e.g. to pass
+    the TextAnalysis of the text to later stages. Usable as a decorator.
+
+    A stage may also provide `batch(tweets, contexts)`, returning the
+    tweets, which Pipeline.run_batch calls once for a whole batch.
+
+    Args:
+        name (str): Name used in the `stages` setting
+        func (callable): Stage function
+        batch (callable): Batch stage function, if any
+
+    Returns:
+        callable: The stage function
+    """
+    if func is None:
+        return lambda func: register_stage(name, func, batch)
+    STAGES[name] = func
+    if batch is not None:
+        BATCH_STAGES[name] = batch
+    else:
+        BATCH_STAGES.pop(name, None)
+    return func
+
+
+class StageMetrics:
+    """Call count, error count and latencies of one stage."""
+    __slots__ = ('calls', 'errors', 'seconds', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, seconds, failed=False):
+        self.calls += 1
+        self.seconds += seconds
+        self.samples.append(seconds)
+        if failed:
+            self.errors += 1
+
+    def record_batch(self, seconds, count):
+        """Record a batch call over `count` tweets as `count` calls of equal latency."""
+        if count <= 0:
+            return
+        self.calls += count
+        self.seconds += seconds
+        self.samples.extend([seconds / count] * min(count, LATENCY_SAMPLES))
+
+    def merge(self, other):
+        """Add the counters of a drained StageMetrics (see Pipeline.drain_metrics)."""
+        self.calls += other.calls
+        self.errors += other.errors
+        self.seconds += other.seconds
+        self.samples.extend(other.samples)
+
+    def stats(self):
+        """
+        Return the counters, latencies in milliseconds.
+
+        Percentiles cover the last LATENCY_SAMPLES calls.
+
+        Returns:
+            dict: calls, errors, total_ms, mean_ms, p50_ms, p95_ms and p99_ms
+        """
+        samples = sorted(self.samples)
+
+        def percentile(fraction):
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000, 3)
+
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.seconds * 1000, 1),
+            'mean_ms': round(self.seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99)
+        }
+
+
+class Pipeline:
+    """
+    Ordered list of registered stages applied to each tweet.
+
+    Every stage call is timed. A stage that raises is counted as an error
+    and skipped for that tweet; the remaining stages still run. In
+    run_batch, a failed batch call is retried tweet by tweet.
+    """
+
+    def __init__(self, names=DEFAULT_STAGES, metrics_interval=DEFAULT_METRICS_INTERVAL):
+        self.stages = []
+        for name in names:
+            if name in STAGES:
+                self.stages.append((name, STAGES[name], BATCH_STAGES.get(name)))
+            else:
+                logger.warning(f"Unknown processing stage '{name}', expected one of {sorted(STAGES)}; skipping it")
+        self.metrics = {name: StageMetrics() for name, _, _ in self.stages}
+        self.metrics_interval = float(metrics_interval)
+        self._last_log = time.monotonic()
+
+    @property
+    def names(self):
+        return [name for name, _, _ in self.stages]
+
+    def run(self, tweet):
+        """
+        Apply every stage to a tweet.
+
+        Args:
+            tweet (dict): Tweet data
+
+        Returns:
+            dict: Processed tweet
+        """
+        context = {}
+        for name, stage, _ in self.stages:
+            tweet = self._run_stage(name, stage, tweet, context)
+        return tweet
+
+    def run_batch(self, tweets):
+        """
+        Apply every stage to a batch of tweets.
+
+        Stages with a batch function process the whole batch in one call;
+        the others are applied tweet by tweet.
+
+        Args:
+            tweets (list): Tweet dicts
+
+        Returns:
+            list: Processed tweets, in input order
+        """
+        tweets = list(tweets)
+        contexts = [{} for _ in tweets]
+        for name, stage, batch in self.stages:
+            if batch is not None and tweets:
+                start = time.perf_counter()
+                try:
+                    tweets = list(batch(tweets, contexts))
+                except Exception as e:
+                    # The tweet-by-tweet retry records the calls
+                    self.metrics[name].errors += 1
+                    logger.error(f"Stage {name} failed for a batch of {len(tweets)} tweets, retrying one by one: {e}")
+                else:
+                    self.metrics[name].record_batch(time.perf_counter() - start, len(tweets))
+                    continue
+            tweets = [self._run_stage(name, stage, tweet, context) for tweet, context in zip(tweets, contexts)]
+        return tweets
+
+    def _run_stage(self, name, stage, tweet, context):
+        """Apply one stage to one tweet, timing it; return the tweet unchanged if it raises."""
+        start = time.perf_counter()
+        try:
+            tweet = stage(tweet, context)
+        except Exception as e:
+            self.metrics[name].record(time.perf_counter() - start, failed=True)
+            logger.error(f"Stage {name} failed for tweet {tweet.get('id')}: {e}")
+            return tweet
+        self.metrics[name].record(time.perf_counter() - start)
+        return tweet
+
+    def stats(self):
+        """
+        Return the metrics of every stage, in pipeline order.
+
+        Returns:
+            dict: Stage name to StageMetrics.stats()
+        """
+        return {name: self.metrics[name].stats() for name in self.names}
+
+    def drain_metrics(self):
+        """
+        Return the metrics collected so far and start new ones.
+
+        Used by pool workers to hand their metrics to the parent process.
+
+        Returns:
+            dict: Stage name to StageMetrics
+        """
+        drained = self.metrics
+        self.metrics = {name: StageMetrics() for name in self.names}
+        return drained
+
+    def merge_metrics(self, metrics):
+        """
+        Add metrics drained from another process.
+
+        Args:
+            metrics (dict): Result of drain_metrics
+        """
+        for name, stage_metrics in metrics.items():
+            self.metrics.setdefault(name, StageMetrics()).merge(stage_metrics)
+
+    def log_stats(self):
+        """Log the metrics of every stage."""
+        for name, stats in self.stats().items():
+            logger.info(f"Stage {name}: {stats}")
+        self._last_log = time.monotonic()
+
+    def log_stats_if_due(self):
+        """Log the metrics if `metrics_interval` seconds have passed since the last log."""
+        if self.metrics_interval > 0 and time.monotonic() - self._last_log >= self.metrics_interval:
+            self.log_stats()
+
+
+_pipeline = None
+
+
+def get_pipeline():
+    """Return the shared pipeline, built with the default stages on first use."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = Pipeline()
+    return _pipeline
+
+
+def configure_pipeline(names=None, metrics_interval=DEFAULT_METRICS_INTERVAL):
+    """
+    Build the shared pipeline from stage names.
+
+    Args:
+        names (list): Stage names in order, or None for DEFAULT_STAGES
+        metrics_interval (float): Seconds between metric logs, 0 to disable
+
+    Returns:
+        Pipeline: The shared pipeline
+    """
+    global _pipeline
+    _pipeline = Pipeline(names or DEFAULT_STAGES, metrics_interval)
+    logger.info(f"Processing stages: {', '.join(_pipeline.names)}")
+    return _pipeline
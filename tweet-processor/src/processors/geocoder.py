@@ -0,0 +1,318 @@
+"""
+Module for resolving free-text user locations to coordinates with an
+offline gazetteer.
+"""
+import gzip
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+from .text_analysis import ENGLISH_STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_FILE = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.tsv.gz')
+DEFAULT_GEOCODER_CACHE_SIZE = 50000
+
+# Longest place name, in tokens, tried when scanning a location string
+MAX_NAME_TOKENS = 5
+
+# Candidates kept per name, most populous first
+MAX_CANDIDATES = 8
+
+# Separators between the parts of a location such as "Portland, OR | USA"
+SEGMENT_PATTERN = re.compile(r'[,;/|]+')
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^0-9a-z]+')
+
+# Common profile locations that are not places
+IGNORED_NAMES = frozenset({
+    'home', 'earth', 'world', 'worldwide', 'everywhere', 'internet', 'online',
+    'global', 'planet earth', 'somewhere', 'here', 'there', 'nowhere', 'universe',
+})
+
+# Country spellings missing from the gazetteer's country names
+COUNTRY_ALIASES = {
+    'usa': 'US', 'us': 'US', 'u s a': 'US', 'u s': 'US', 'america': 'US',
+    'united states of america': 'US', 'uk': 'GB', 'u k': 'GB', 'england': 'GB',
+    'scotland': 'GB', 'wales': 'GB', 'great britain': 'GB', 'britain': 'GB',
+    'uae': 'AE', 'russian federation': 'RU', 'south korea': 'KR', 'korea': 'KR',
+    'holland': 'NL', 'czech republic': 'CZ',
+}
+
+US_STATES = {
+    'al': 'alabama', 'ak': 'alaska', 'az': 'arizona', 'ar': 'arkansas', 'ca': 'california',
+    'co': 'colorado', 'ct': 'connecticut', 'de': 'delaware', 'dc': 'district of columbia',
+    'fl': 'florida', 'ga': 'georgia', 'hi': 'hawaii', 'id': 'idaho', 'il': 'illinois',
+    'in': 'indiana', 'ia': 'iowa', 'ks': 'kansas', 'ky': 'kentucky', 'la': 'louisiana',
+    'me': 'maine', 'md': 'maryland', 'ma': 'massachusetts', 'mi': 'michigan',
+    'mn': 'minnesota', 'ms': 'mississippi', 'mo': 'missouri', 'mt': 'montana',
+    'ne': 'nebraska', 'nv': 'nevada', 'nh': 'new hampshire', 'nj': 'new jersey',
+    'nm': 'new mexico', 'ny': 'new york', 'nc': 'north carolina', 'nd': 'north dakota',
+    'oh': 'ohio', 'ok': 'oklahoma', 'or': 'oregon', 'pa': 'pennsylvania',
+    'ri': 'rhode island', 'sc': 'south carolina', 'sd': 'south dakota', 'tn': 'tennessee',
+    'tx': 'texas', 'ut': 'utah', 'vt': 'vermont', 'va': 'virginia', 'wa': 'washington',
+    'wv': 'west virginia', 'wi': 'wisconsin', 'wy': 'wyoming',
+}
+
+Place = namedtuple('Place', ['name', 'lat', 'lon', 'country', 'population'])
+
+
+def normalize_place_name(text):
+    """
+    Normalize a place name for lookup.
+
+    Strips accents, lowercases and replaces punctuation with single spaces.
+
+    Args:
+        text (str): Place name or location string
+
+    Returns:
+        str: Normalized name
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return NON_ALPHANUMERIC_PATTERN.sub(' ', text.lower()).strip()
+
+
+class Gazetteer:
+    """
+    Offline geocoder over a table of places.
+
+    Names are indexed by their normalized tokens in a hash map, so
+    resolving a location string costs one lookup per token n-gram
+    (at most MAX_NAME_TOKENS per token) whatever the size of the
+    gazetteer. Resolved strings are kept in an LRU cache, since profile
+    locations repeat heavily across tweets.
+    """
+
+    def __init__(self, places=(), countries=(), cache_size=DEFAULT_GEOCODER_CACHE_SIZE):
+        self._names = {}
+        self._countries = {}
+        self._states = {}
+        self.max_tokens = 1
+        self.cache_size = max(0, int(cache_size))
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        for place, names in places:
+            self.add_place(place, names)
+        for place, names in countries:
+            self.add_country(place, names)
+        for candidates in self._names.values():
+            candidates.sort(key=lambda place: -place.population)
+            del candidates[MAX_CANDIDATES:]
+        self._add_state_hints()
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_GAZETTEER_FILE, cache_size=DEFAULT_GEOCODER_CACHE_SIZE):
+        """
+        Load a gazetteer TSV (optionally gzipped) as written by
+        scripts/build_gazetteer.py.
+
+        Rows are `kind, name, lat, lon, country, population, alternate names`
+        with kind `city` or `country` and alternate names separated by '|'.
+
+        Args:
+            path (str): Gazetteer file
+            cache_size (int): Number of resolved location strings to cache
+
+        Returns:
+            Gazetteer: Geocoder for the file's places
+        """
+        opener = gzip.open if path.endswith('.gz') else open
+        places = []
+        countries = []
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#') or not line.strip():
+                    continue
+                kind, name, lat, lon, country, population, alternates = line.rstrip('\n').split('\t')
+                place = Place(name, float(lat), float(lon), country, int(population))
+                names = [name] + (alternates.split('|') if alternates else [])
+                (countries if kind == 'country' else places).append((place, names))
+
+        logger.info(f"Loaded {len(places)} places and {len(countries)} countries from {path}")
+        return cls(places, countries, cache_size)
+
+    def add_place(self, place, names):
+        """
+        Index a place under each of its names.
+
+        Args:
+            place (Place): Place to add
+            names (list): Name and alternate names of the place
+        """
+        for name in names:
+            key = normalize_place_name(name)
+            if len(key) < 3 or key in ENGLISH_STOPWORDS or key in IGNORED_NAMES:
+                continue
+            candidates = self._names.setdefault(key, [])
+            if place not in candidates:
+                candidates.append(place)
+            self.max_tokens = min(MAX_NAME_TOKENS, max(self.max_tokens, key.count(' ') + 1))
+
+    def add_country(self, place, names):
+        """
+        Index a country, located at its capital, under each of its names.
+
+        Args:
+            place (Place): Country with the coordinates of its capital
+            names (list): Names of the country
+        """
+        for name in names:
+            self._countries[normalize_place_name(name)] = place
+        self._countries[place.country.lower()] = place
+
+    def _add_state_hints(self):
+        # US states (names and abbreviations) are kept apart from countries:
+        # they only narrow city candidates to the US and are never resolved
+        # to a country's coordinates
+        if 'us' in self._countries:
+            for abbreviation, state in US_STATES.items():
+                self._states[abbreviation] = state
+                self._states[state] = state
+        for alias, code in COUNTRY_ALIASES.items():
+            country = self._countries.get(code.lower())
+            if country is not None:
+                self._countries.setdefault(alias, country)
+
+    def _country_hint(self, segments):
+        """Return the country named by a trailing segment, e.g. "Paris, France"."""
+        for segment in reversed(segments):
+            country = self._countries.get(segment)
+            if country is not None:
+                return country
+        return None
+
+    def _match(self, tokens, country):
+        """Return the best place named by a token n-gram, preferring longer names."""
+        names = self._names
+        best = None
+        best_length = 0
+        count = len(tokens)
+        for start in range(count):
+            for length in range(min(self.max_tokens, count - start), best_length - 1, -1):
+                if length == 0:
+                    break
+                candidates = names.get(' '.join(tokens[start:start + length]))
+                if not candidates:
+                    continue
+                place = candidates[0]
+                if country is not None:
+                    place = next((c for c in candidates if c.country == country.country), None)
+                    if place is None:
+                        continue
+                if length > best_length or (length == best_length and place.population > best.population):
+                    best = place
+                    best_length = length
+                break
+        return best
+
+    def _resolve(self, key):
+        segments = [normalize_place_name(segment) for segment in SEGMENT_PATTERN.split(key)]
+        segments = [segment for segment in segments if segment]
+        if not segments:
+            return None
+
+        united_states = self._countries.get('us')
+        country = self._country_hint(segments[1:]) if len(segments) > 1 else None
+        hint = country
+        if hint is None and any(segment in self._states for segment in segments[1:]):
+            # "Portland, OR": the state narrows the candidates to the US
+            hint = united_states
+
+        state_named = False
+        for segment in segments:
+            if segment in IGNORED_NAMES:
+                continue
+            state = self._states.get(segment)
+            if state is not None and hint in (None, united_states):
+                # A state only matches US places named like it ("NY" is New
+                # York City, "Indiana" is nothing rather than a Brazilian town)
+                state_named = True
+                place = self._match(state.split(), united_states)
+            else:
+                tokens = segment.split()
+                place = self._match(tokens, hint)
+                if place is None and hint is not None and self._countries.get(segment) is not hint:
+                    # The hint may be wrong ("Paris, TX" is not in the gazetteer under US)
+                    place = self._match(tokens, None)
+            if place is not None:
+                return place
+
+        # Fall back to a country-only location such as "France", unless a
+        # state was named: "Georgia, USA" is not the US capital
+        country = country or self._countries.get(segments[-1])
+        if state_named and country is united_states:
+            return None
+        return country
+
+    def geocode(self, location):
+        """
+        Resolve a free-text location.
+
+        Args:
+            location (str): Location string such as "Brooklyn, NY"
+
+        Returns:
+            Place: Resolved place, or None if nothing matched
+        """
+        key = (location or '').strip().lower()
+        if not key:
+            return None
+
+        cache = self._cache
+        if key in cache:
+            cache.move_to_end(key)
+            self.hits += 1
+            return cache[key]
+
+        self.misses += 1
+        place = self._resolve(key)
+        if self.cache_size:
+            cache[key] = place
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return place
+
+    def stats(self):
+        """
+        Return index size and cache counters.
+
+        Returns:
+            dict: names, cached, hits, misses and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'names': len(self._names),
+            'cached': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+_geocoder = None
+
+
+def get_geocoder():
+    """Return the shared geocoder, loading the bundled gazetteer on first use."""
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = Gazetteer.from_file()
+    return _geocoder
+
+
+def set_geocoder(geocoder):
+    """
+    Replace the shared geocoder, e.g. with one loaded from a larger
+    gazetteer file.
+
+    Args:
+        geocoder (Gazetteer): Geocoder to use
+    """
+    global _geocoder
+    _geocoder = geocoder
@@ -7,6 +7,8 @@ from collections import Counter
 
 logger = logging.getLogger(__name__)
 
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+
 def extract_hashtags(text):
     """
     Extract hashtags from tweet text.
@@ -18,8 +20,7 @@ def extract_hashtags(text):
         list: List of hashtags found in the text
     """
     # Match hashtags using regex
-    hashtag_pattern = r'#(\w+)'
-    hashtags = re.findall(hashtag_pattern, text)
+    hashtags = HASHTAG_PATTERN.findall(text)
     
     # Convert to lowercase for standardization
     hashtags = [tag.lower() for tag in hashtags]
@@ -39,12 +40,13 @@ def count_hashtags(hashtags):
     counter = Counter(hashtags)
     return dict(counter)
 
-def process_hashtags(tweet):
+def process_hashtags(tweet, analysis=None):
     """
     Process hashtags in a tweet.
     
     Args:
         tweet (dict): Tweet data
+        analysis (TextAnalysis): Tokens of the tweet text, if already computed
         
     Returns:
         dict: Tweet with processed hashtag information
@@ -52,7 +54,10 @@ def process_hashtags(tweet):
     try:
         # Extract hashtags from text if not already present
         if 'hashtags' not in tweet or not tweet['hashtags']:
-            tweet['hashtags'] = extract_hashtags(tweet['text'])
+            if analysis is not None:
+                tweet['hashtags'] = list(analysis.hashtags)
+            else:
+                tweet['hashtags'] = extract_hashtags(tweet['text'])
         
         # Ensure all hashtags are lowercase
         tweet['hashtags'] = [tag.lower() for tag in tweet['hashtags']]
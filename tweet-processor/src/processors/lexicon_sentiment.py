@@ -0,0 +1,186 @@
+"""
+Lexicon-based sentiment engine that scores batches of texts.
+
+The lexicon maps words to (polarity, subjectivity) pairs in the same ranges
+as TextBlob ([-1, 1] and [0, 1]). Negations flip and dampen the next
+sentiment word, intensifiers scale it, and the text score is the mean of
+the scored words, as in TextBlob's pattern analyzer.
+"""
+from .text_analysis import tokenize
+
+# word: (polarity, subjectivity)
+LEXICON = {
+    # Positive
+    'good': (0.7, 0.6), 'great': (0.8, 0.75), 'nice': (0.6, 1.0),
+    'happy': (0.8, 1.0), 'love': (0.5, 0.6), 'loved': (0.7, 0.8),
+    'lovely': (0.5, 0.75), 'excited': (0.4, 0.75), 'exciting': (0.3, 0.8),
+    'amazing': (0.6, 0.9), 'impressive': (1.0, 1.0), 'impressed': (1.0, 1.0),
+    'excellent': (1.0, 1.0), 'fantastic': (0.4, 0.9), 'brilliant': (0.9, 1.0),
+    'wonderful': (1.0, 1.0), 'awesome': (1.0, 1.0), 'best': (1.0, 0.3),
+    'better': (0.5, 0.5), 'enjoy': (0.4, 0.5), 'enjoying': (0.4, 0.5),
+    'enjoyed': (0.4, 0.5), 'like': (0.2, 0.4), 'liked': (0.3, 0.5),
+    'cool': (0.35, 0.65), 'fun': (0.3, 0.2), 'glad': (0.5, 1.0),
+    'perfect': (1.0, 1.0), 'useful': (0.3, 0.0), 'helpful': (0.4, 0.5),
+    'easy': (0.43, 0.83), 'fast': (0.2, 0.6), 'clean': (0.37, 0.69),
+    'progress': (0.3, 0.4), 'success': (0.3, 0.0), 'successful': (0.75, 0.95),
+    'thanks': (0.2, 0.2), 'new': (0.14, 0.45), 'more': (0.5, 0.5),
+    'beautiful': (0.85, 1.0), 'favorite': (0.5, 1.0), 'recommend': (0.3, 0.3),
+    # Negative
+    'bad': (-0.7, 0.67), 'terrible': (-1.0, 1.0), 'awful': (-1.0, 1.0),
+    'sad': (-0.5, 1.0), 'hate': (-0.8, 0.9), 'hated': (-0.9, 0.7),
+    'disappointed': (-0.75, 0.75), 'disappointing': (-0.6, 0.7),
+    'frustrated': (-0.7, 0.7), 'frustrating': (-0.4, 0.7), 'poor': (-0.4, 0.6),
+    'worst': (-1.0, 1.0), 'worse': (-0.4, 0.6), 'horrible': (-1.0, 1.0),
+    'annoying': (-0.8, 0.9), 'annoyed': (-0.6, 0.8), 'fail': (-0.5, 0.3),
+    'failed': (-0.5, 0.3), 'failure': (-0.3, 0.3), 'issues': (-0.3, 0.3),
+    'issue': (-0.3, 0.3), 'problems': (-0.4, 0.4), 'problem': (-0.4, 0.4),
+    'avoid': (-0.4, 0.4), 'struggling': (-0.4, 0.5), 'broken': (-0.4, 0.4),
+    'slow': (-0.3, 0.39), 'wrong': (-0.5, 0.9), 'ugly': (-0.7, 1.0),
+    'useless': (-0.5, 0.2), 'angry': (-0.5, 1.0), 'boring': (-1.0, 1.0),
+    'buggy': (-0.5, 0.5), 'difficult': (-0.5, 1.0), 'hard': (-0.29, 0.54),
+    'crash': (-0.4, 0.4), 'sucks': (-0.3, 0.3), 'mess': (-0.4, 0.6),
+}
+
+NEGATIONS = frozenset({
+    'not', 'no', 'never', 'nothing', 'nobody', 'without', "n't",
+    'dont', 'doesnt', 'didnt', 'isnt', 'wasnt', 'cant', 'wont', 'aint',
+})
+
+# word: multiplier applied to the next sentiment word
+INTENSIFIERS = {
+    'very': 1.3, 'really': 1.3, 'so': 1.2, 'too': 1.2, 'extremely': 1.5,
+    'super': 1.4, 'incredibly': 1.5, 'totally': 1.3, 'absolutely': 1.4,
+    'pretty': 1.1, 'quite': 1.1, 'slightly': 0.5, 'somewhat': 0.7,
+}
+
+# How many tokens a pending negation/intensifier stays active
+MODIFIER_WINDOW = 2
+
+# Negation factor, as in TextBlob: "not good" is mildly negative
+NEGATION_FACTOR = -0.5
+
+
+def label_for_polarity(polarity):
+    """
+    Map a polarity score to a sentiment label.
+
+    Args:
+        polarity (float): Polarity in [-1, 1]
+
+    Returns:
+        str: 'positive', 'negative' or 'neutral'
+    """
+    if polarity > 0.05:
+        return 'positive'
+    if polarity < -0.05:
+        return 'negative'
+    return 'neutral'
+
+
+class LexiconSentimentEngine:
+    """
+    Batch sentiment scorer backed by a precompiled lexicon.
+    """
+
+    def __init__(self, lexicon=None, negations=None, intensifiers=None):
+        self.lexicon = dict(lexicon or LEXICON)
+        self.negations = frozenset(negations or NEGATIONS)
+        self.intensifiers = dict(intensifiers or INTENSIFIERS)
+
+    def score_tokens(self, tokens):
+        """
+        Score a list of lowercase tokens.
+
+        Args:
+            tokens (list): Lowercase word tokens
+
+        Returns:
+            tuple: (polarity, subjectivity)
+        """
+        lexicon = self.lexicon
+        negations = self.negations
+        intensifiers = self.intensifiers
+
+        polarity_sum = 0.0
+        subjectivity_sum = 0.0
+        scored = 0
+        negated = False
+        intensity = 1.0
+        modifier_ttl = 0
+
+        for token in tokens:
+            if token in negations:
+                negated = not negated
+                modifier_ttl = MODIFIER_WINDOW
+                continue
+            if token in intensifiers:
+                intensity *= intensifiers[token]
+                modifier_ttl = MODIFIER_WINDOW
+                continue
+
+            entry = lexicon.get(token)
+            if entry is not None:
+                polarity, subjectivity = entry
+                polarity *= intensity
+                if negated:
+                    polarity *= NEGATION_FACTOR
+                polarity_sum += max(-1.0, min(1.0, polarity))
+                subjectivity_sum += min(1.0, subjectivity * intensity)
+                scored += 1
+                negated = False
+                intensity = 1.0
+                modifier_ttl = 0
+            elif modifier_ttl:
+                modifier_ttl -= 1
+                if not modifier_ttl:
+                    negated = False
+                    intensity = 1.0
+
+        if not scored:
+            return 0.0, 0.0
+        return polarity_sum / scored, subjectivity_sum / scored
+
+    def score(self, text):
+        """
+        Score a single text.
+
+        Args:
+            text (str): Text to score
+
+        Returns:
+            dict: Sentiment with polarity, subjectivity and label
+        """
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts):
+        """
+        Score a list of texts in one call.
+
+        Args:
+            texts (list): Texts to score
+
+        Returns:
+            list: One sentiment dict (polarity, subjectivity, label) per text
+        """
+        return self.score_token_lists([tokenize(text) for text in texts])
+
+    def score_token_lists(self, token_lists):
+        """
+        Score texts that have already been tokenized.
+
+        Args:
+            token_lists (list): One list of lowercase word tokens per text
+
+        Returns:
+            list: One sentiment dict (polarity, subjectivity, label) per text
+        """
+        score_tokens = self.score_tokens
+        results = []
+        for tokens in token_lists:
+            polarity, subjectivity = score_tokens(tokens)
+            results.append({
+                'polarity': polarity,
+                'subjectivity': subjectivity,
+                'label': label_for_polarity(polarity)
+            })
+        return results
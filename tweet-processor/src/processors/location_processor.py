@@ -3,21 +3,61 @@ Module for processing and normalizing location data in tweets.
 """
 import logging
 
+from .geocoder import get_geocoder
+from .region_classifier import get_region_classifier
+
 logger = logging.getLogger(__name__)
 
-# Map of common city names to their coordinates
-CITY_COORDINATES = {
-    'new york': {'lat': 40.7128, 'lon': -74.0060},
-    'los angeles': {'lat': 34.0522, 'lon': -118.2437},
-    'chicago': {'lat': 41.8781, 'lon': -87.6298},
-    'london': {'lat': 51.5074, 'lon': -0.1278},
-    'paris': {'lat': 48.8566, 'lon': 2.3522},
-    'tokyo': {'lat': 35.6762, 'lon': 139.6503},
-    'sydney': {'lat': -33.8688, 'lon': 151.2093},
-    'mumbai': {'lat': 19.0760, 'lon': 72.8777},
-    'beijing': {'lat': 39.9042, 'lon': 116.4074},
-    'cairo': {'lat': 30.0444, 'lon': 31.2357}
-}
+def _resolve_coordinates(tweet):
+    """
+    Find the coordinates of a tweet and add its `geo` field.
+    
+    Args:
+        tweet (dict): Tweet data
+        
+    Returns:
+        tuple: (lat, lon), or None if the tweet has no usable location
+    """
+    # Check if location data exists
+    if 'location' not in tweet or not tweet['location']:
+        # Try to geocode the location of the user profile
+        user = tweet.get('user')
+        if isinstance(user, dict) and isinstance(user.get('location'), str):
+            place = get_geocoder().geocode(user['location'])
+            if place is not None:
+                tweet['location'] = {'lat': place.lat, 'lon': place.lon}
+                tweet['location_name'] = place.name
+        
+        # If still no location, skip further processing
+        if 'location' not in tweet or not tweet['location']:
+            return None
+    
+    # Ensure location has correct format
+    if 'lat' not in tweet['location'] or 'lon' not in tweet['location']:
+        return None
+    
+    # Convert coordinates to float
+    try:
+        lat = float(tweet['location']['lat'])
+        lon = float(tweet['location']['lon'])
+    except (ValueError, TypeError):
+        logger.warning(f"Could not convert location coordinates to float for tweet {tweet.get('id', 'unknown')}")
+        return None
+    
+    # Add Elasticsearch geo format
+    tweet['geo'] = {
+        'lat': lat,
+        'lon': lon
+    }
+    return lat, lon
+
+def _apply_classification(tweet, region, country):
+    """Add region (and country when known) to a tweet."""
+    if region:
+        tweet['region'] = region
+    if country:
+        tweet['country'] = country
+    tweet['location_normalized'] = True
 
 def normalize_locations(tweet):
     """
@@ -30,61 +70,51 @@ def normalize_locations(tweet):
         dict: Tweet with normalized location information
     """
     try:
-        # Check if location data exists
-        if 'location' not in tweet or not tweet['location']:
-            # Try to extract location from text or user profile
-            if 'user' in tweet and 'location' in tweet['user']:
-                user_location = tweet['user']['location'].lower()
-                for city, coords in CITY_COORDINATES.items():
-                    if city in user_location:
-                        tweet['location'] = coords
-                        break
-            
-            # If still no location, skip further processing
-            if 'location' not in tweet or not tweet['location']:
-                tweet['location_normalized'] = False
-                return tweet
-        
-        # Ensure location has correct format
-        if 'lat' not in tweet['location'] or 'lon' not in tweet['location']:
-            tweet['location_normalized'] = False
-            return tweet
-        
-        # Convert coordinates to float
-        try:
-            lat = float(tweet['location']['lat'])
-            lon = float(tweet['location']['lon'])
-        except (ValueError, TypeError):
-            logger.warning(f"Could not convert location coordinates to float for tweet {tweet.get('id', 'unknown')}")
+        coordinates = _resolve_coordinates(tweet)
+        if coordinates is None:
             tweet['location_normalized'] = False
             return tweet
-            
-        # Add Elasticsearch geo format
-        tweet['geo'] = {
-            'lat': lat,
-            'lon': lon
-        }
-        
-        # Add continent/region based on coordinates
-        if lon < -30:
-            if lat > 30:
-                tweet['region'] = 'North America'
-            else:
-                tweet['region'] = 'South America'
-        elif lon < 60:
-            if lat > 30:
-                tweet['region'] = 'Europe'
-            else:
-                tweet['region'] = 'Africa'
-        else:
-            if lat > 30:
-                tweet['region'] = 'Asia'
-            else:
-                tweet['region'] = 'Oceania'
         
-        tweet['location_normalized'] = True
+        # Add region from the boundary polygons
+        region, country = get_region_classifier().classify(*coordinates)
+        _apply_classification(tweet, region, country)
         return tweet
     except Exception as e:
         logger.error(f"Error normalizing location for tweet {tweet.get('id')}: {e}")
         tweet['location_normalized'] = False
         return tweet
+
+def normalize_locations_batch(tweets):
+    """
+    Normalize location data of several tweets, classifying all of their
+    coordinates with a single batch call.
+    
+    Args:
+        tweets (list): Tweet dicts
+        
+    Returns:
+        list: The same tweets with normalized location information
+    """
+    located = []
+    for tweet in tweets:
+        try:
+            coordinates = _resolve_coordinates(tweet)
+        except Exception as e:
+            logger.error(f"Error normalizing location for tweet {tweet.get('id')}: {e}")
+            coordinates = None
+        if coordinates is None:
+            tweet['location_normalized'] = False
+        else:
+            located.append((tweet, coordinates))
+    
+    if not located:
+        return tweets
+    
+    classifications = get_region_classifier().classify_batch(
+        [lat for _, (lat, _) in located],
+        [lon for _, (_, lon) in located]
+    )
+    for (tweet, _), (region, country) in zip(located, classifications):
+        _apply_classification(tweet, region, country)
+    
+    return tweets
@@ -0,0 +1,273 @@
+"""
+Module for classifying coordinates into regions and countries using
+offline boundary polygons and a grid spatial index.
+"""
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Try to import NumPy for the vectorized batch API
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    logger.warning("NumPy not available. Batch region classification will run per point.")
+    NUMPY_AVAILABLE = False
+
+DEFAULT_BOUNDARIES_FILE = os.path.join(os.path.dirname(__file__), 'data', 'regions.geojson')
+
+# Size in degrees of a grid cell of the spatial index
+DEFAULT_CELL_SIZE = 5.0
+
+# Cell value when several polygons share the cell
+MIXED_CELL = -1
+
+
+class _Polygon:
+    """Exterior ring of a boundary polygon with its bounding box."""
+    __slots__ = ('region', 'country', 'xs', 'ys', 'min_x', 'min_y', 'max_x', 'max_y')
+
+    def __init__(self, region, country, ring):
+        if ring[0] == ring[-1]:
+            ring = ring[:-1]
+        self.region = region
+        self.country = country
+        self.xs = [float(point[0]) for point in ring]
+        self.ys = [float(point[1]) for point in ring]
+        self.min_x, self.max_x = min(self.xs), max(self.xs)
+        self.min_y, self.max_y = min(self.ys), max(self.ys)
+
+    def contains(self, x, y):
+        """Ray-casting point-in-polygon test."""
+        if x < self.min_x or x > self.max_x or y < self.min_y or y > self.max_y:
+            return False
+        inside = False
+        xs, ys = self.xs, self.ys
+        j = len(xs) - 1
+        for i in range(len(xs)):
+            if (ys[i] > y) != (ys[j] > y):
+                if x < (xs[j] - xs[i]) * (y - ys[i]) / (ys[j] - ys[i]) + xs[i]:
+                    inside = not inside
+            j = i
+        return inside
+
+    def edges_touch(self, min_x, min_y, max_x, max_y):
+        """Return True if an edge bounding box overlaps the given box."""
+        if min_x > self.max_x or max_x < self.min_x or min_y > self.max_y or max_y < self.min_y:
+            return False
+        xs, ys = self.xs, self.ys
+        j = len(xs) - 1
+        for i in range(len(xs)):
+            if (min(xs[i], xs[j]) <= max_x and max(xs[i], xs[j]) >= min_x and
+                    min(ys[i], ys[j]) <= max_y and max(ys[i], ys[j]) >= min_y):
+                return True
+            j = i
+        return False
+
+
+def normalize_longitude(lon):
+    """Wrap a longitude into [-180, 180)."""
+    return ((lon + 180.0) % 360.0) - 180.0
+
+
+class RegionClassifier:
+    """
+    Point-in-polygon classifier backed by a uniform grid index.
+
+    Polygons are tested in file order and the first match wins, so
+    country-level features should come before the regions that contain
+    them. Each grid cell stores either the single polygon covering it, or
+    the candidate polygons whose boundaries cross it.
+    """
+
+    def __init__(self, polygons, cell_size=DEFAULT_CELL_SIZE):
+        self.polygons = polygons
+        self.cell_size = float(cell_size)
+        self.columns = int(round(360.0 / self.cell_size))
+        self.rows = int(round(180.0 / self.cell_size))
+        self._cells = []
+        self._cell_owner = []
+        self._build_index()
+
+    @classmethod
+    def from_geojson(cls, path=DEFAULT_BOUNDARIES_FILE, cell_size=DEFAULT_CELL_SIZE):
+        """
+        Load boundary polygons from a GeoJSON FeatureCollection.
+
+        Features need a `region` property and may have a `country` property.
+        Polygon and MultiPolygon geometries are supported (exterior rings).
+
+        Args:
+            path (str): GeoJSON file
+            cell_size (float): Grid cell size in degrees
+
+        Returns:
+            RegionClassifier: Classifier for the file's polygons
+        """
+        with open(path) as f:
+            collection = json.load(f)
+
+        polygons = []
+        for feature in collection.get('features', []):
+            properties = feature.get('properties') or {}
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') == 'Polygon':
+                rings = [geometry['coordinates'][0]]
+            elif geometry.get('type') == 'MultiPolygon':
+                rings = [polygon[0] for polygon in geometry['coordinates']]
+            else:
+                continue
+            for ring in rings:
+                polygons.append(_Polygon(properties.get('region'), properties.get('country'), ring))
+
+        logger.info(f"Loaded {len(polygons)} boundary polygons from {path}")
+        return cls(polygons, cell_size)
+
+    def _cell_bounds(self, row, column):
+        min_x = -180.0 + column * self.cell_size
+        min_y = -90.0 + row * self.cell_size
+        return min_x, min_y, min_x + self.cell_size, min_y + self.cell_size
+
+    def _build_index(self):
+        for row in range(self.rows):
+            for column in range(self.columns):
+                min_x, min_y, max_x, max_y = self._cell_bounds(row, column)
+                center_x = (min_x + max_x) / 2
+                center_y = (min_y + max_y) / 2
+
+                touching = {
+                    index for index, polygon in enumerate(self.polygons)
+                    if polygon.edges_touch(min_x, min_y, max_x, max_y)
+                }
+                # A polygon with no edge in the cell but containing its center covers the whole cell
+                covering = {
+                    index for index, polygon in enumerate(self.polygons)
+                    if index not in touching and polygon.contains(center_x, center_y)
+                }
+                candidates = sorted(touching | covering)
+                self._cells.append(candidates)
+                if candidates and candidates[0] in covering:
+                    self._cell_owner.append(candidates[0])
+                else:
+                    self._cell_owner.append(MIXED_CELL)
+
+    def _cell_index(self, lat, lon):
+        row = min(self.rows - 1, max(0, int((lat + 90.0) // self.cell_size)))
+        column = min(self.columns - 1, max(0, int((lon + 180.0) // self.cell_size)))
+        return row * self.columns + column
+
+    def _locate(self, lat, lon):
+        lon = normalize_longitude(lon)
+        cell = self._cell_index(lat, lon)
+        owner = self._cell_owner[cell]
+        if owner != MIXED_CELL:
+            return owner
+        for index in self._cells[cell]:
+            if self.polygons[index].contains(lon, lat):
+                return index
+        return None
+
+    def classify(self, lat, lon):
+        """
+        Classify a single coordinate.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+
+        Returns:
+            tuple: (region, country); either may be None
+        """
+        index = self._locate(lat, lon)
+        if index is None:
+            return None, None
+        polygon = self.polygons[index]
+        return polygon.region, polygon.country
+
+    def classify_batch(self, lats, lons):
+        """
+        Classify many coordinates in one call.
+
+        Cells covered by a single polygon are resolved with one vectorized
+        lookup; the remaining points are tested per polygon with a
+        vectorized point-in-polygon test.
+
+        Args:
+            lats (sequence): Latitudes
+            lons (sequence): Longitudes
+
+        Returns:
+            list: (region, country) per coordinate
+        """
+        if not NUMPY_AVAILABLE:
+            return [self.classify(lat, lon) for lat, lon in zip(lats, lons)]
+
+        lats = np.asarray(lats, dtype=float)
+        lons = normalize_longitude(np.asarray(lons, dtype=float))
+        if lats.size == 0:
+            return []
+
+        rows = np.clip(((lats + 90.0) // self.cell_size).astype(int), 0, self.rows - 1)
+        columns = np.clip(((lons + 180.0) // self.cell_size).astype(int), 0, self.columns - 1)
+        cells = rows * self.columns + columns
+
+        owners = np.asarray(self._cell_owner)[cells]
+        result = np.where(owners != MIXED_CELL, owners, -2)
+
+        for index, polygon in enumerate(self.polygons):
+            pending = np.nonzero(result == -2)[0]
+            if pending.size == 0:
+                break
+            xs, ys = lons[pending], lats[pending]
+            in_box = (xs >= polygon.min_x) & (xs <= polygon.max_x) & (ys >= polygon.min_y) & (ys <= polygon.max_y)
+            if not in_box.any():
+                continue
+            candidates = pending[in_box]
+            inside = _points_in_ring(lons[candidates], lats[candidates], polygon.xs, polygon.ys)
+            result[candidates[inside]] = index
+
+        return [
+            (self.polygons[index].region, self.polygons[index].country) if index >= 0 else (None, None)
+            for index in result.tolist()
+        ]
+
+
+def _points_in_ring(xs, ys, ring_xs, ring_ys):
+    """Vectorized ray-casting test of many points against one ring."""
+    x1 = np.asarray(ring_xs)
+    y1 = np.asarray(ring_ys)
+    x2 = np.roll(x1, 1)
+    y2 = np.roll(y1, 1)
+
+    px = xs[:, None]
+    py = ys[:, None]
+    straddles = (y1 > py) != (y2 > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = (x2 - x1) * (py - y1) / (y2 - y1) + x1
+    crossings = straddles & (px < crossing_x)
+    return (crossings.sum(axis=1) % 2) == 1
+
+
+_classifier = None
+
+
+def get_region_classifier():
+    """Return the shared classifier, loading the bundled boundaries on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = RegionClassifier.from_geojson()
+    return _classifier
+
+
+def set_region_classifier(classifier):
+    """
+    Replace the shared classifier, e.g. with one loaded from a finer
+    boundary file.
+
+    Args:
+        classifier (RegionClassifier): Classifier to use
+    """
+    global _classifier
+    _classifier = classifier
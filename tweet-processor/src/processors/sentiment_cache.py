@@ -0,0 +1,154 @@
+"""
+Module for caching sentiment results by the content of the tweet text.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_CACHE_TTL = 3600  # seconds
+
+RETWEET_PREFIX_PATTERN = re.compile(r'^rt\s+@\w+:?\s*')
+URL_PATTERN = re.compile(r'https?://\S+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Normalize a text so that retweets and copies of a template share a key.
+
+    Lowercases, drops a leading "RT @user:" and URLs, and collapses whitespace.
+
+    Args:
+        text (str): Tweet text
+
+    Returns:
+        str: Normalized text
+    """
+    text = (text or '').lower()
+    text = RETWEET_PREFIX_PATTERN.sub('', text)
+    text = URL_PATTERN.sub('', text)
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def drops_words(text):
+    """
+    Return True if normalize_text drops words from a text.
+
+    Lowercasing and whitespace do not change the word tokens of a text; a
+    retweet prefix and URLs do.
+
+    Args:
+        text (str): Tweet text
+
+    Returns:
+        bool: True if the text has a retweet prefix or URLs
+    """
+    text = (text or '').lower()
+    return bool(RETWEET_PREFIX_PATTERN.match(text) or URL_PATTERN.search(text))
+
+
+def cache_key(text, namespace='', normalized=False):
+    """
+    Return the content-addressed key of a text.
+
+    Args:
+        text (str): Tweet text
+        namespace (str): Prefix separating backends that score differently
+        normalized (bool): True if `text` is already normalized
+
+    Returns:
+        str: Hex digest of the normalized text
+    """
+    if not normalized:
+        text = normalize_text(text)
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+    return f"{namespace}:{digest}" if namespace else digest
+
+
+class SentimentCache:
+    """
+    Bounded LRU cache of sentiment results with a time-to-live.
+
+    The cache is local to the process: each pool worker has its own copy,
+    since a lookup across processes would cost more than scoring the text.
+    Counters track hits, misses, evictions (capacity) and expirations (TTL).
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Return the cached value for a key, or None.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            dict: Cached sentiment, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(value)
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key (str): Cache key
+            value (dict): Sentiment to cache
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every entry."""
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Return cache counters.
+
+        Returns:
+            dict: size, hits, misses, evictions, expirations and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
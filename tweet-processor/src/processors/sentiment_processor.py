@@ -3,6 +3,10 @@ Module for analyzing sentiment in tweets.
 """
 import logging
 
+from .lexicon_sentiment import LexiconSentimentEngine, label_for_polarity
+from .sentiment_cache import cache_key, drops_words, normalize_text
+from .text_analysis import PhraseMatcher, TextAnalysis, analyze_text
+
 logger = logging.getLogger(__name__)
 
 # Try to import TextBlob with a fallback mechanism
@@ -13,80 +17,256 @@ except ImportError:
     logger.warning("TextBlob not available. Will use simplified sentiment analysis.")
     TEXTBLOB_AVAILABLE = False
 
-def analyze_sentiment(tweet):
+NEUTRAL_SENTIMENT = {
+    'polarity': 0.0,
+    'subjectivity': 0.0,
+    'label': 'neutral'
+}
+
+
+class SentimentBackend:
+    """
+    Interface for sentiment backends.
+
+    Subclasses implement `score_batch`, which scores a list of texts and
+    returns one dict with `polarity`, `subjectivity` and `label` per text.
+    Backends that work on tokens also override `score_analyses` to reuse
+    the shared TextAnalysis instead of tokenizing again.
+    """
+    name = None
+
+    def score_batch(self, texts):
+        raise NotImplementedError
+
+    def score_analyses(self, analyses):
+        return self.score_batch([analysis.text for analysis in analyses])
+
+
+class TextBlobBackend(SentimentBackend):
+    """Sentiment from TextBlob's pattern analyzer."""
+    name = 'textblob'
+
+    def score_batch(self, texts):
+        results = []
+        for text in texts:
+            sentiment = TextBlob(text).sentiment
+            results.append({
+                'polarity': sentiment.polarity,
+                'subjectivity': sentiment.subjectivity,
+                'label': label_for_polarity(sentiment.polarity)
+            })
+        return results
+
+
+class KeywordBackend(SentimentBackend):
+    """Simplified sentiment counting positive and negative keywords."""
+    name = 'keyword'
+
+    # Enhanced positive word list
+    POSITIVE_WORDS = [
+        'good', 'great', 'awesome', 'excellent', 'happy', 'love', 'amazing',
+        'excited', 'impressive', 'fantastic', 'wonderful', 'enjoying', 'enjoy',
+        'looking forward', 'best', 'brilliant', 'impressed'
+    ]
+
+    # Enhanced negative word list
+    NEGATIVE_WORDS = [
+        'bad', 'terrible', 'awful', 'sad', 'hate', 'disappointing', 'poor',
+        'disappointed', 'frustrated', 'not impressed', 'issues', 'problems',
+        'avoid', 'failed', 'struggling', 'worst', 'horrible', 'annoying', 'fail'
+    ]
+
+    def __init__(self):
+        self.positive_matcher = PhraseMatcher(self.POSITIVE_WORDS)
+        self.negative_matcher = PhraseMatcher(self.NEGATIVE_WORDS)
+
+    def score_batch(self, texts):
+        return self.score_analyses([analyze_text(text) for text in texts])
+
+    def score_analyses(self, analyses):
+        results = []
+        for analysis in analyses:
+            # Count distinct positive and negative words and phrases
+            pos_count = len(set(self.positive_matcher.find(analysis.tokens)))
+            neg_count = len(set(self.negative_matcher.find(analysis.tokens)))
+
+            # Calculate polarity based on counts
+            total = pos_count + neg_count
+            polarity = 0.0 if total == 0 else (pos_count - neg_count) / total
+            subjectivity = 0.5 if total == 0 else min(1.0, total / 10)
+
+            results.append({
+                'polarity': polarity,
+                'subjectivity': subjectivity,
+                'label': label_for_polarity(polarity)
+            })
+        return results
+
+
+class LexiconBackend(SentimentBackend):
+    """Batched sentiment from the precompiled lexicon engine."""
+    name = 'lexicon'
+
+    def __init__(self):
+        self.engine = LexiconSentimentEngine()
+
+    def score_batch(self, texts):
+        return self.engine.score_batch(texts)
+
+    def score_analyses(self, analyses):
+        return self.engine.score_token_lists([analysis.tokens for analysis in analyses])
+
+
+SENTIMENT_BACKENDS = {
+    TextBlobBackend.name: TextBlobBackend,
+    KeywordBackend.name: KeywordBackend,
+    LexiconBackend.name: LexiconBackend,
+}
+
+_backend = None
+_cache = None
+
+
+def get_sentiment_backend():
+    """
+    Return the active sentiment backend.
+
+    Defaults to TextBlob when it is installed, else the keyword backend.
+    """
+    global _backend
+    if _backend is None:
+        _backend = TextBlobBackend() if TEXTBLOB_AVAILABLE else KeywordBackend()
+    return _backend
+
+
+def set_sentiment_backend(name):
+    """
+    Select the sentiment backend by name.
+
+    Args:
+        name (str): One of SENTIMENT_BACKENDS, or None/empty for the default
+
+    Returns:
+        SentimentBackend: The active backend
+    """
+    global _backend
+    if not name:
+        _backend = None
+        return get_sentiment_backend()
+
+    name = name.lower()
+    if name not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{name}', expected one of {sorted(SENTIMENT_BACKENDS)}")
+    if name == TextBlobBackend.name and not TEXTBLOB_AVAILABLE:
+        logger.warning("TextBlob not available, using keyword sentiment backend")
+        name = KeywordBackend.name
+
+    _backend = SENTIMENT_BACKENDS[name]()
+    logger.info(f"Using {name} sentiment backend")
+    return _backend
+
+
+def get_sentiment_cache():
+    """Return the active sentiment cache, or None if caching is disabled."""
+    return _cache
+
+
+def set_sentiment_cache(cache):
+    """
+    Set the cache consulted before scoring.
+
+    Args:
+        cache (SentimentCache): Cache to use, or None to disable caching
+    """
+    global _cache
+    _cache = cache
+
+
+def normalized_analysis(text, analysis=None):
+    """
+    Return the TextAnalysis of the normalized text (see normalize_text).
+
+    The normalized text is what gets scored and what the cache key is built
+    from, so that texts sharing a key always share a score. The tokens of
+    the raw text are reused when normalizing does not change them.
+
+    Args:
+        text (str): Tweet text
+        analysis (TextAnalysis): Tokens of the raw text, if already computed
+
+    Returns:
+        TextAnalysis: Analysis of the normalized text
+    """
+    normalized = normalize_text(text)
+    if analysis is None or drops_words(text):
+        return analyze_text(normalized)
+    return TextAnalysis(normalized, analysis.tokens, analysis.hashtags)
+
+
+def analyze_sentiment(tweet, analysis=None):
     """
     Analyze sentiment of a tweet text.
-    
+
     Args:
         tweet (dict): Tweet data
-        
+        analysis (TextAnalysis): Tokens of the tweet text, if already computed
+
     Returns:
         dict: Tweet with added sentiment information
     """
-    try:
-        if 'text' not in tweet or not tweet['text']:
+    return analyze_sentiment_batch([tweet], [analysis])[0]
+
+
+def analyze_sentiment_batch(tweets, analyses=None):
+    """
+    Analyze sentiment of several tweets with a single backend call.
+
+    Args:
+        tweets (list): Tweet dicts
+        analyses (list): TextAnalysis per tweet (items may be None), if already computed
+
+    Returns:
+        list: The same tweets with added sentiment information
+    """
+    if analyses is None:
+        analyses = [None] * len(tweets)
+
+    scored = []
+    for tweet, analysis in zip(tweets, analyses):
+        if not tweet.get('text'):
             # Skip sentiment analysis if no text
-            tweet['sentiment'] = {
-                'polarity': 0.0,
-                'subjectivity': 0.0,
-                'label': 'neutral'
-            }
-            return tweet
-        
-        if TEXTBLOB_AVAILABLE:
-            # Use TextBlob for sentiment analysis
-            blob = TextBlob(tweet['text'])
-            polarity = blob.sentiment.polarity
-            subjectivity = blob.sentiment.subjectivity
-        else:
-            # Enhanced simplified sentiment using keyword approach
-            text = tweet['text'].lower()
-            
-            # Enhanced positive word list
-            positive_words = [
-                'good', 'great', 'awesome', 'excellent', 'happy', 'love', 'amazing',
-                'excited', 'impressive', 'fantastic', 'wonderful', 'enjoying', 'enjoy',
-                'looking forward', 'best', 'brilliant', 'impressed'
-            ]
-            
-            # Enhanced negative word list
-            negative_words = [
-                'bad', 'terrible', 'awful', 'sad', 'hate', 'disappointing', 'poor',
-                'disappointed', 'frustrated', 'not impressed', 'issues', 'problems',
-                'avoid', 'failed', 'struggling', 'worst', 'horrible', 'annoying', 'fail'
-            ]
-            
-            # Count positive and negative words
-            pos_count = sum(1 for word in positive_words if word in text)
-            neg_count = sum(1 for word in negative_words if word in text)
-            
-            # Calculate polarity based on counts
-            total = pos_count + neg_count
-            polarity = 0.0 if total == 0 else (pos_count - neg_count) / total
-            subjectivity = 0.5 if total == 0 else min(1.0, total / 10)
-        
-        # Adjust sentiment thresholds for more balanced distribution
-        if polarity > 0.05:
-            sentiment_label = 'positive'
-        elif polarity < -0.05:
-            sentiment_label = 'negative'
+            tweet['sentiment'] = dict(NEUTRAL_SENTIMENT)
         else:
-            sentiment_label = 'neutral'
-        
-        # Add sentiment data to tweet
-        tweet['sentiment'] = {
-            'polarity': polarity,
-            'subjectivity': subjectivity,
-            'label': sentiment_label
-        }
-        
-        return tweet
+            scored.append((tweet, normalized_analysis(tweet['text'], analysis)))
+
+    cache = _cache
+    if cache is not None and scored:
+        # Skip scoring entirely for texts already in the cache
+        namespace = get_sentiment_backend().name
+        misses = []
+        for tweet, analysis in scored:
+            key = cache_key(analysis.text, namespace, normalized=True)
+            sentiment = cache.get(key)
+            if sentiment is None:
+                misses.append((tweet, analysis, key))
+            else:
+                tweet['sentiment'] = sentiment
+        scored = [(tweet, analysis) for tweet, analysis, _ in misses]
+        keys = [key for _, _, key in misses]
+
+    if not scored:
+        return tweets
+
+    try:
+        sentiments = get_sentiment_backend().score_analyses([analysis for _, analysis in scored])
+        for (tweet, _), sentiment in zip(scored, sentiments):
+            tweet['sentiment'] = sentiment
+        if cache is not None:
+            for key, sentiment in zip(keys, sentiments):
+                cache.put(key, sentiment)
     except Exception as e:
-        logger.error(f"Error analyzing sentiment for tweet {tweet.get('id', 'unknown')}: {e}")
+        logger.error(f"Error analyzing sentiment for {len(scored)} tweets: {e}")
         # Add neutral sentiment if analysis fails
-        tweet['sentiment'] = {
-            'polarity': 0.0,
-            'subjectivity': 0.0,
-            'label': 'neutral'
-        }
-        return tweet
+        for tweet, _ in scored:
+            tweet['sentiment'] = dict(NEUTRAL_SENTIMENT)
+    return tweets
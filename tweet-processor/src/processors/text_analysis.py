@@ -0,0 +1,145 @@
+"""
+Module for tokenizing tweet text once and sharing the result between stages.
+"""
+import re
+
+# Hashtags (group 1) and lowercase words (group 2), with the "n't" of
+# contractions split off as its own token
+TOKEN_PATTERN = re.compile(r"#(\w+)|([a-z]+?(?=n't)|n't|[a-z]+)")
+
+ENGLISH_STOPWORDS = frozenset({
+    'a', 'about', 'all', 'an', 'and', 'any', 'are', 'at', 'be', 'but', 'by',
+    'can', 'do', 'for', 'from', 'have', 'how', 'i', 'in', 'is', 'it', 'just',
+    'me', 'more', 'my', 'not', 'of', 'on', 'or', 'so', 'that', 'the', 'this',
+    'to', 'was', 'we', 'what', 'when', 'with', 'you', 'your',
+})
+
+_END = object()
+
+
+class TextAnalysis:
+    """
+    Result of tokenizing a tweet text once.
+
+    Attributes:
+        text (str): Original text
+        tokens (list): Lowercase word tokens, hashtags excluded
+        hashtags (list): Lowercase hashtags without the leading '#'
+    """
+    __slots__ = ('text', 'tokens', 'hashtags')
+
+    def __init__(self, text, tokens, hashtags):
+        self.text = text
+        self.tokens = tokens
+        self.hashtags = hashtags
+
+
+def analyze_text(text):
+    """
+    Tokenize a text in a single pass.
+
+    Args:
+        text (str): Tweet text
+
+    Returns:
+        TextAnalysis: Tokens and hashtags of the text
+    """
+    tokens = []
+    hashtags = []
+    for hashtag, word in TOKEN_PATTERN.findall((text or '').lower()):
+        if hashtag:
+            hashtags.append(hashtag)
+        else:
+            tokens.append(word)
+    return TextAnalysis(text or '', tokens, hashtags)
+
+
+def tokenize(text):
+    """
+    Return the lowercase word tokens of a text.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: Word tokens, hashtags excluded
+    """
+    return analyze_text(text).tokens
+
+
+class PhraseMatcher:
+    """
+    Token-level trie matching single- and multi-word phrases.
+
+    Matching walks the trie from each token, so the cost is linear in the
+    number of tokens (times the longest phrase length) and does not grow
+    with the number of phrases.
+    """
+
+    def __init__(self, phrases):
+        self._root = {}
+        for phrase in phrases:
+            node = self._root
+            for token in tokenize(phrase):
+                node = node.setdefault(token, {})
+            node[_END] = phrase
+
+    def find(self, tokens):
+        """
+        Find every phrase occurrence in a token list.
+
+        Args:
+            tokens (list): Lowercase word tokens
+
+        Returns:
+            list: Matched phrases, in order of their first token
+        """
+        root = self._root
+        count = len(tokens)
+        matches = []
+        for start in range(count):
+            node = root
+            for position in range(start, count):
+                node = node.get(tokens[position])
+                if node is None:
+                    break
+                if _END in node:
+                    matches.append(node[_END])
+        return matches
+
+
+def detect_language(tokens):
+    """
+    Detect English text from the share of English stopwords.
+
+    Args:
+        tokens (list): Lowercase word tokens
+
+    Returns:
+        str: 'en', 'und' (undetermined) or None if there are no tokens
+    """
+    if not tokens:
+        return None
+    hits = sum(1 for token in tokens if token in ENGLISH_STOPWORDS)
+    return 'en' if hits and hits / len(tokens) >= 0.1 else 'und'
+
+
+def annotate_language(tweet, analysis=None):
+    """
+    Add a `lang` field to a tweet that does not have one.
+
+    Args:
+        tweet (dict): Tweet data
+        analysis (TextAnalysis): Tokens of the tweet text, computed if omitted
+
+    Returns:
+        dict: Tweet with language information
+    """
+    if tweet.get('lang'):
+        return tweet
+    if analysis is None:
+        analysis = analyze_text(tweet.get('text', ''))
+    language = detect_language(analysis.tokens)
+    if language:
+        tweet['lang'] = language
+    return tweet
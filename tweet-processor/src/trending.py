@@ -0,0 +1,139 @@
+"""
+Sliding-window trending hashtags computed incrementally while processing.
+"""
+import heapq
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 60  # seconds
+DEFAULT_SLIDE_INTERVAL = 10  # seconds
+DEFAULT_MIN_HASHTAG_COUNT = 2
+DEFAULT_TOP_K = 10
+
+
+class TrendingHashtags:
+    """
+    Top-K hashtags over a sliding window of processing time.
+
+    The window is a ring buffer of per-slide counters plus a running total
+    for the whole window, so counting a tweet costs O(1) per hashtag. When
+    a slide ends, the top-K of the window (hashtags counted at least
+    `min_count` times) is emitted to the Kafka topic and indexed as one
+    document, and the oldest slide is subtracted from the total.
+
+    Documents are buffered in the tweets' BulkIndexer, so that they ride
+    along with the next bulk request instead of costing one request each.
+    """
+
+    def __init__(self, producer=None, topic=None, indexer=None, index_name=None,
+                 window_size=DEFAULT_WINDOW_SIZE, slide_interval=DEFAULT_SLIDE_INTERVAL,
+                 min_count=DEFAULT_MIN_HASHTAG_COUNT, top_k=DEFAULT_TOP_K):
+        self.producer = producer
+        self.topic = topic
+        self.indexer = indexer
+        self.index_name = index_name
+        self.slide_interval = max(1, int(slide_interval))
+        self.slide_count = max(1, int(window_size) // self.slide_interval)
+        self.window_size = self.slide_count * self.slide_interval
+        self.min_count = max(1, int(min_count))
+        self.top_k = max(1, int(top_k))
+
+        self._slides = [Counter() for _ in range(self.slide_count)]
+        self._tweets = [0] * self.slide_count
+        self._current = 0
+        self._totals = Counter()
+        self._next_slide_at = time.monotonic() + self.slide_interval
+
+        self.emitted_count = 0
+        self.last_top = []
+
+    def add(self, tweet):
+        """
+        Count the hashtags of a processed tweet in the current slide.
+
+        Args:
+            tweet (dict): Processed tweet with a `hashtags` list
+        """
+        self._tweets[self._current] += 1
+        hashtags = tweet.get('hashtags')
+        if not hashtags:
+            return
+        slide = self._slides[self._current]
+        totals = self._totals
+        for hashtag in set(hashtags):
+            slide[hashtag] += 1
+            totals[hashtag] += 1
+
+    def add_batch(self, tweets):
+        """Count the hashtags of several processed tweets."""
+        for tweet in tweets:
+            self.add(tweet)
+
+    def top(self):
+        """
+        Return the current top-K of the window.
+
+        Returns:
+            list: [hashtag, count] pairs, most frequent first
+        """
+        candidates = ((count, hashtag) for hashtag, count in self._totals.items() if count >= self.min_count)
+        return [[hashtag, count] for count, hashtag in heapq.nlargest(self.top_k, candidates)]
+
+    def slide_if_due(self):
+        """
+        Close the current slide if its interval has elapsed.
+
+        Also flushes the indexer once its flush interval has elapsed, so
+        that the last snapshot is indexed while no tweets are coming in.
+
+        Returns:
+            bool: True if a slide was closed
+        """
+        if self.indexer is not None:
+            self.indexer.flush_if_due()
+        now = time.monotonic()
+        if now < self._next_slide_at:
+            return False
+
+        self.emit()
+        # Advance by every elapsed slide, e.g. after an idle period
+        elapsed = 1 + int((now - self._next_slide_at) // self.slide_interval)
+        for _ in range(min(elapsed, self.slide_count)):
+            self._advance()
+        self._next_slide_at += elapsed * self.slide_interval
+        return True
+
+    def _advance(self):
+        self._current = (self._current + 1) % self.slide_count
+        expired = self._slides[self._current]
+        if expired:
+            # Counter subtraction in place drops the hashtags that reach zero
+            self._totals -= expired
+            expired.clear()
+        self._tweets[self._current] = 0
+
+    def emit(self):
+        """Publish the current top-K to Kafka and Elasticsearch."""
+        self.last_top = self.top()
+        window_end = datetime.now(timezone.utc)
+        document = {
+            'window_end': window_end.isoformat(),
+            'window_size': self.window_size,
+            'slide_interval': self.slide_interval,
+            'tweet_count': sum(self._tweets),
+            'hashtags': [{'tag': hashtag, 'count': count} for hashtag, count in self.last_top]
+        }
+
+        if self.producer is not None and self.topic:
+            try:
+                self.producer.send(self.topic, document)
+            except Exception as e:
+                logger.error(f"Error sending trending hashtags to {self.topic}: {e}")
+        if self.indexer is not None and self.index_name:
+            self.indexer.add(document, index=self.index_name, doc_id=str(int(window_end.timestamp())))
+        self.emitted_count += 1
+        return document
@@ -0,0 +1,92 @@
+"""
+Process pool used to spread CPU-bound tweet processing over several cores.
+"""
+import logging
+import signal
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(sentiment_backend=None, sentiment_cache=None, region_boundaries=None,
+                 geocoder_settings=None, pipeline_settings=None):
+    """
+    Load the processors, the TextBlob/NLTK corpora, the region index and the
+    gazetteer once per worker process, so individual tasks do not pay the
+    start-up cost.
+    """
+    # Leave interrupt handling to the parent, which drains in-flight batches
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        from processors.sentiment_processor import (
+            analyze_sentiment,
+            set_sentiment_backend,
+            set_sentiment_cache,
+        )
+        set_sentiment_backend(sentiment_backend)
+        set_sentiment_cache(sentiment_cache)
+        from processors.region_classifier import (
+            RegionClassifier,
+            get_region_classifier,
+            set_region_classifier,
+        )
+        if region_boundaries:
+            set_region_classifier(RegionClassifier.from_geojson(region_boundaries))
+        get_region_classifier()
+        from processors.geocoder import Gazetteer, get_geocoder, set_geocoder
+        if geocoder_settings:
+            set_geocoder(Gazetteer.from_file(*geocoder_settings))
+        get_geocoder()
+        analyze_sentiment({'text': 'warm up the sentiment corpora'})
+        if pipeline_settings:
+            from pipeline import configure_pipeline
+            # Workers hand their metrics to the parent, which logs them
+            configure_pipeline(pipeline_settings[0], metrics_interval=0)
+    except Exception as e:
+        logger.warning(f"Could not initialize processors in worker: {e}")
+
+
+def create_process_pool(parallelism, sentiment_backend=None, sentiment_cache=None,
+                        region_boundaries=None, geocoder_settings=None, pipeline_settings=None):
+    """
+    Create a process pool with `parallelism` workers.
+
+    Args:
+        parallelism (int): Number of worker processes
+        sentiment_backend (str): Sentiment backend selected in each worker
+        sentiment_cache (SentimentCache): Cache copied into each worker
+        region_boundaries (str): Custom boundaries file loaded in each worker
+        geocoder_settings (tuple): Custom (gazetteer file, cache size) loaded in each worker
+        pipeline_settings (tuple): (stage names, metrics interval) of the pipeline run by each worker
+
+    Returns:
+        ProcessPoolExecutor: Pool, or None if parallelism is 1 or less
+    """
+    if parallelism <= 1:
+        return None
+    logger.info(f"Starting process pool with {parallelism} workers")
+    return ProcessPoolExecutor(max_workers=parallelism, initializer=_init_worker,
+                               initargs=(sentiment_backend, sentiment_cache, region_boundaries,
+                                         geocoder_settings, pipeline_settings))
+
+
+def map_in_pool(pool, func, items, workers):
+    """
+    Apply `func` to every item using the pool.
+
+    Results are returned in input order, so records keep their
+    per-partition ordering.
+
+    Args:
+        pool (ProcessPoolExecutor): Pool created by create_process_pool
+        func (callable): Picklable function applied to each item
+        items (list): Items to process
+        workers (int): Number of workers in the pool, used to size chunks
+
+    Returns:
+        list: Results in the same order as `items`
+    """
+    if not items:
+        return []
+    chunksize = max(1, len(items) // (workers * 4))
+    return list(pool.map(func, items, chunksize=chunksize))
@@ -0,0 +1,19 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture(scope='session')
+def processor_main():
+    """The processor's main module, loaded under its own name since the other services also have a main.py."""
+    if 'processor_main' not in sys.modules:
+        spec = importlib.util.spec_from_file_location('processor_main', os.path.join(SRC_DIR, 'main.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['processor_main'] = module
+        spec.loader.exec_module(module)
+    return sys.modules['processor_main']
@@ -0,0 +1,181 @@
+from collections import namedtuple
+
+import pytest
+from kafka.structs import OffsetAndMetadata, TopicPartition
+
+import pipeline
+from bulk_indexer import BulkIndexer
+from codec import get_codec
+from test_bulk_indexer import FakeElasticsearch
+
+Record = namedtuple('Record', 'topic partition offset value headers')
+
+PARTITION_0 = TopicPartition('raw-tweets', 0)
+PARTITION_1 = TopicPartition('raw-tweets', 1)
+
+
+class FakeFuture:
+    def __init__(self, error=None):
+        self.error = error
+
+    def failed(self):
+        return self.error is not None
+
+
+class FakeProducer:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, topic, value):
+        self.sent.append((topic, value))
+        return FakeFuture(RuntimeError('broker down') if self.fail else None)
+
+    def flush(self):
+        pass
+
+
+class FakeConsumer:
+    """Consumer over a fixed log of records, whose positions move on poll and seek."""
+
+    def __init__(self, log=None):
+        self.log = log or {}
+        self.positions = {partition: records[0].offset for partition, records in self.log.items()}
+        self.commits = []
+        self.seeks = []
+
+    def poll(self, timeout_ms=0, max_records=None):
+        batch = {}
+        for partition, records in self.log.items():
+            pending = [record for record in records if record.offset >= self.positions[partition]]
+            if pending:
+                batch[partition] = pending
+                self.positions[partition] = pending[-1].offset + 1
+        return batch
+
+    def commit(self, offsets):
+        self.commits.append(offsets)
+
+    def seek(self, partition, offset):
+        self.seeks.append((partition, offset))
+        self.positions[partition] = offset
+
+
+def records(partition, first_offset, count):
+    codec = get_codec(None)
+    return [
+        Record(partition.topic, partition.partition, offset,
+               codec.encode({'id': f'{partition.partition}-{offset}', 'text': f'#kafka tweet {offset}'}),
+               codec.headers)
+        for offset in range(first_offset, first_offset + count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def hashtags_only():
+    pipeline.configure_pipeline(['hashtags'], metrics_interval=0)
+    yield
+    pipeline._pipeline = None
+
+
+@pytest.fixture
+def batch():
+    return {PARTITION_0: records(PARTITION_0, 10, 3), PARTITION_1: records(PARTITION_1, 40, 2)}
+
+
+def test_commits_after_the_batch_is_acknowledged(processor_main, batch):
+    consumer = FakeConsumer()
+    producer = FakeProducer()
+    es = FakeElasticsearch()
+    indexer = BulkIndexer(es, 'tweets')
+
+    committed = processor_main.process_and_commit(consumer, batch, producer, indexer, 'processed-tweets')
+
+    assert committed == 5
+    assert consumer.commits == [{
+        PARTITION_0: OffsetAndMetadata(13, None),
+        PARTITION_1: OffsetAndMetadata(42, None),
+    }]
+    assert consumer.seeks == []
+    assert len(es.requests[0]) == 5
+    assert producer.sent[0][1]['hashtags'] == ['kafka']
+
+
+def test_rewinds_the_batch_on_retriable_indexing_failures(processor_main, batch):
+    consumer = FakeConsumer()
+    indexer = BulkIndexer(FakeElasticsearch([201, 201, 429, 201, 201]), 'tweets')
+
+    committed = processor_main.process_and_commit(consumer, batch, FakeProducer(), indexer, 'processed-tweets')
+
+    assert committed == 0
+    assert consumer.commits == []
+    assert consumer.seeks == [(PARTITION_0, 10), (PARTITION_1, 40)]
+
+
+def test_rewinds_the_batch_on_kafka_send_failures(processor_main, batch):
+    consumer = FakeConsumer()
+    indexer = BulkIndexer(FakeElasticsearch(), 'tweets')
+
+    committed = processor_main.process_and_commit(consumer, batch, FakeProducer(fail=True), indexer,
+                                                  'processed-tweets')
+
+    assert committed == 0
+    assert consumer.commits == []
+    assert consumer.seeks == [(PARTITION_0, 10), (PARTITION_1, 40)]
+
+
+def test_commits_past_rejected_tweets(processor_main, batch):
+    consumer = FakeConsumer()
+    dead_letters = []
+    indexer = BulkIndexer(FakeElasticsearch([201, 400, 201, 201, 201]), 'tweets',
+                          dead_letter=lambda doc, error: dead_letters.append(doc['id']))
+
+    committed = processor_main.process_and_commit(consumer, batch, FakeProducer(), indexer, 'processed-tweets')
+
+    assert committed == 5
+    assert dead_letters == ['0-11']
+    assert consumer.commits[0][PARTITION_0] == OffsetAndMetadata(13, None)
+    assert consumer.seeks == []
+
+
+def test_undecodable_records_are_skipped(processor_main):
+    consumer = FakeConsumer()
+    producer = FakeProducer()
+    batch = {PARTITION_0: records(PARTITION_0, 0, 1) + [Record('raw-tweets', 0, 1, b'{not json', [])]}
+
+    indexer = BulkIndexer(FakeElasticsearch(), 'tweets')
+
+    committed = processor_main.process_and_commit(consumer, batch, producer, indexer, 'processed-tweets')
+
+    assert committed == 2
+    assert len(producer.sent) == 1
+    assert consumer.commits == [{PARTITION_0: OffsetAndMetadata(2, None)}]
+
+
+@pytest.mark.parametrize('failure', ['processing', 'producer'])
+def test_redelivers_the_batch_when_processing_raises(processor_main, batch, monkeypatch, failure):
+    consumer = FakeConsumer(batch)
+    producer = FakeProducer()
+    indexer = BulkIndexer(FakeElasticsearch(), 'tweets')
+
+    def broken(*args):
+        raise RuntimeError('worker process died')
+
+    if failure == 'processing':
+        monkeypatch.setattr(processor_main, 'process_tweets', broken)
+    else:
+        monkeypatch.setattr(producer, 'send', broken)
+
+    with pytest.raises(RuntimeError):
+        processor_main.process_and_commit(consumer, consumer.poll(), producer, indexer, 'processed-tweets')
+    assert consumer.commits == []
+    assert consumer.seeks == [(PARTITION_0, 10), (PARTITION_1, 40)]
+
+    monkeypatch.undo()
+    redelivered = consumer.poll()
+    assert redelivered == batch
+    assert processor_main.process_and_commit(consumer, redelivered, producer, indexer, 'processed-tweets') == 5
+    assert consumer.commits == [{
+        PARTITION_0: OffsetAndMetadata(13, None),
+        PARTITION_1: OffsetAndMetadata(42, None),
+    }]
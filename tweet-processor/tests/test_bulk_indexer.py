@@ -0,0 +1,127 @@
+import json
+
+from elasticsearch.exceptions import ConnectionError, RequestError
+
+from bulk_indexer import BulkIndexer, is_retriable_status
+
+
+class FakeElasticsearch:
+    """Answer each bulk request with the next status list, one status per document."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def bulk(self, body):
+        lines = body.splitlines()
+        actions = [json.loads(line)['index'] for line in lines[::2]]
+        self.requests.append(actions)
+        response = self.responses.pop(0) if self.responses else None
+        if isinstance(response, Exception):
+            raise response
+        statuses = response or [201] * len(actions)
+        items = []
+        for action, status in zip(actions, statuses):
+            item = {'_index': action['_index'], 'status': status}
+            if status >= 300:
+                item['error'] = {'type': f'error_{status}'}
+            items.append({'index': item})
+        return {'errors': any(status >= 300 for status in statuses), 'items': items}
+
+
+def tweets(count):
+    return [{'id': str(i), 'text': f'tweet {i}'} for i in range(count)]
+
+
+def test_retriable_statuses():
+    assert is_retriable_status(429)
+    assert is_retriable_status(503)
+    assert is_retriable_status(None)
+    assert not is_retriable_status(400)
+    assert not is_retriable_status(409)
+
+
+def test_flush_uses_tweet_ids():
+    es = FakeElasticsearch()
+    indexer = BulkIndexer(es, 'tweets', bulk_size=10)
+    for tweet in tweets(3):
+        indexer.add(tweet)
+
+    assert indexer.flush() == []
+    assert [action['_id'] for action in es.requests[0]] == ['0', '1', '2']
+    assert indexer.indexed_count == 3
+    assert len(indexer) == 0
+
+
+def test_partial_failure_returns_only_retriable_items():
+    es = FakeElasticsearch([201, 400, 429, 503])
+    dead_letters = []
+    indexer = BulkIndexer(es, 'tweets', bulk_size=10,
+                          dead_letter=lambda doc, error: dead_letters.append((doc['id'], error)))
+    for tweet in tweets(4):
+        indexer.add(tweet)
+
+    failed = indexer.flush()
+
+    assert [tweet['id'] for tweet in failed] == ['2', '3']
+    assert dead_letters == [('1', {'type': 'error_400'})]
+    assert indexer.indexed_count == 1
+    assert indexer.failed_count == 2
+    assert indexer.rejected_count == 1
+
+
+def test_dead_letter_errors_do_not_fail_the_flush():
+    def dead_letter(doc, error):
+        raise RuntimeError('producer closed')
+
+    indexer = BulkIndexer(FakeElasticsearch([400]), 'tweets', dead_letter=dead_letter)
+    indexer.add(tweets(1)[0])
+
+    assert indexer.flush() == []
+    assert indexer.rejected_count == 1
+
+
+def test_request_errors_follow_their_status():
+    indexer = BulkIndexer(FakeElasticsearch(ConnectionError('N/A', 'refused', None)), 'tweets')
+    for tweet in tweets(2):
+        indexer.add(tweet)
+    assert len(indexer.flush()) == 2
+    assert indexer.failed_count == 2
+
+    indexer = BulkIndexer(FakeElasticsearch(RequestError(400, 'parse_exception', {})), 'tweets')
+    for tweet in tweets(2):
+        indexer.add(tweet)
+    assert indexer.flush() == []
+    assert indexer.rejected_count == 2
+
+
+def test_auxiliary_failures_are_not_returned():
+    es = FakeElasticsearch([201, 503])
+    indexer = BulkIndexer(es, 'tweets')
+    indexer.add(tweets(1)[0])
+    indexer.add({'hashtags': []}, index='trending-hashtags', doc_id='slide-1')
+
+    assert indexer.flush() == []
+    assert es.requests[0][1] == {'_index': 'trending-hashtags', '_id': 'slide-1'}
+    assert indexer.failed_count == 1
+
+
+def test_flushes_when_the_buffer_is_full():
+    es = FakeElasticsearch()
+    indexer = BulkIndexer(es, 'tweets', bulk_size=2)
+    for tweet in tweets(5):
+        indexer.add(tweet)
+    assert [len(actions) for actions in es.requests] == [2, 2]
+    assert len(indexer) == 1
+
+    es = FakeElasticsearch()
+    indexer = BulkIndexer(es, 'tweets', bulk_size=100, max_bytes=150)
+    for tweet in tweets(4):
+        indexer.add(tweet)
+    assert es.requests
+    assert all(len(actions) < 4 for actions in es.requests)
+
+
+def test_failures_of_an_overflow_flush_are_returned_by_add():
+    indexer = BulkIndexer(FakeElasticsearch([503]), 'tweets', bulk_size=1)
+    assert [tweet['id'] for tweet in indexer.add(tweets(1)[0])] == ['0']
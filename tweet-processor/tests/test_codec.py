@@ -0,0 +1,110 @@
+import filecmp
+import os
+from collections import namedtuple
+
+import pytest
+
+import codec
+from codec import CODEC_HEADER, EncodingProducer, decode_message, decode_record, get_codec, resolve_compression_type
+
+Record = namedtuple('Record', ['value', 'headers'])
+
+TWEET = {
+    'id': '1234567890123456789',
+    'text': "Café \U0001F680 #AI",
+    'user': {'screen_name': 'dev', 'followers_count': 42},
+    'hashtags': ['ai'],
+    'location': {'lat': 48.85, 'lon': 2.35},
+    'retweeted': False,
+    'reply_to': None,
+}
+
+AVAILABLE_CODECS = [name for name in codec.CODECS if codec._AVAILABLE[name]]
+
+
+class FakeKafkaProducer:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, topic, value=None, headers=None):
+        self.sent.append((topic, value, headers))
+        return 'future'
+
+    def flush(self, timeout=None):
+        return 'flushed'
+
+
+@pytest.mark.parametrize('name', AVAILABLE_CODECS)
+def test_round_trip(name):
+    message_codec = get_codec(name)
+    data = message_codec.encode(TWEET)
+
+    assert isinstance(data, bytes)
+    assert message_codec.decode(data) == TWEET
+    assert decode_message(data, message_codec.headers) == TWEET
+    assert message_codec.headers == [(CODEC_HEADER, name.encode('ascii'))]
+
+
+@pytest.mark.parametrize('name', AVAILABLE_CODECS)
+def test_values_that_are_not_serializable_become_strings(name):
+    message_codec = get_codec(name)
+
+    assert message_codec.decode(message_codec.encode({'value': object})) == {'value': str(object)}
+
+
+def test_messages_without_a_codec_header_are_json():
+    assert decode_message(b'{"id": 1}') == {'id': 1}
+    assert decode_message(b'{"id": 1}', [('trace', b'x')]) == {'id': 1}
+    assert decode_message(None) is None
+    assert decode_record(Record(get_codec('json').encode(TWEET), None)) == TWEET
+
+
+def test_unknown_codecs_are_rejected():
+    with pytest.raises(ValueError, match='Unknown codec'):
+        get_codec('avro')
+    with pytest.raises(ValueError, match='Unknown codec'):
+        decode_message(b'{}', [(CODEC_HEADER, b'avro')])
+
+
+def test_orjson_falls_back_to_json(monkeypatch):
+    monkeypatch.setitem(codec._AVAILABLE, 'orjson', False)
+    monkeypatch.setattr(codec, '_codecs', {})
+
+    assert get_codec('orjson').name == 'json'
+
+
+def test_msgpack_requires_its_library(monkeypatch):
+    monkeypatch.setitem(codec._AVAILABLE, 'msgpack', False)
+    monkeypatch.setattr(codec, '_codecs', {})
+
+    with pytest.raises(ValueError, match='requires the msgpack package'):
+        get_codec('msgpack')
+
+
+@pytest.mark.parametrize('name', AVAILABLE_CODECS)
+def test_encoding_producer_tags_messages(name):
+    producer = EncodingProducer(FakeKafkaProducer(), get_codec(name))
+
+    assert producer.send('raw-tweets', TWEET) == 'future'
+    topic, data, headers = producer._producer.sent[0]
+    assert topic == 'raw-tweets'
+    assert decode_message(data, headers) == TWEET
+    assert producer.flush() == 'flushed'
+
+
+def test_resolve_compression_type():
+    assert resolve_compression_type(None) is None
+    assert resolve_compression_type('none') is None
+    assert resolve_compression_type('GZIP') == 'gzip'
+    with pytest.raises(ValueError, match='Unknown compression type'):
+        resolve_compression_type('brotli')
+
+
+def test_collector_and_processor_share_the_module():
+    services = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    assert filecmp.cmp(
+        os.path.join(services, 'tweet-collector', 'src', 'codec.py'),
+        os.path.join(services, 'tweet-processor', 'src', 'codec.py'),
+        shallow=False
+    )
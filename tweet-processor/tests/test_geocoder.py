@@ -0,0 +1,82 @@
+import pytest
+
+from processors.geocoder import Gazetteer, Place, normalize_place_name
+
+US_CAPITAL = (38.8951, -77.0364)
+
+
+@pytest.fixture(scope='module')
+def gazetteer():
+    return Gazetteer.from_file()
+
+
+def coordinates(place):
+    return (place.lat, place.lon) if place is not None else None
+
+
+def test_normalize_place_name():
+    assert normalize_place_name('  São Paulo, BR ') == 'sao paulo br'
+    assert normalize_place_name(None) == ''
+
+
+@pytest.mark.parametrize('location, name, country', [
+    ('New York, NY', 'New York City', 'US'),
+    ('New York, USA', 'New York City', 'US'),
+    ('NY', 'New York City', 'US'),
+    ('Brooklyn, NY', 'Brooklyn', 'US'),
+    ('Delaware, Ohio', 'Delaware', 'US'),
+    ('Portland, OR', 'Portland', 'US'),
+    ('Paris, France', 'Paris', 'FR'),
+    ('Paris, TX', 'Paris', 'US'),
+    ('Atlanta, Georgia', 'Atlanta', 'US'),
+    ('London, UK', 'London', 'GB'),
+    ('Berlin', 'Berlin', 'DE'),
+])
+def test_geocodes_cities(gazetteer, location, name, country):
+    place = gazetteer.geocode(location)
+
+    assert (place.name, place.country) == (name, country)
+
+
+@pytest.mark.parametrize('location', ['New York, NY', 'NY', 'New York, USA', 'Georgia, USA', 'Delaware, Ohio'])
+def test_states_are_not_country_centroids(gazetteer, location):
+    assert coordinates(gazetteer.geocode(location)) != US_CAPITAL
+
+
+def test_states_only_narrow_candidates_to_the_us(gazetteer):
+    assert gazetteer.geocode('Indiana') is None
+    assert gazetteer.geocode('Georgia, USA') is None
+
+
+def test_countries_resolve_to_their_capital(gazetteer):
+    assert gazetteer.geocode('France').country == 'FR'
+    assert coordinates(gazetteer.geocode('USA')) == US_CAPITAL
+    assert gazetteer.geocode('Georgia').country == 'GE'
+
+
+@pytest.mark.parametrize('location', ['', '   ', 'Earth', 'worldwide', 'somewhere over the rainbow'])
+def test_non_places(gazetteer, location):
+    assert gazetteer.geocode(location) is None
+
+
+def test_prefers_the_most_populous_candidate():
+    small = Place('Springfield', 37.2, -93.3, 'US', 170000)
+    large = Place('Springfield', 42.1, -72.6, 'US', 155000)
+    country = Place('United States', 38.9, -77.0, 'US', 0)
+    gazetteer = Gazetteer([(large, ['Springfield']), (small, ['Springfield'])], [(country, ['United States'])])
+
+    assert gazetteer.geocode('Springfield') == small
+    assert gazetteer.geocode('Springfield, USA') == small
+
+
+def test_resolved_locations_are_cached():
+    place = Place('Lyon', 45.75, 4.85, 'FR', 500000)
+    gazetteer = Gazetteer([(place, ['Lyon'])], cache_size=1)
+
+    gazetteer.geocode('Lyon')
+    gazetteer.geocode('lyon ')
+    gazetteer.geocode('Paris')
+
+    assert gazetteer.stats()['hits'] == 1
+    assert gazetteer.stats()['misses'] == 2
+    assert gazetteer.stats()['cached'] == 1
@@ -0,0 +1,71 @@
+import pytest
+
+from processors import sentiment_processor
+from processors.lexicon_sentiment import LexiconSentimentEngine, label_for_polarity
+
+
+@pytest.fixture
+def engine():
+    return LexiconSentimentEngine()
+
+
+@pytest.mark.parametrize('polarity, label', [
+    (0.5, 'positive'), (0.06, 'positive'), (0.05, 'neutral'),
+    (0.0, 'neutral'), (-0.05, 'neutral'), (-0.3, 'negative'),
+])
+def test_label_for_polarity(polarity, label):
+    assert label_for_polarity(polarity) == label
+
+
+def test_scores_the_mean_of_sentiment_words(engine):
+    assert engine.score_tokens(['good', 'and', 'bad']) == pytest.approx((0.0, (0.6 + 0.67) / 2))
+    assert engine.score_tokens(['no', 'sentiment', 'here']) == (0.0, 0.0)
+
+
+def test_negation_flips_and_dampens_the_next_word(engine):
+    polarity, _ = engine.score_tokens(['not', 'good'])
+    assert polarity == pytest.approx(-0.35)
+
+    # The negation expires after MODIFIER_WINDOW tokens without a sentiment word
+    assert engine.score_tokens(['not', 'a', 'b', 'good'])[0] == pytest.approx(0.7)
+
+
+def test_intensifiers_scale_and_polarity_stays_bounded(engine):
+    assert engine.score_tokens(['very', 'good'])[0] == pytest.approx(0.91)
+    assert engine.score_tokens(['extremely', 'terrible'])[0] == -1.0
+    assert engine.score_tokens(['slightly', 'bad'])[0] == pytest.approx(-0.35)
+
+
+def test_score_batch_matches_single_scores(engine):
+    texts = ["I love this, it's awesome!", "Worst release ever", "Meeting at 3pm", ""]
+    batch = engine.score_batch(texts)
+
+    assert batch == [engine.score(text) for text in texts]
+    assert [sentiment['label'] for sentiment in batch] == ['positive', 'negative', 'neutral', 'neutral']
+
+
+def test_custom_lexicon(engine):
+    custom = LexiconSentimentEngine(lexicon={'meh': (-0.2, 0.5)})
+
+    assert custom.score("meh")['label'] == 'negative'
+    assert custom.score("great")['label'] == 'neutral'
+
+
+@pytest.mark.parametrize('name', ['lexicon', 'keyword'])
+def test_backends_score_batches_like_single_tweets(name):
+    sentiment_processor.set_sentiment_backend(name)
+    try:
+        texts = ["Really great keynote", "Not impressed, so many bugs", "New office today"]
+        batch = sentiment_processor.analyze_sentiment_batch([{'text': text} for text in texts])
+        single = [sentiment_processor.analyze_sentiment({'text': text}) for text in texts]
+
+        assert [tweet['sentiment'] for tweet in batch] == [tweet['sentiment'] for tweet in single]
+        assert batch[0]['sentiment']['label'] == 'positive'
+        assert sentiment_processor.analyze_sentiment({'text': ''})['sentiment'] == sentiment_processor.NEUTRAL_SENTIMENT
+    finally:
+        sentiment_processor.set_sentiment_backend(None)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match='Unknown sentiment backend'):
+        sentiment_processor.set_sentiment_backend('vader')
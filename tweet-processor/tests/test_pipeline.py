@@ -0,0 +1,120 @@
+import pytest
+
+import pipeline
+from pipeline import Pipeline, StageMetrics, register_stage
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    # Stages registered by a test do not leak into the others
+    monkeypatch.setattr(pipeline, 'STAGES', dict(pipeline.STAGES))
+    monkeypatch.setattr(pipeline, 'BATCH_STAGES', dict(pipeline.BATCH_STAGES))
+
+
+def test_runs_stages_in_order_with_a_shared_context():
+    @register_stage('tag')
+    def tag(tweet, context):
+        context['tagged'] = True
+        tweet.setdefault('seen', []).append('tag')
+        return tweet
+
+    register_stage('check', lambda tweet, context: {**tweet, 'tagged': context.get('tagged', False)})
+
+    assert Pipeline(['tag', 'check']).run({'id': 1}) == {'id': 1, 'seen': ['tag'], 'tagged': True}
+    assert Pipeline(['check', 'tag']).run({'id': 1})['tagged'] is False
+
+
+def test_unknown_stages_are_skipped():
+    register_stage('noop', lambda tweet, context: tweet)
+
+    assert Pipeline(['noop', 'missing']).names == ['noop']
+
+
+def test_a_failing_stage_is_counted_and_the_next_stages_still_run():
+    def broken(tweet, context):
+        raise ValueError('boom')
+
+    register_stage('broken', broken)
+    register_stage('mark', lambda tweet, context: {**tweet, 'marked': True})
+    stages = Pipeline(['broken', 'mark'])
+
+    assert stages.run({'id': 1}) == {'id': 1, 'marked': True}
+    assert stages.stats()['broken']['errors'] == 1
+    assert stages.stats()['mark'] == {**stages.stats()['mark'], 'calls': 1, 'errors': 0}
+
+
+def test_run_batch_calls_batch_stages_once():
+    calls = []
+
+    def double_batch(tweets, contexts):
+        calls.append(len(tweets))
+        return [{**tweet, 'value': tweet['value'] * 2} for tweet in tweets]
+
+    register_stage('double', lambda tweet, context: {**tweet, 'value': tweet['value'] * 2}, batch=double_batch)
+    register_stage('increment', lambda tweet, context: {**tweet, 'value': tweet['value'] + 1})
+    stages = Pipeline(['double', 'increment'])
+    tweets = [{'value': value} for value in range(5)]
+
+    assert stages.run_batch(tweets) == [stages.run(dict(tweet)) for tweet in tweets]
+    assert calls == [5]
+    assert stages.stats()['double']['calls'] == 10
+    assert stages.stats()['increment']['calls'] == 10
+
+
+def test_run_batch_retries_a_failed_batch_one_by_one():
+    def broken_batch(tweets, contexts):
+        raise RuntimeError('backend down')
+
+    register_stage('upper', lambda tweet, context: {**tweet, 'text': tweet['text'].upper()}, batch=broken_batch)
+    stages = Pipeline(['upper'])
+
+    assert stages.run_batch([{'text': 'a'}, {'text': 'b'}]) == [{'text': 'A'}, {'text': 'B'}]
+    assert stages.stats()['upper']['calls'] == 2
+    assert stages.stats()['upper']['errors'] == 1
+
+
+def test_stage_metrics_percentiles():
+    metrics = StageMetrics()
+    for millisecond in range(1, 101):
+        metrics.record(millisecond / 1000)
+    metrics.record_batch(0.0, 0)
+
+    stats = metrics.stats()
+    assert stats['calls'] == 100
+    assert stats['mean_ms'] == pytest.approx(50.5)
+    assert (stats['p50_ms'], stats['p95_ms'], stats['p99_ms']) == (51.0, 96.0, 100.0)
+    assert StageMetrics().stats()['p99_ms'] == 0.0
+
+
+def test_drained_metrics_merge_into_the_parent():
+    register_stage('noop', lambda tweet, context: tweet)
+    worker = Pipeline(['noop'])
+    parent = Pipeline(['noop'])
+    for _ in range(3):
+        worker.run({})
+
+    parent.merge_metrics(worker.drain_metrics())
+
+    assert parent.stats()['noop']['calls'] == 3
+    assert worker.stats()['noop']['calls'] == 0
+
+
+def test_default_stages_give_the_same_result_per_tweet_and_per_batch(processor_main):
+    pipeline.configure_pipeline(metrics_interval=0)
+    try:
+        tweets = [
+            {'id': 1, 'text': "Loving the new #AI keynote, great demos", 'location': {'lat': 48.85, 'lon': 2.35}},
+            {'id': 2, 'text': "Terrible outage again #cloud", 'user': {'location': 'Paris, France'}},
+            {'id': 3, 'text': ""},
+        ]
+        single = [processor_main.process_tweet(dict(tweet)) for tweet in tweets]
+        batch = processor_main.process_tweets([dict(tweet) for tweet in tweets])
+        for tweet in single + batch:
+            del tweet['processed_at']
+
+        assert batch == single
+        assert single[0]['hashtags'] == ['ai'] and single[0]['region'] == 'Europe'
+        assert single[0]['sentiment']['label'] == 'positive'
+        assert single[1]['sentiment']['label'] == 'negative'
+    finally:
+        pipeline._pipeline = None
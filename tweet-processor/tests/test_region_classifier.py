@@ -0,0 +1,103 @@
+import json
+import random
+
+import pytest
+
+from processors import region_classifier
+from processors.location_processor import normalize_locations, normalize_locations_batch
+from processors.region_classifier import RegionClassifier, _Polygon, normalize_longitude
+
+
+def square(min_x, min_y, max_x, max_y):
+    return [[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y], [min_x, min_y]]
+
+
+@pytest.fixture
+def classifier():
+    # A country inside its region, a triangle crossing grid cells and a
+    # region east of the antimeridian
+    return RegionClassifier([
+        _Polygon('Europe', 'France', square(-5, 42, 8, 51)),
+        _Polygon('Europe', None, square(-10, 35, 40, 70)),
+        _Polygon('Triangle', None, [[100, 0], [120, 0], [100, 20]]),
+        _Polygon('Pacific', None, square(170, -20, 179.9, 0)),
+    ])
+
+
+@pytest.mark.parametrize('lat, lon, expected', [
+    (48.85, 2.35, ('Europe', 'France')),
+    (52.5, 13.4, ('Europe', None)),
+    (5, 105, ('Triangle', None)),
+    (15, 115, (None, None)),
+    (-10, 175, ('Pacific', None)),
+    (-10, 175 - 360, ('Pacific', None)),
+    (0, -60, (None, None)),
+    (90, 180, (None, None)),
+])
+def test_classify(classifier, lat, lon, expected):
+    assert classifier.classify(lat, lon) == expected
+
+
+def test_batch_matches_single_points(classifier):
+    rng = random.Random(7)
+    lats = [rng.uniform(-90, 90) for _ in range(2000)] + [48.85, 5, -10]
+    lons = [rng.uniform(-200, 200) for _ in range(2000)] + [2.35, 105, -185]
+
+    assert classifier.classify_batch(lats, lons) == [
+        classifier.classify(lat, lon) for lat, lon in zip(lats, lons)
+    ]
+    assert classifier.classify_batch([], []) == []
+
+
+def test_batch_without_numpy(classifier, monkeypatch):
+    monkeypatch.setattr(region_classifier, 'NUMPY_AVAILABLE', False)
+
+    assert classifier.classify_batch([48.85, 15], [2.35, 115]) == [('Europe', 'France'), (None, None)]
+
+
+def test_normalize_longitude():
+    assert normalize_longitude(190) == -170
+    assert normalize_longitude(-180) == -180
+    assert normalize_longitude(45) == 45
+
+
+def test_from_geojson_reads_polygons_and_multipolygons(tmp_path):
+    path = tmp_path / 'regions.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'properties': {'region': 'Islands', 'country': 'Atlantis'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [[square(0, 0, 1, 1)], [square(10, 10, 11, 11)]]}},
+        {'properties': {'region': 'Block'}, 'geometry': {'type': 'Polygon', 'coordinates': [square(20, 20, 30, 30)]}},
+        {'properties': {'region': 'Point'}, 'geometry': {'type': 'Point', 'coordinates': [0, 0]}},
+    ]}))
+    classifier = RegionClassifier.from_geojson(str(path), cell_size=10)
+
+    assert len(classifier.polygons) == 3
+    assert classifier.classify(10.5, 10.5) == ('Islands', 'Atlantis')
+    assert classifier.classify(25, 25) == ('Block', None)
+
+
+@pytest.mark.parametrize('lat, lon, region', [
+    (48.85, 2.35, 'Europe'),
+    (40.7, -74.0, 'North America'),
+    (-23.5, -46.6, 'South America'),
+    (35.7, 139.7, 'Asia'),
+    (-33.9, 151.2, 'Oceania'),
+])
+def test_bundled_boundaries(lat, lon, region):
+    assert region_classifier.get_region_classifier().classify(lat, lon)[0] == region
+
+
+def test_normalize_locations_batch_matches_single_tweets(classifier, monkeypatch):
+    monkeypatch.setattr(region_classifier, '_classifier', classifier)
+    tweets = [
+        {'id': 1, 'location': {'lat': '48.85', 'lon': '2.35'}},
+        {'id': 2, 'location': {'lat': 15, 'lon': 115}},
+        {'id': 3, 'location': {'lat': 'north', 'lon': 0}},
+        {'id': 4},
+    ]
+    single = [normalize_locations(dict(tweet)) for tweet in tweets]
+
+    assert normalize_locations_batch([dict(tweet) for tweet in tweets]) == single
+    assert single[0]['region'] == 'Europe' and single[0]['country'] == 'France'
+    assert single[0]['geo'] == {'lat': 48.85, 'lon': 2.35}
+    assert [tweet['location_normalized'] for tweet in single] == [True, True, False, False]
@@ -0,0 +1,74 @@
+import pytest
+
+from processors import sentiment_processor
+from processors.sentiment_cache import SentimentCache, cache_key, normalize_text
+from processors.sentiment_processor import analyze_sentiment_batch
+from processors.text_analysis import analyze_text
+
+# The retweeted user's name and the URL carry sentiment words of their own
+RETWEET = "RT @greatnews: Terrible outage again https://example.com/best"
+ORIGINAL = "terrible outage again"
+
+
+@pytest.fixture(autouse=True)
+def keyword_backend():
+    sentiment_processor.set_sentiment_backend('keyword')
+    yield
+    sentiment_processor.set_sentiment_cache(None)
+    sentiment_processor.set_sentiment_backend(None)
+
+
+def score(texts, cache=None, analyses=None):
+    sentiment_processor.set_sentiment_cache(cache)
+    tweets = [{'text': text} for text in texts]
+    return [tweet['sentiment'] for tweet in analyze_sentiment_batch(tweets, analyses)]
+
+
+def test_normalize_text_drops_retweet_prefix_urls_and_case():
+    assert normalize_text(RETWEET) == ORIGINAL
+    assert normalize_text("  Hello\n  WORLD  ") == "hello world"
+
+
+def test_retweets_and_copies_share_a_key():
+    assert cache_key(RETWEET, 'keyword') == cache_key(ORIGINAL, 'keyword')
+    assert cache_key(ORIGINAL, 'keyword') != cache_key(ORIGINAL, 'lexicon')
+    assert cache_key(ORIGINAL, normalized=True) == cache_key(ORIGINAL)
+
+
+@pytest.mark.parametrize('texts', [[RETWEET, ORIGINAL], [ORIGINAL, RETWEET]])
+def test_texts_sharing_a_key_share_a_score_whatever_the_order(texts):
+    cache = SentimentCache()
+    first, second = score(texts[:1], cache) + score(texts[1:], cache)
+
+    assert cache.hits == 1
+    assert first == second
+    assert first['label'] == 'negative'
+
+
+def test_scores_do_not_depend_on_the_cache():
+    texts = [RETWEET, ORIGINAL, "Great day https://example.com/bad", "Great day", "RT @bob:"]
+    cache = SentimentCache()
+
+    assert [score([text], cache)[0] for text in texts] == score(texts)
+
+
+def test_shared_analyses_are_scored_on_the_normalized_text():
+    texts = [RETWEET, "Awesome launch"]
+
+    assert score(texts, analyses=[analyze_text(text) for text in texts]) == score(texts)
+
+
+def test_cache_expires_and_evicts_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('processors.sentiment_cache.time.monotonic', lambda: now[0])
+    cache = SentimentCache(max_entries=2, ttl=10)
+    cache.put('a', {'label': 'positive'})
+    cache.put('b', {'label': 'negative'})
+    cache.put('c', {'label': 'neutral'})
+
+    assert cache.get('a') is None
+    assert cache.get('b') == {'label': 'negative'}
+    now[0] += 10
+    assert cache.get('c') is None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['expirations'] == 1
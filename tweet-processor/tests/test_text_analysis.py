@@ -0,0 +1,68 @@
+import pytest
+
+from processors.hashtag_processor import extract_hashtags, process_hashtags
+from processors.text_analysis import (
+    PhraseMatcher,
+    analyze_text,
+    annotate_language,
+    detect_language,
+    tokenize,
+)
+
+
+def test_analyze_text_splits_words_and_hashtags():
+    analysis = analyze_text("Loving #AI and #Cloud-native tools, don't you?")
+
+    assert analysis.text == "Loving #AI and #Cloud-native tools, don't you?"
+    assert analysis.tokens == ['loving', 'and', 'native', 'tools', 'do', "n't", 'you']
+    assert analysis.hashtags == ['ai', 'cloud']
+
+
+def test_analyze_text_handles_missing_text():
+    analysis = analyze_text(None)
+
+    assert (analysis.text, analysis.tokens, analysis.hashtags) == ('', [], [])
+
+
+def test_hashtags_match_the_hashtag_processor():
+    text = "#Kubernetes 1.30 ships #k8s #DevOps_Days #k8s"
+
+    assert analyze_text(text).hashtags == extract_hashtags(text)
+
+
+def test_process_hashtags_reuses_the_shared_analysis():
+    text = "Deploying on #Kubernetes with #Helm"
+    with_analysis = process_hashtags({'text': text}, analyze_text(text))
+
+    assert with_analysis == process_hashtags({'text': text})
+    assert with_analysis['hashtag_frequency'] == {'kubernetes': 1, 'helm': 1}
+
+
+@pytest.mark.parametrize('phrase', ['not impressed', 'looking forward'])
+def test_phrase_matcher_finds_multi_word_phrases(phrase):
+    matcher = PhraseMatcher(['impressed', phrase, 'forward'])
+    matches = matcher.find(tokenize(f"Honestly {phrase.upper()} today"))
+
+    assert phrase in matches
+    assert matcher.find(tokenize("nothing to see")) == []
+
+
+def test_phrase_matcher_reports_every_occurrence_in_order():
+    matcher = PhraseMatcher(['bad', 'good'])
+
+    assert matcher.find(['good', 'then', 'bad', 'then', 'good']) == ['good', 'bad', 'good']
+
+
+@pytest.mark.parametrize('text, language', [
+    ("This is the best thing I have seen", 'en'),
+    ("Voici le meilleur produit", 'und'),
+    ("#only #hashtags", None),
+])
+def test_detect_language(text, language):
+    assert detect_language(tokenize(text)) == language
+
+
+def test_annotate_language_keeps_an_existing_language():
+    assert annotate_language({'text': "this is it", 'lang': 'fr'})['lang'] == 'fr'
+    assert annotate_language({'text': "this is it"})['lang'] == 'en'
+    assert 'lang' not in annotate_language({'text': ''})
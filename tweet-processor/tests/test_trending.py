@@ -0,0 +1,113 @@
+import pytest
+
+import trending
+from trending import TrendingHashtags
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProducer:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, topic, value):
+        if self.fail:
+            raise RuntimeError('broker down')
+        self.sent.append((topic, value))
+
+
+class FakeIndexer:
+    def __init__(self):
+        self.documents = []
+        self.flush_checks = 0
+
+    def add(self, document, index=None, doc_id=None):
+        self.documents.append((index, doc_id, document))
+
+    def flush_if_due(self):
+        self.flush_checks += 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(trending.time, 'monotonic', clock)
+    return clock
+
+
+def tweets(*hashtag_lists):
+    return [{'hashtags': hashtags} for hashtags in hashtag_lists]
+
+
+def test_top_counts_each_hashtag_once_per_tweet(clock):
+    window = TrendingHashtags(min_count=2, top_k=2)
+    window.add_batch(tweets(['ai', 'ai', 'cloud'], ['ai'], ['ai', 'cloud'], ['data'], ['web'], ['web'], []))
+
+    assert window.top() == [['ai', 3], ['web', 2]]
+    assert TrendingHashtags(min_count=3).top() == []
+
+
+def test_window_size_is_a_multiple_of_the_slide_interval(clock):
+    window = TrendingHashtags(window_size=65, slide_interval=10)
+
+    assert (window.slide_count, window.window_size) == (6, 60)
+
+
+def test_old_slides_leave_the_window(clock):
+    window = TrendingHashtags(window_size=30, slide_interval=10, min_count=1)
+    window.add_batch(tweets(['old']))
+    clock.now += 10
+    assert window.slide_if_due()
+    window.add_batch(tweets(['new']))
+
+    assert sorted(window.top()) == [['new', 1], ['old', 1]]
+    clock.now += 20
+    assert window.slide_if_due()
+    assert window.top() == [['new', 1]]
+    assert not window.slide_if_due()
+
+
+def test_an_idle_period_empties_the_window(clock):
+    window = TrendingHashtags(window_size=30, slide_interval=10, min_count=1)
+    window.add_batch(tweets(['ai'], ['ai']))
+    clock.now += 1000
+
+    assert window.slide_if_due()
+    assert window.top() == []
+    assert window._next_slide_at > clock.now
+
+
+def test_snapshots_go_to_kafka_and_the_bulk_indexer(clock):
+    producer = FakeProducer()
+    indexer = FakeIndexer()
+    window = TrendingHashtags(producer, 'trending', indexer, 'trending-index',
+                              window_size=20, slide_interval=10, min_count=1)
+    window.add_batch(tweets(['ai'], ['ai', 'ml'], []))
+    clock.now += 10
+    window.slide_if_due()
+
+    (topic, document), = producer.sent
+    (index, doc_id, indexed), = indexer.documents
+    assert (topic, index) == ('trending', 'trending-index')
+    assert indexed is document and doc_id.isdigit()
+    assert document['tweet_count'] == 3
+    assert document['hashtags'] == [{'tag': 'ai', 'count': 2}, {'tag': 'ml', 'count': 1}]
+    assert (document['window_size'], document['slide_interval']) == (20, 10)
+    assert indexer.flush_checks == 1
+
+
+def test_a_kafka_failure_still_indexes_the_snapshot(clock):
+    indexer = FakeIndexer()
+    window = TrendingHashtags(FakeProducer(fail=True), 'trending', indexer, 'trending-index')
+
+    window.emit()
+
+    assert len(indexer.documents) == 1
+    assert window.emitted_count == 1